@@ -0,0 +1,82 @@
+"""
+Проверка и пересборка objective_progress (суммы по key results каждой цели).
+
+Запуск: python -m app.aggregates {check,rebuild}
+
+check печатает цели, у которых сохранённые суммы разошлись с key_results,
+и завершается с кодом 1, если такие есть. rebuild пересчитывает таблицу
+целиком одним INSERT ... SELECT ... GROUP BY в одной транзакции.
+"""
+
+import argparse
+import sys
+from typing import Any
+
+from sqlalchemy import Connection, delete, func, insert, select
+
+from app.db import engine
+from app.models import KeyResultDB, ObjectiveProgressDB
+
+Totals = tuple[int, int, int]  # target_total, current_total, kr_count
+
+
+def _computed() -> Any:
+    return (
+        select(
+            KeyResultDB.objective_id,
+            func.sum(KeyResultDB.target_value),
+            func.sum(func.coalesce(KeyResultDB.current_value, 0)),
+            func.count(),
+        )
+        .where(KeyResultDB.objective_id.is_not(None))
+        .group_by(KeyResultDB.objective_id)
+    )
+
+
+def rebuild(conn: Connection) -> int:
+    """Пересчитывает все суммы; возвращает число целей с key results."""
+    conn.execute(delete(ObjectiveProgressDB))
+    result = conn.execute(
+        insert(ObjectiveProgressDB).from_select(
+            ["objective_id", "target_total", "current_total", "kr_count"], _computed()
+        )
+    )
+    return result.rowcount
+
+
+def find_drift(conn: Connection) -> dict[int, tuple[Totals, Totals]]:
+    """{objective_id: (сохранено, должно быть)} для разошедшихся целей."""
+    expected: dict[int, Totals] = {
+        obj_id: (target, current, count)
+        for obj_id, target, current, count in conn.execute(_computed())
+    }
+    stored: dict[int, Totals] = {
+        row.objective_id: (row.target_total, row.current_total, row.kr_count)
+        for row in conn.execute(select(ObjectiveProgressDB))
+    }
+    empty: Totals = (0, 0, 0)
+    return {
+        obj_id: (stored.get(obj_id, empty), expected.get(obj_id, empty))
+        for obj_id in expected.keys() | stored.keys()
+        if stored.get(obj_id, empty) != expected.get(obj_id, empty)
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=["check", "rebuild"])
+    args = parser.parse_args(argv)
+
+    with engine.begin() as conn:
+        if args.command == "rebuild":
+            print(f"rebuilt progress for {rebuild(conn)} objectives")
+            return 0
+        drift = find_drift(conn)
+    for obj_id, (stored, expected) in sorted(drift.items()):
+        print(f"objective {obj_id}: stored {stored}, expected {expected}")
+    print(f"{len(drift)} objectives drifted")
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
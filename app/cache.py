@@ -0,0 +1,174 @@
+"""
+Read-through кэш готовых тел ответов в памяти процесса.
+
+Хранятся сериализованные bytes: попадание не трогает ни БД, ни Pydantic.
+Границы — число записей, суммарный размер тел (LRU-вытеснение) и TTL.
+Ключ — (вид, objective_id, ...), записи сбрасываются по objective_id из
+обработчиков записи в обоих роутерах после commit.
+
+Поколение кэша растёт при каждом сбросе: чтение, начатое до записи, не
+положит в кэш устаревшее тело, даже если закончит уже после сброса. Счётчик
+один на кэш, а не на цель: память не растёт с числом целей, а цена — промах
+без сохранения у чтений, совпавших с записью в другую цель.
+
+Кэш свой у каждого процесса, сбрасывает его только запись в этом же процессе.
+При нескольких воркерах uvicorn остальные отдают прежнее тело до TTL, поэтому
+там RESPONSE_CACHE_TTL_SECONDS — допустимая задержка видимости записи
+(или RESPONSE_CACHE_ENABLED=0).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any, NamedTuple
+
+from fastapi import Response
+
+from app.metrics import registry
+
+CACHE_HITS = registry.counter("response_cache_hits_total", "Response cache hits.", ("kind",))
+CACHE_MISSES = registry.counter("response_cache_misses_total", "Response cache misses.", ("kind",))
+CACHE_EVICTIONS = registry.counter(
+    "response_cache_evictions_total",
+    "Entries dropped from the response cache.",
+    ("reason",),  # capacity | ttl | invalidate
+)
+
+# (вид, objective_id, ...параметры)
+Key = tuple[Any, ...]
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    next_cursor: str | None = None  # для страниц списков
+    etag: str | None = None  # версия, из которой собрано тело (app.conditional)
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 8 * 1024 * 1024,
+        ttl: float = 30.0,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._clock = clock
+        self._entries: OrderedDict[Key, tuple[float, CachedBody]] = OrderedDict()
+        self._by_objective: dict[int, set[Key]] = {}
+        self._generation = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """(записей, байт тел)."""
+        return len(self._entries), self._bytes
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Key) -> CachedBody | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                self._drop(key, "ttl")
+                entry = None
+            if entry is None:
+                CACHE_MISSES.inc(key[0])
+                return None
+            self._entries.move_to_end(key)
+        CACHE_HITS.inc(key[0])
+        return entry[1]
+
+    def put(self, key: Key, value: CachedBody, generation: int) -> None:
+        """Кладёт тело, если с момента generation() кэш не сбрасывался."""
+        size = len(value.body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if self._generation != generation:
+                return
+            if key in self._entries:
+                self._drop(key, None)
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._by_objective.setdefault(key[1], set()).add(key)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)), "capacity")
+
+    def invalidate(self, obj_ids: Iterable[int | None]) -> None:
+        with self._lock:
+            self._generation += 1
+            for obj_id in obj_ids:
+                if obj_id is None:
+                    continue
+                for key in self._by_objective.pop(obj_id, set()):
+                    self._drop(key, "invalidate")
+
+    def clear(self) -> None:
+        with self._lock:
+            # не обнуляется: чтение, начатое до clear(), не должно совпасть с ним
+            self._generation += 1
+            self._entries.clear()
+            self._by_objective.clear()
+            self._bytes = 0
+
+    def _drop(self, key: Key, reason: str | None) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry[1].body)
+        keys = self._by_objective.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_objective[key[1]]
+        if reason:
+            CACHE_EVICTIONS.inc(reason)
+
+    def read_through(self, key: Key, load: Callable[[], CachedBody]) -> tuple[CachedBody, bool]:
+        """(тело, было ли попадание); load вызывается только при промахе."""
+        if not self.enabled:
+            return load(), False
+        cached = self.get(key)
+        if cached is not None:
+            return cached, True
+        generation = self.generation()
+        value = load()
+        self.put(key, value, generation)
+        return value, False
+
+    async def read_through_async(
+        self, key: Key, load: Callable[[], Awaitable[CachedBody]]
+    ) -> tuple[CachedBody, bool]:
+        if not self.enabled:
+            return await load(), False
+        cached = self.get(key)
+        if cached is not None:
+            return cached, True
+        generation = self.generation()
+        value = await load()
+        self.put(key, value, generation)
+        return value, False
+
+
+def json_response(cached: CachedBody, hit: bool) -> Response:
+    headers = {"X-Cache": "HIT" if hit else "MISS"}
+    if cached.etag:
+        headers["ETag"] = cached.etag
+    return Response(cached.body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30")),
+    enabled=os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1",
+)
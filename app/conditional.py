@@ -0,0 +1,49 @@
+"""
+Условные GET: ETag и If-None-Match (RFC 9110, 13.1.2).
+
+ETag строится из версий, которые ведут триггеры (app.models): версия цели и
+счётчик таблицы objectives. Совпадение проверяется одним чтением по ключу,
+без загрузки и сериализации строк; на совпадение — 304 без тела.
+"""
+
+from collections.abc import Awaitable, Callable
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: object) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def client_etags(request: Request) -> set[str]:
+    header = request.headers.get("if-none-match", "")
+    # для If-None-Match сравнение слабое: W/"x" совпадает с "x"
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+def matches(request: Request, etag: str | None) -> bool:
+    if etag is None:
+        return False
+    tags = client_etags(request)
+    return etag in tags or "*" in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def precondition(request: Request, etag_of: Callable[[], str | None]) -> Response | None:
+    """304, если If-None-Match совпал с текущим ETag; версия читается только при заголовке."""
+    if "if-none-match" not in request.headers:
+        return None
+    etag = etag_of()
+    return not_modified(etag) if etag is not None and matches(request, etag) else None
+
+
+async def precondition_async(
+    request: Request, etag_of: Callable[[], Awaitable[str | None]]
+) -> Response | None:
+    if "if-none-match" not in request.headers:
+        return None
+    etag = await etag_of()
+    return not_modified(etag) if etag is not None and matches(request, etag) else None
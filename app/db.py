@@ -1,10 +1,29 @@
 import os
+import re
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
 from pathlib import Path
+from typing import Any
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.metrics import DB_SESSION_SECONDS
 
 env = os.environ.get("ENV", "dev").lower()
+# sync — обработчики в пуле потоков с Session; async — AsyncSession (aiosqlite)
+DB_STACK = os.environ.get("DB_STACK", "sync").lower()
 database_url = os.environ.get("DATABASE_URL")
 
 if database_url:
@@ -19,8 +38,7 @@ else:
     else:
         BASE_DB_DIR = local_db_dir
 
-    BASE_DB_DIR.mkdir(parents=True, exist_ok=True)
-
+    # каталог создаёт app.schema.init_db, а не импорт модуля
     if env == "prod":
         sqlite_path = BASE_DB_DIR / "prod.db"
     elif env == "ci":
@@ -30,18 +48,190 @@ else:
 
     DATABASE_URL = f"sqlite:///{sqlite_path}"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
+# ============================================================
+# Профили SQLite: PRAGMA на каждое новое соединение пула
+# ============================================================
+SQLITE_PROFILES: dict[str, dict[str, Any]] = {
+    # умолчания SQLite: rollback journal, synchronous=FULL
+    "default": {},
+    # WAL: читатели не ждут писателя; NORMAL в WAL не теряет целостность,
+    # только последние транзакции при отключении питания
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -20000,  # ~20 MB
+        "mmap_size": 128 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+# Не зависят от профиля: без foreign_keys SQLite игнорирует ON DELETE CASCADE
+REQUIRED_PRAGMAS: dict[str, Any] = {"foreign_keys": "ON"}
+
+# Размер пула по ENV: писатель в SQLite всё равно один, пул нужен читателям.
+# В prod пул не меньше пула потоков AnyIO (40): иначе все потоки могут ждать
+# соединение, а закрыть сессию и вернуть его в пул будет некому.
+POOL_SETTINGS: dict[str, dict[str, Any]] = {
+    "dev": {"pool_size": 5, "max_overflow": 5},
+    "ci": {"pool_size": 2, "max_overflow": 2},
+    "prod": {"pool_size": 20, "max_overflow": 20, "pool_timeout": 10},
+}
+
+
+def apply_sqlite_profile(engine: Engine, profile: str) -> None:
+    """Выполняет PRAGMA профиля (и REQUIRED_PRAGMAS) на каждом новом DBAPI-соединении."""
+    pragmas = {**REQUIRED_PRAGMAS, **SQLITE_PROFILES[profile]}
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def _default_profile() -> str:
+    return os.environ.get("SQLITE_PROFILE") or "performance"
+
+
+def _sqlite_engine_kwargs(url: str, env: str) -> dict[str, Any]:
+    kwargs: dict[str, Any] = {"connect_args": {"check_same_thread": False}}
+    if url.endswith(("://", ":memory:")):
+        kwargs["poolclass"] = StaticPool
+    else:
+        kwargs.update(POOL_SETTINGS.get(env, POOL_SETTINGS["dev"]))
+    return kwargs
+
+
+def build_engine(url: str, env: str = "dev", profile: str | None = None) -> Engine:
+    """
+    Engine для url. Для SQLite — профиль PRAGMA (SQLITE_PROFILE, по умолчанию
+    performance) и пул по ENV; in-memory база живёт в одном соединении.
+    """
+    if not url.startswith("sqlite"):
+        return create_engine(url)
+
+    engine = create_engine(url, **_sqlite_engine_kwargs(url, env))
+    apply_sqlite_profile(engine, profile or _default_profile())
+    return engine
+
+
+def async_url(url: str) -> str:
+    """sqlite:///path -> sqlite+aiosqlite:///path; остальные URL — как есть."""
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.removeprefix("sqlite://")
+    return url
+
+
+def build_async_engine(url: str, env: str = "dev", profile: str | None = None) -> AsyncEngine:
+    """Async-двойник build_engine: тот же профиль PRAGMA и пул, драйвер aiosqlite."""
+    url = async_url(url)
+    if not url.startswith("sqlite"):
+        return create_async_engine(url)
+
+    engine = create_async_engine(url, **_sqlite_engine_kwargs(url, env))
+    apply_sqlite_profile(engine.sync_engine, profile or _default_profile())
+    return engine
+
+
+# ============================================================
+# Запросы к БД в рамках одного HTTP-запроса (Server-Timing, N+1)
+# ============================================================
+# IN-списки разной длины — одна форма: (?, ?, ?) -> (?)
+_IN_LIST = re.compile(r"\(\?(?:, \?)+\)")
+
+
+class QueryStats:
+    """Число SQL-выражений, время в БД и сколько раз встретилась каждая форма."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[_IN_LIST.sub("(?)", " ".join(statement.split()))] += 1
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Формы, выполненные threshold и более раз (вероятный N+1)."""
+        return {shape: n for shape, n in self.shapes.items() if n >= threshold}
+
+
+# Статистика текущего запроса; пул потоков и run_sync видят её через контекст
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryStats]:
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def track_queries(engine: Engine) -> None:
+    """Вне collect_queries() хуки стоят одну проверку ContextVar на выражение."""
+
+    # у соединения в каждый момент одно выражение — хватает одного времени старта
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        if _query_stats.get() is not None:
+            conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        started = conn.info.pop("query_start", None)
+        stats = _query_stats.get()
+        if stats is not None and started is not None:
+            stats.record(statement, time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context: Any) -> None:
+        # after_cursor_execute для упавшего выражения не вызывается
+        if context.connection is not None:
+            context.connection.info.pop("query_start", None)
+
+
+engine = build_engine(DATABASE_URL, env)
+track_queries(engine)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
 
 def get_db():
+    start = time.perf_counter()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+        DB_SESSION_SECONDS.observe(time.perf_counter() - start)
+
+
+@lru_cache(maxsize=1)
+def async_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Async engine создаётся при первом обращении — sync-стеку aiosqlite не нужен."""
+    async_engine = build_async_engine(DATABASE_URL, env)
+    track_queries(async_engine.sync_engine)
+    # после commit объекты не истекают: ответ сериализуется вне greenlet'а сессии
+    return async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def dispose_async_engine() -> None:
+    """Закрывает соединения async engine: без этого потоки aiosqlite держат процесс."""
+    if async_session_factory.cache_info().currsize:
+        await async_session_factory().kw["bind"].dispose()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    start = time.perf_counter()
+    async with async_session_factory()() as db:
+        try:
+            yield db
+        finally:
+            DB_SESSION_SECONDS.observe(time.perf_counter() - start)
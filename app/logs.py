@@ -0,0 +1,246 @@
+"""
+Неблокирующее логирование: запись в очередь O(1) на горячем пути,
+форматирование и вывод — пачками в фоновом потоке.
+
+Поток запускает start() из lifespan приложения (app.main), а не импорт:
+до него записи только копятся в очереди (до max_queue).
+"""
+
+import atexit
+import json
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from app.masking import mask_pii
+
+# Поля, которые access/error-логи передают через extra= и которые попадают в JSON
+STRUCTURED_FIELDS = (
+    "request_id",
+    "method",
+    "path",
+    "route",
+    "status",
+    "latency_ms",
+    "client",
+    "statement",  # форма SQL без значений (app.middleware.query_stats)
+    "repeats",
+)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Одна JSON-строка на запись. С mask=True msg и path проходят через
+    app.masking (в фоновом потоке записи, а не на горячем пути).
+    """
+
+    def __init__(self, mask: bool = False) -> None:
+        super().__init__()
+        self.mask = mask
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = record.__dict__.get(field)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        if self.mask:
+            entry["msg"] = mask_pii(entry["msg"])
+            if "path" in entry:
+                entry["path"] = mask_pii(str(entry["path"]))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BatchLogWriter:
+    """
+    Ограниченная очередь записей и фоновый поток, который выгружает её
+    пачками: каждый целевой handler получает один write и один flush на пачку.
+    При переполнении новые записи отбрасываются и считаются в `dropped`.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = 10_000,
+        batch_size: int = 512,
+        flush_interval: float = 0.5,
+    ) -> None:
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.targets: list[tuple[logging.Logger, logging.StreamHandler[Any]]] = []
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+
+        self._queue: deque[logging.LogRecord] = deque()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread: threading.Thread | None = None
+
+    # ---- горячий путь ----------------------------------------------------
+
+    def put(self, record: logging.LogRecord) -> None:
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(record)
+        self.enqueued += 1
+        if not self._wake.is_set():
+            self._wake.set()
+
+    # ---- фоновый поток ---------------------------------------------------
+
+    def add_target(self, logger: logging.Logger, handler: logging.StreamHandler[Any]) -> None:
+        """Записи logger'а будут выводиться через handler (его форматтер и поток)."""
+        self.targets.append((logger, handler))
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Дописывает остаток очереди и останавливает поток."""
+        if self._thread is None:
+            return
+        self._stop = True
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            # сначала clear, потом drain: запись, пришедшая после, снова разбудит поток
+            self._wake.clear()
+            while self._queue:
+                self._write(self._drain())
+            if self._stop:
+                return
+
+    def _drain(self) -> list[logging.LogRecord]:
+        batch: list[logging.LogRecord] = []
+        queue = self._queue
+        while queue and len(batch) < self.batch_size:
+            batch.append(queue.popleft())
+        return batch
+
+    def _write(self, batch: list[logging.LogRecord]) -> None:
+        for logger, handler in self.targets:
+            lines = []
+            for record in batch:
+                if record.name != logger.name or record.levelno < handler.level:
+                    continue
+                try:
+                    lines.append(handler.format(record) + handler.terminator)
+                except Exception:
+                    handler.handleError(record)
+            if not lines:
+                continue
+            handler.acquire()
+            try:
+                handler.stream.write("".join(lines))
+                handler.stream.flush()
+            except Exception:
+                handler.handleError(batch[0])
+            finally:
+                handler.release()
+        self.written += len(batch)
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        """Ждёт, пока очередь будет записана (для тестов и остановки); True — успели."""
+        deadline = time.monotonic() + timeout
+        while self.written < self.enqueued:
+            if self._thread is None or time.monotonic() >= deadline:
+                return False
+            self._wake.set()
+            time.sleep(0.001)
+        return True
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queue_depth": len(self._queue),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+        }
+
+
+class QueueingHandler(logging.Handler):
+    """Handler горячего пути: только кладёт запись в очередь BatchLogWriter."""
+
+    def __init__(self, writer: BatchLogWriter, level: int = logging.NOTSET) -> None:
+        super().__init__(level)
+        self.writer = writer
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # без lock/format: форматирование делает фоновый поток
+        if self.filter(record):
+            self.writer.put(record)
+            return True
+        return False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.writer.put(record)
+
+
+writer = BatchLogWriter()
+
+
+def attach(logger: logging.Logger, handler: logging.StreamHandler[Any]) -> None:
+    """
+    Подключает logger к фоновой записи через handler (StreamHandler/FileHandler).
+    Повторный вызов заменяет прежний handler этого logger'а.
+
+    Записи не уходят в root: иначе любой basicConfig (его неявно делает первый
+    logging.warning) писал бы их ещё и синхронно, без очереди и маскирования.
+    """
+    logger.propagate = False
+    for h in list(logger.handlers):
+        if isinstance(h, QueueingHandler):
+            logger.removeHandler(h)
+    writer.targets = [(lg, h) for lg, h in writer.targets if lg.name != logger.name]
+
+    logger.addHandler(QueueingHandler(writer, handler.level))
+    writer.add_target(logger, handler)
+
+
+def start() -> None:
+    writer.start()
+
+
+def stop() -> None:
+    """Дописывает очередь и останавливает поток; start() запустит его снова."""
+    writer.stop()
+
+
+def stats() -> dict[str, int]:
+    """Глубина очереди и счётчики (в т.ч. отброшенных записей)."""
+    return writer.stats()
+
+
+def flush(timeout: float = 1.0) -> bool:
+    return writer.flush(timeout)
+
+
+def stderr_handler() -> logging.StreamHandler[Any]:
+    handler: logging.StreamHandler[Any] = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter(mask=True))
+    return handler
+
+
+atexit.register(writer.stop)
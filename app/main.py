@@ -1,44 +1,38 @@
 # app/main.py
 import logging
 import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
-from app.db import Base, SessionLocal, engine
-from app.middleware.errors import ExceptionLoggingMiddleware
-from app.middleware.limits import BodySizeLimitMiddleware
-from app.middleware.security import ApiKeyGateMiddleware, HSTSMiddleware
-from app.middleware.security_full import (
-    AuthZMiddleware,
-    IdempotencyKeyMiddleware,
-    RateLimitMiddleware,
-    TrustedHostMiddleware,
-)
-from app.models import ObjectiveDB
+from app import logs, metrics
+from app.db import DB_STACK, dispose_async_engine, engine
+from app.middleware.pipeline import SecurityPipeline, default_stages
+from app.schema import init_db
 
 from .routers import key_results, objectives, upload
 
-app = FastAPI(title="SecDev Course App", version="0.2.1")
 
 # ============================================================
-# DB + SEED ALWAYS ON IMPORT (works in CI + TestClient)
+# Lifespan: импорт модуля без побочных эффектов, БД готовится здесь
 # ============================================================
-Base.metadata.create_all(bind=engine)
-
-# Always seed if empty (fix for TestClient)
-with SessionLocal() as db:
-    if not db.query(ObjectiveDB).filter_by(id=1).first():
-        db.add(
-            ObjectiveDB(
-                id=1,
-                title="Seed objective for CI",
-                description="Automatically created to satisfy error_rate test",
-            )
-        )
-        db.commit()
-        logging.getLogger("access").info("[CI] Seeded Objective(id=1)")
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    logs.start()
+    # read-only контейнер: схему ставит `python -m app.schema` до старта
+    if os.getenv("DB_INIT_ON_STARTUP", "1") == "1":
+        init_db(engine)
+    _check_response_models(app, os.getenv("RESPONSE_MODEL_POLICY", "warn").lower())
+    yield
+    await dispose_async_engine()
+    logs.stop()
+
+
+app = FastAPI(title="SecDev Course App", version="0.2.1", lifespan=lifespan)
 
 
 # ============================================================
@@ -64,40 +58,36 @@ app.add_middleware(
 )
 
 
-app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=[
-        "localhost",
-        "127.0.0.1",
-        "testserver",
-        "localhost:8000",
-        "render.com",
-        "course-project-karablik27-rpbo.onrender.com",
-    ],
-)
-
-app.add_middleware(RateLimitMiddleware)
-app.add_middleware(IdempotencyKeyMiddleware)
-app.add_middleware(AuthZMiddleware)
 # ============================================================
-# Security middlewares
+# Security pipeline (TrustedHost, RateLimit, Idempotency, AuthZ,
+# HSTS, BodySizeLimit, ApiKeyGate, RFC 7807, access log)
 # ============================================================
-app.add_middleware(HSTSMiddleware)
-
-if os.getenv("BODY_LIMIT_ENABLED", "1") == "1":
-    app.add_middleware(BodySizeLimitMiddleware)
-
-app.add_middleware(ApiKeyGateMiddleware)
-
-if os.getenv("RFC7807_ENABLED", "1") == "1":
-    app.add_middleware(ExceptionLoggingMiddleware)
-
+ALLOWED_HOSTS = [
+    "localhost",
+    "127.0.0.1",
+    "testserver",
+    "localhost:8000",
+    "render.com",
+    "course-project-karablik27-rpbo.onrender.com",
+]
+
+# /metrics отдаётся напрямую, мимо конвейера и роутера
+app.add_middleware(
+    SecurityPipeline,
+    stages=default_stages(ALLOWED_HOSTS),
+    bypass={"/metrics": metrics.metrics_app},
+)
 
 # ============================================================
 # Routers
 # ============================================================
-app.include_router(objectives.router, prefix="/objectives", tags=["Objectives"])
-app.include_router(key_results.router, prefix="/key_results", tags=["Key Results"])
+# DB_STACK=async — обработчики на AsyncSession, без пула потоков
+if DB_STACK == "async":
+    app.include_router(objectives.async_router, prefix="/objectives", tags=["Objectives"])
+    app.include_router(key_results.async_router, prefix="/key_results", tags=["Key Results"])
+else:
+    app.include_router(objectives.router, prefix="/objectives", tags=["Objectives"])
+    app.include_router(key_results.router, prefix="/key_results", tags=["Key Results"])
 app.include_router(upload.router, prefix="/files", tags=["Files"])
 
 
@@ -106,16 +96,7 @@ app.include_router(upload.router, prefix="/files", tags=["Files"])
 # ============================================================
 logger = logging.getLogger("access")
 logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-logger.addHandler(handler)
-
-
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    response = await call_next(request)
-    logger.info(f"{request.method} {request.url.path} -> {response.status_code}")
-    return response
+logs.attach(logger, logs.stderr_handler())  # поток записи запускает lifespan
 
 
 # ============================================================
@@ -138,6 +119,12 @@ def _check_response_models(app: FastAPI, policy: str = "warn") -> None:
             continue
         if not (set(route.methods or set()) & {"GET", "POST", "PUT", "PATCH", "DELETE"}):
             continue
+        # Исключение: потоковые ручки (NDJSON /objectives/export). Тело — поток строк,
+        # схема ответа к нему неприменима; поля whitelisted явным select колонок
+        # (response_class без явного значения — DefaultPlaceholder, не класс)
+        response_class = route.response_class
+        if isinstance(response_class, type) and issubclass(response_class, StreamingResponse):
+            continue
         if route.response_model is None:
             bad.append((route.path, sorted(route.methods)))
 
@@ -147,9 +134,3 @@ def _check_response_models(app: FastAPI, policy: str = "warn") -> None:
             raise RuntimeError(msg)
         else:
             logging.warning(msg)
-
-
-@app.on_event("startup")
-async def enforce_response_models_startup() -> None:
-    policy = os.getenv("RESPONSE_MODEL_POLICY", "warn").lower()
-    _check_response_models(app, policy)
@@ -0,0 +1,197 @@
+"""
+Маскирование PII/секретов в сообщениях ошибок и логах.
+
+Правила объединяются в одно регулярное выражение-альтернацию. У правила могут
+быть подсказки (hints) — литералы, без которых оно сработать не может. Они же
+служат литеральным префильтром: подсказки ищутся str.find (~1 ГБ/с), а
+альтернация прогоняется только по строкам, где подсказка нашлась, и по
+следующим за ними. Правило добавляет к байту текста без его данных один find на
+подсказку (~2 нс), а не попытку регулярки в каждой позиции (десятки-сотни нс),
+см. benchmarks/bench_masking.py.
+"""
+
+import re
+from collections.abc import Callable, Sequence
+from functools import lru_cache
+
+Replacement = str | Callable[["re.Match[str]"], str]
+
+
+class MaskRule:
+    """
+    Правило маскирования. Группы внутри pattern должны быть именованными
+    с префиксом `<name>_` — так правила не конфликтуют в общей альтернации.
+    hints — подстроки в нижнем регистре, хотя бы одна из которых есть в любом
+    совпадении; пустой кортеж — правило применяется всегда, ко всему тексту.
+    Совпадение должно начинаться в строке с подсказкой и кончаться не дальше
+    следующей строки; если нет (многострочный блок), нужен multiline=True —
+    тогда найденная подсказка включает проход по всему тексту.
+    """
+
+    __slots__ = ("name", "pattern", "replacement", "hints", "multiline")
+
+    def __init__(
+        self,
+        name: str,
+        pattern: str,
+        replacement: Replacement,
+        hints: tuple[str, ...] = (),
+        multiline: bool = False,
+    ) -> None:
+        self.name = name
+        self.pattern = pattern
+        self.replacement = replacement
+        self.hints = hints
+        self.multiline = multiline
+
+
+DEFAULT_RULES: tuple[MaskRule, ...] = (
+    # Authorization: Bearer <token>
+    MaskRule(
+        "bearer", r"\b(?i:bearer)\s+[A-Za-z0-9\-._~+/]+=*", "Bearer [MASKED]", hints=("bearer",)
+    ),
+    # X-API-Key: <key> (заголовок нашего ApiKeyGate)
+    MaskRule(
+        "api_key_header",
+        r"\b(?i:x-api-key)\s*[:=]\s*['\"]?[^'\"\s,;]+['\"]?",
+        "X-API-Key: [MASKED]",
+        hints=("x-api-key",),
+    ),
+    # password=..., token: ..., api_key=... — имя ключа сохраняем
+    MaskRule(
+        "secret_kv",
+        r"\b(?P<secret_kv_key>(?i:password|passwd|pwd|secret|api[_-]?key|access[_-]?token|token))"
+        r"\s*[:=]\s*['\"]?[^'\"\s]+['\"]?",
+        lambda m: f"{m.group('secret_kv_key')}:[MASKED]",
+        hints=("pass", "pwd", "secret", "api", "token"),
+    ),
+    # токены с известными префиксами: GitHub (ghp_...), Slack (xoxb-...), sk-...
+    MaskRule(
+        "prefixed_token",
+        r"\b(?:gh[pousr]_|github_pat_|xox[abprs]-|sk-)[A-Za-z0-9_-]{16,}",
+        "[token]",
+        hints=("gh", "xox", "sk-"),  # gh покрывает ghp_/gho_/.../github_pat_
+    ),
+    MaskRule(
+        "email",
+        r"(?<![\w.%+-])[\w.%+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}",
+        "[email]",
+        hints=("@",),
+    ),
+    # международный формат телефона: +7 (912) 345-67-89, +1 415 555 2671
+    MaskRule(
+        "phone",
+        r"(?<![\w+])\+\d{1,3}[ \-]?\(?\d{3}\)?[ \-]?\d{3}[ \-]?\d{2}[ \-]?\d{2}(?!\d)",
+        "[phone]",
+        hints=("+",),
+    ),
+)
+
+
+class MaskingEngine:
+    """
+    Маскирует текст одним проходом скомпилированной альтернации.
+
+    Сканируется не больше max_scan символов: хвост огромного сообщения
+    отбрасывается (а не выводится без маскирования).
+    """
+
+    def __init__(self, rules: Sequence[MaskRule] = DEFAULT_RULES, max_scan: int = 16 * 1024):
+        self.rules = tuple(rules)
+        self.max_scan = max_scan
+        self.pattern = self._compile(tuple(range(len(self.rules))))
+        self._replacements = {r.name: r.replacement for r in self.rules}
+        # альтернации по подмножествам правил; на практике их немного
+        self._subset = lru_cache(maxsize=64)(self._compile)
+
+        # каждая различная подсказка ищется один раз за текст; подсказка, внутри
+        # которой есть более короткая (x-api-key ⊃ api), ищется через неё
+        hints = {hint for rule in self.rules for hint in rule.hints}
+        self._always = tuple(i for i, rule in enumerate(self.rules) if not rule.hints)
+        self._needles: dict[str, set[int]] = {}
+        for i, rule in enumerate(self.rules):
+            for hint in rule.hints:
+                needle = min((h for h in hints if h in hint), key=len)
+                self._needles.setdefault(needle, set()).add(i)
+        self._multiline = {i for i, rule in enumerate(self.rules) if rule.multiline}
+
+    def _compile(self, indexes: tuple[int, ...]) -> "re.Pattern[str]":
+        rules = [self.rules[i] for i in indexes]
+        return re.compile("|".join(f"(?P<{r.name}>{r.pattern})" for r in rules))
+
+    def _replace(self, match: "re.Match[str]") -> str:
+        replacement = self._replacements[match.lastgroup or ""]
+        return replacement if isinstance(replacement, str) else replacement(match)
+
+    def _prefilter(self, text: str) -> tuple[tuple[int, ...], list[int] | None]:
+        """
+        Правила, чьи подсказки есть в тексте, и позиции подсказок; None вместо
+        позиций — альтернацию нужно прогнать по всему тексту.
+        """
+        lowered = text.lower()
+        # lower() у редких символов меняет длину — позиции тогда не годятся
+        hits: list[int] | None = [] if len(lowered) == len(text) else None
+        if self._always:
+            hits = None
+        active = set(self._always)
+        for needle, rules in self._needles.items():
+            pos = lowered.find(needle)
+            if pos < 0:
+                continue
+            active |= rules
+            if not rules.isdisjoint(self._multiline):
+                hits = None
+            while hits is not None and pos >= 0:
+                hits.append(pos)
+                pos = lowered.find(needle, pos + 1)
+        return tuple(sorted(active)), hits
+
+    @staticmethod
+    def _windows(text: str, hits: list[int]) -> list[tuple[int, int]]:
+        """Строка с подсказкой плюс следующая; пересекающиеся окна сливаются."""
+        spans: list[tuple[int, int]] = []
+        for pos in sorted(hits):
+            if spans and pos < spans[-1][1]:
+                continue
+            start = text.rfind("\n", 0, pos) + 1
+            end = text.find("\n", pos)
+            if end >= 0:
+                end = text.find("\n", end + 1)
+            if end < 0:
+                end = len(text)
+            if spans and start <= spans[-1][1]:
+                spans[-1] = (spans[-1][0], end)
+            else:
+                spans.append((start, end))
+        return spans
+
+    def mask(self, text: str) -> str:
+        suffix = ""
+        if len(text) > self.max_scan:
+            suffix = f"...[{len(text) - self.max_scan} chars cut]"
+            text = text[: self.max_scan]
+        active, hits = self._prefilter(text)
+        if not active:
+            return text + suffix
+        pattern = self.pattern if len(active) == len(self.rules) else self._subset(active)
+        if hits is None:
+            return pattern.sub(self._replace, text) + suffix
+
+        # pos/endpos вместо срезов: \b и lookbehind видят символ перед окном
+        parts = []
+        last = 0
+        for start, end in self._windows(text, hits):
+            for match in pattern.finditer(text, max(start, last), end):
+                parts.append(text[last : match.start()])
+                parts.append(self._replace(match))
+                last = match.end()
+        parts.append(text[last:])
+        return "".join(parts) + suffix
+
+
+default_engine = MaskingEngine()
+
+
+def mask_pii(text: str) -> str:
+    """Маскирует PII/секреты правилами по умолчанию."""
+    return default_engine.mask(text)
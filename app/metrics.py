@@ -0,0 +1,230 @@
+"""
+Метрики процесса в текстовом формате Prometheus.
+
+Счётчики и гистограммы с фиксированными бакетами живут в памяти процесса;
+обновление — поиск серии в dict и пара сложений под коротким lock'ом.
+Метки запросов — шаблон маршрута (`/objectives/{obj_id}`), а не сырой путь,
+чтобы число серий было ограничено.
+"""
+
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+
+from app import logs
+from app.middleware.profiling import run_profiled
+
+# секунды; верхняя граница последнего бакета — +Inf
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.values: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_render_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        # на серию: [счётчики по бакетам (+Inf последним)..., сумма]
+        self.series: dict[Labels, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self.series.get(labels)
+            if row is None:
+                row = self.series[labels] = [0.0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bounds = [f"{b:g}" for b in self.buckets] + ["+Inf"]
+        for labels, row in sorted(self.series.items()):
+            cumulative = 0.0
+            for bound, count in zip(bounds, row[:-1], strict=True):
+                cumulative += count
+                le = _render_labels((*self.label_names, "le"), (*labels, bound))
+                lines.append(f"{self.name}_bucket{le} {cumulative:g}")
+            tail = _render_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{tail} {row[-1]:.6f}")
+            lines.append(f"{self.name}_count{tail} {cumulative:g}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Counter | Histogram] = []
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self.metrics:
+            lines += metric.render()
+        # очередь логов (app.logs): глубина — gauge, итоги с запуска — counter'ы
+        stats = logs.stats()
+        lines += [
+            "# HELP log_queue_depth Log records waiting for the writer thread.",
+            "# TYPE log_queue_depth gauge",
+            f"log_queue_depth {stats['queue_depth']}",
+        ]
+        for key in ("enqueued", "written", "dropped"):
+            name = f"log_records_{key}_total"
+            lines += [
+                f"# HELP {name} Log records {key} by the background writer queue.",
+                f"# TYPE {name} counter",
+                f"{name} {stats[key]}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by route template.", ("method", "route", "status")
+)
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template.", ("method", "route")
+)
+REJECTIONS = registry.counter(
+    "http_rejections_total", "Requests rejected by security middleware.", ("stage", "status")
+)
+DB_SESSION_SECONDS = registry.histogram(
+    "db_session_seconds", "Time a DB session stays open per request."
+)
+DB_STATEMENTS = registry.histogram(
+    "db_statements_per_request",
+    "SQL statements executed before the response headers.",
+    ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_REPEATED_STATEMENTS = registry.counter(
+    "db_repeated_statements_total",
+    "Requests that ran one statement shape repeatedly (likely N+1).",
+    ("route",),
+)
+THREADPOOL_WAIT_SECONDS = registry.histogram(
+    "threadpool_queue_wait_seconds",
+    "Wait before a sync handler starts in the thread pool.",
+    ("route",),
+)
+
+
+def observe_request(scope: Scope, status_code: int, seconds: float) -> None:
+    route = getattr(scope.get("route"), "path", None) or "unmatched"
+    REQUESTS.inc(scope["method"], route, str(status_code))
+    REQUEST_SECONDS.observe(seconds, scope["method"], route)
+
+
+def rejected(stage: str, status_code: int) -> None:
+    REJECTIONS.inc(stage, str(status_code))
+
+
+def timed_threadpool(call: Callable[..., Any], route: str) -> Callable[..., Any]:
+    """
+    Оборачивает sync-обработчик: он всё так же выполняется в пуле потоков,
+    но время от постановки в очередь до старта попадает в гистограмму.
+    """
+
+    @functools.wraps(call)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        submitted = time.perf_counter()
+
+        def run() -> Any:
+            THREADPOOL_WAIT_SECONDS.observe(time.perf_counter() - submitted, route)
+            return run_profiled(call, *args, **kwargs)
+
+        return await run_in_threadpool(run)
+
+    wrapper.__dict__["_timed_call"] = call
+    return wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute, у которого sync-обработчики меряют ожидание пула потоков."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        # include_router пересоздаёт маршрут с префиксом — перевешиваем метку
+        call = getattr(endpoint, "_timed_call", None)
+        if call is not None:
+            endpoint = timed_threadpool(call, path)
+        elif not inspect.iscoroutinefunction(endpoint):
+            endpoint = timed_threadpool(endpoint, path)
+        super().__init__(path, endpoint, **kwargs)
+
+
+async def metrics_app(scope: Scope, receive: Receive, send: Send) -> None:
+    """ASGI-приложение GET /metrics."""
+    body = registry.render().encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; version=0.0.4; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,74 @@
+import logging
+import os
+import random
+import time
+import uuid
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .. import metrics
+
+logger = logging.getLogger("access")
+
+
+class AccessLogMiddleware:
+    """
+    Access-лог: `METHOD /path -> status` + структурные поля (latency_ms, status,
+    шаблон маршрута, request_id) для JSON-вывода app.logs.
+
+    Каждому запросу назначается request_id (из X-Request-ID или новый), он
+    возвращается в заголовке ответа и доступен в scope["state"]["request_id"].
+    2xx-ответы можно сэмплировать: ACCESS_LOG_SAMPLE_2XX=0.1 пишет ~10% из них.
+    """
+
+    def __init__(self, app: ASGIApp, sample_2xx: float | None = None) -> None:
+        self.app = app
+        if sample_2xx is None:
+            sample_2xx = float(os.getenv("ACCESS_LOG_SAMPLE_2XX", "1.0"))
+        self.sample_2xx = sample_2xx
+        self.sampled_out = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        request_id = Headers(scope=scope).get("x-request-id", "")[:128] or uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+        raw_request_id = request_id.encode("latin-1")
+        status_code = 500
+
+        async def send_tracking(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-request-id", raw_request_id),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_tracking)
+
+        latency = time.perf_counter() - start
+        metrics.observe_request(scope, status_code, latency)
+
+        if 200 <= status_code < 300 and self.sample_2xx < 1.0:
+            if random.random() >= self.sample_2xx:  # noqa: S311 — не криптография
+                self.sampled_out += 1
+                return
+
+        route = scope.get("route")
+        logger.info(
+            f"{scope['method']} {scope['path']} -> {status_code}",
+            extra={
+                "request_id": request_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status": status_code,
+                "latency_ms": round(latency * 1000, 3),
+            },
+        )
@@ -1,17 +1,24 @@
 import json
 import logging
-import re
-from collections.abc import Awaitable, Callable
+from functools import lru_cache
+from typing import Any
 
-from fastapi import Request, Response, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import Response, status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .. import logs
+from ..masking import mask_pii
 
 # === ТЕСТ ОЖИДАЕТ ФАЙЛ ИМЕННО здесь ===
 LOG_FILE = "error.log"
 
 
+@lru_cache(maxsize=1)
 def _ensure_logger() -> logging.Logger:
-    """Создаёт гарантированно file-logger, который пишет в error.log."""
+    """
+    File-logger в error.log (через фоновую очередь). Создаётся при первой
+    ошибке, а не при импорте: файл не открывается, пока писать нечего.
+    """
     logger = logging.getLogger("error_logger")
     logger.setLevel(logging.ERROR)
 
@@ -20,10 +27,8 @@ def _ensure_logger() -> logging.Logger:
         logger.removeHandler(h)
 
     # Создаём локальный error.log
+    handler: logging.StreamHandler[Any]
     try:
-        with open(LOG_FILE, "a", encoding="utf-8"):
-            pass
-
         handler = logging.FileHandler(
             LOG_FILE,
             mode="a",
@@ -33,52 +38,52 @@ def _ensure_logger() -> logging.Logger:
     except Exception:
         handler = logging.StreamHandler()
 
-    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    handler.setFormatter(logs.JsonFormatter())
+    logs.attach(logger, handler)
 
     return logger
 
 
-logger = _ensure_logger()
+class ExceptionLoggingMiddleware:
+    """C3★★ — маскирование PII + логирование ошибок."""
 
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-def _mask_pii(text: str) -> str:
-    text = re.sub(
-        r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}",
-        "[email]",
-        text,
-    )
-    text = re.sub(
-        r"(?i)(password|token|secret)\s*[:=]\s*['\"]?([^'\"\s]+)['\"]?",
-        r"\1:[MASKED]",
-        text,
-    )
-    return text
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
+        response_started = False
 
-class ExceptionLoggingMiddleware(BaseHTTPMiddleware):
-    """C3★★ — маскирование PII + логирование ошибок."""
+        async def send_tracking(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
 
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: Callable[[Request], Awaitable[Response]],
-    ) -> Response:
         try:
-            return await call_next(request)
+            await self.app(scope, receive, send_tracking)
 
         except Exception as e:
-            safe_message = _mask_pii(str(e))
-
-            logger.error(f"Unhandled error: {safe_message}", exc_info=False)
-
-            # ФОРСИРУЕМ flush (важно для CI!)
-            for h in logger.handlers:
-                try:
-                    h.flush()
-                except Exception as err:
-                    logger.warning(f"Failed to flush log handler: {type(err).__name__}")
+            # заголовки уже ушли клиенту — отдать problem+json нельзя
+            if response_started:
+                raise
+
+            safe_message = mask_pii(str(e))
+            state = scope.get("state") or {}
+
+            # только постановка в очередь: диск не блокирует event loop
+            _ensure_logger().error(
+                f"Unhandled error: {safe_message}",
+                exc_info=False,
+                extra={
+                    "request_id": state.get("request_id"),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                },
+            )
 
             problem = {
                 "type": "about:blank",
@@ -87,8 +92,8 @@ class ExceptionLoggingMiddleware(BaseHTTPMiddleware):
                 "detail": "An unexpected error occurred.",
             }
 
-            return Response(
+            await Response(
                 content=json.dumps(problem),
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 media_type="application/problem+json",
-            )
+            )(scope, receive, send)
@@ -1,5 +1,4 @@
 # app/middleware/files.py
-import imghdr
 import os
 import uuid
 
@@ -8,6 +7,17 @@ from fastapi import HTTPException, UploadFile
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
 
 
+def _image_kind(head: bytes) -> str | None:
+    """Сигнатуры jpeg/png/gif — те же проверки, что делал imghdr (удалён в Python 3.13)."""
+    if head[6:10] in (b"JFIF", b"Exif") or head[:4] == b"\xff\xd8\xff\xdb":
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return None
+
+
 def secure_save_upload(file: UploadFile) -> str:
     """Сохраняет файл безопасно: проверяет тип, ограничивает размер и имя."""
     # 1. Проверяем размер
@@ -20,7 +30,7 @@ def secure_save_upload(file: UploadFile) -> str:
     # 2. Проверяем magic bytes (только изображения)
     head = file.file.read(512)
     file.file.seek(0)
-    kind = imghdr.what(None, head)
+    kind = _image_kind(head)
     if kind not in {"jpeg", "png", "gif"}:
         raise HTTPException(status_code=400, detail="Invalid file type")
 
@@ -1,22 +1,102 @@
-from collections.abc import Awaitable, Callable
+import json
 
-from fastapi import Request, Response, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import Response, status
+from starlette.datastructures import Headers
+from starlette.requests import ClientDisconnect
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .. import metrics
 
 MAX_BODY_SIZE = 1 * 1024 * 1024  # 1 MB
+UPLOAD_MAX_BODY_SIZE = 5 * 1024 * 1024 + 64 * 1024  # 5 MB файла + multipart-обвязка
+
+# Точные пути с собственным лимитом, остальные — MAX_BODY_SIZE
+ROUTE_LIMITS = {"/files/upload": UPLOAD_MAX_BODY_SIZE}
+
+
+def _payload_too_large() -> Response:
+    metrics.rejected("body_limit", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    return Response(
+        content=json.dumps(
+            {
+                "type": "about:blank",
+                "title": "Payload Too Large",
+                "status": 413,
+                "detail": "Request body exceeds the allowed size.",
+            }
+        ),
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        media_type="application/problem+json",
+    )
 
 
-class BodySizeLimitMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
+class BodySizeLimitMiddleware:
+    """
+    Ограничение тела запроса без буферизации:
+    - слишком большой Content-Length отклоняется сразу, тело не читается;
+    - chunked-тело считается по мере чтения приложением, при превышении
+      отдаём 413, а приложению — http.disconnect.
+    """
+
+    def __init__(
         self,
-        request: Request,
-        call_next: Callable[[Request], Awaitable[Response]],
-    ) -> Response:
-        body = await request.body()
-        if len(body) > MAX_BODY_SIZE:
-            return Response(
-                content="Payload Too Large",
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            )
-        response = await call_next(request)
-        return response
+        app: ASGIApp,
+        max_body_size: int = MAX_BODY_SIZE,
+        route_limits: dict[str, int] | None = None,
+    ) -> None:
+        self.app = app
+        self.max_body_size = max_body_size
+        self.route_limits = ROUTE_LIMITS if route_limits is None else route_limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.route_limits.get(scope["path"], self.max_body_size)
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit():
+            if int(content_length) > limit:
+                await _payload_too_large()(scope, receive, send)
+                return
+
+        received = 0
+        response_started = False
+        exceeded = False
+        responded = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded, responded
+            if exceeded:
+                return {"type": "http.disconnect"}
+
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+
+            received += len(message.get("body", b""))
+            if received > limit:
+                exceeded = True
+                if not response_started:
+                    responded = True
+                    await _payload_too_large()(scope, receive, send)
+                return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            # 413 уже отдан нами — всё, что пишет приложение после, отбрасываем
+            if responded:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except (ClientDisconnect, OSError):
+            # приложение дочитывало тело и получило наш http.disconnect — это
+            # ожидаемо; любые другие ошибки приложения пробрасываются как есть
+            if not exceeded:
+                raise
@@ -0,0 +1,84 @@
+import os
+from collections.abc import Sequence
+from typing import Any
+
+from starlette.middleware import Middleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .access import AccessLogMiddleware
+from .errors import ExceptionLoggingMiddleware
+from .limits import BodySizeLimitMiddleware
+from .profiling import ProfilingMiddleware
+from .query_stats import QueryStatsMiddleware
+from .security import ApiKeyGateMiddleware, HSTSMiddleware
+from .security_full import (
+    AuthZMiddleware,
+    IdempotencyKeyMiddleware,
+    RateLimitMiddleware,
+    TrustedHostMiddleware,
+)
+
+
+def default_stages(allowed_hosts: list[str]) -> list[Middleware]:
+    """
+    Порядок шагов — снаружи внутрь (как раньше давал стек add_middleware).
+    BODY_LIMIT_ENABLED / RFC7807_ENABLED / QUERY_STATS_ENABLED отключают свои шаги;
+    ProfilingMiddleware стоит всегда, но без PROFILE_ENABLED=1 только пропускает запрос.
+    """
+    stages = [Middleware(AccessLogMiddleware), Middleware(ProfilingMiddleware)]
+    if os.getenv("QUERY_STATS_ENABLED", "1") == "1":
+        stages.append(Middleware(QueryStatsMiddleware))
+    if os.getenv("RFC7807_ENABLED", "1") == "1":
+        stages.append(Middleware(ExceptionLoggingMiddleware))
+    stages.append(Middleware(ApiKeyGateMiddleware))
+    if os.getenv("BODY_LIMIT_ENABLED", "1") == "1":
+        stages.append(Middleware(BodySizeLimitMiddleware))
+    stages += [
+        Middleware(HSTSMiddleware),
+        Middleware(AuthZMiddleware),
+        Middleware(IdempotencyKeyMiddleware),
+        Middleware(RateLimitMiddleware),
+        Middleware(TrustedHostMiddleware, allowed_hosts=allowed_hosts),
+    ]
+    return stages
+
+
+class SecurityPipeline:
+    """
+    Единый pure-ASGI конвейер проверок безопасности.
+
+    Шаги собираются в цепочку один раз при старте: на запрос не создаются
+    ни задачи, ни промежуточные потоки, как у BaseHTTPMiddleware.
+    bypass — служебные пути (например /metrics), которые обслуживаются
+    напрямую, минуя и шаги конвейера, и роутер.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        stages: Sequence[Middleware],
+        bypass: dict[str, ASGIApp] | None = None,
+    ) -> None:
+        self.app = app
+        self.bypass = bypass or {}
+        self.stages: dict[type, Any] = {}
+
+        handler = app
+        for cls, args, kwargs in reversed(list(stages)):
+            handler = cls(handler, *args, **kwargs)
+            self.stages[cls] = handler
+        self.handler = handler
+
+    def stage(self, cls: type) -> Any:
+        """Возвращает экземпляр шага (для тестов и диагностики)."""
+        return self.stages.get(cls)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        direct = self.bypass.get(scope["path"])
+        if direct is not None:
+            await direct(scope, receive, send)
+            return
+        await self.handler(scope, receive, send)
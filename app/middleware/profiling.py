@@ -0,0 +1,247 @@
+"""
+Профилирование отдельных запросов по требованию.
+
+Включается PROFILE_ENABLED=1. Дальше запрос профилируется, если:
+- заголовок X-Profile совпадает с PROFILE_SECRET — детерминированно (cProfile,
+  файл .prof для pstats/snakeviz), имя файла возвращается в X-Profile-File;
+  такой профиль в процессе одновременно только один, остальные запросы с
+  заголовком в это время обслуживаются без профиля и без X-Profile-File;
+- или он попал в выборку PROFILE_SAMPLE_RATE — сэмплирующим профайлером
+  (файл .collapsed: `стек;через;точку N` для flamegraph).
+
+Файлы пишутся в PROFILE_DIR, хранятся последние PROFILE_MAX_FILES.
+Выключенный профайлер стоит одну проверку атрибута на запрос.
+"""
+
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Callable
+from contextvars import ContextVar
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Профиль текущего запроса; sync-обработчики в пуле потоков видят его через контекст
+_active: ContextVar["RequestProfile | None"] = ContextVar("request_profile", default=None)
+
+# cProfile в потоке event loop — один на процесс: второй enable() вытеснил бы первый
+# (а в 3.12+ упал бы с ValueError), поэтому параллельный запрос идёт без профиля
+_loop_profile = threading.Lock()
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+class StackSampler(threading.Thread):
+    """Раз в interval секунд снимает стеки заданных потоков (sys._current_frames)."""
+
+    def __init__(self, interval: float = 0.005) -> None:
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.thread_ids: set[int] = set()
+        self.stacks: Counter[str] = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in tuple(self.thread_ids):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame: FrameType | None) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def stop(self) -> str:
+        self._stop_event.set()
+        self.join()
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfile:
+    """
+    Профиль одного запроса: поток event loop плюс потоки пула, где шёл обработчик.
+    cProfile в потоке event loop видит и конкурентные запросы, попавшие на await.
+    """
+
+    def __init__(self, deterministic: bool, sample_interval: float) -> None:
+        self.deterministic = deterministic
+        self.profiles: list[cProfile.Profile] = []
+        self.sampler = None if deterministic else StackSampler(sample_interval)
+
+    def start(self) -> None:
+        if self.sampler is not None:
+            self.sampler.thread_ids.add(threading.get_ident())
+            self.sampler.start()
+        else:
+            profile = cProfile.Profile()
+            self.profiles.append(profile)
+            profile.enable()
+
+    def run_in_worker(self, call: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if self.sampler is not None:
+            ident = threading.get_ident()
+            self.sampler.thread_ids.add(ident)
+            try:
+                return call(*args, **kwargs)
+            finally:
+                self.sampler.thread_ids.discard(ident)
+
+        # у cProfile свой стек вызовов — на каждый поток отдельный Profile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 3.12+: cProfile построен на sys.monitoring — профайлер один на
+            # интерпретатор, и профиль потока event loop уже видит вызовы всех потоков
+            return call(*args, **kwargs)
+        self.profiles.append(profile)
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profile.disable()
+
+    def finish(self, path: Path) -> Path:
+        if self.sampler is not None:
+            path = path.with_name(f"{path.name}.collapsed")
+            path.write_text(self.sampler.stop(), encoding="utf-8")
+            return path
+
+        self.profiles[0].disable()
+        stats = pstats.Stats(self.profiles[0])
+        for extra in self.profiles[1:]:
+            stats.add(extra)
+        path = path.with_name(f"{path.name}.prof")
+        stats.dump_stats(path)
+        return path
+
+
+def run_profiled(call: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Вызов sync-обработчика в пуле потоков; профилирует, если запрос профилируется."""
+    profile = _active.get()
+    if profile is None:
+        return call(*args, **kwargs)
+    return profile.run_in_worker(call, *args, **kwargs)
+
+
+class ProfileRing:
+    """Каталог с ограниченным числом файлов профилей: старые удаляются."""
+
+    def __init__(self, directory: Path, max_files: int) -> None:
+        self.directory = directory
+        self.max_files = max_files
+        self.files: deque[Path] = deque()
+        if directory.is_dir():
+            existing = [p for p in directory.iterdir() if p.suffix in {".prof", ".collapsed"}]
+            self.files.extend(sorted(existing, key=lambda p: p.stat().st_mtime))
+
+    def path_for(self, scope: Scope) -> Path:
+        """Имя по шаблону маршрута (если роутинг уже прошёл) или по пути."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        route = getattr(scope.get("route"), "path", None) or scope["path"]
+        name = _UNSAFE.sub("_", f"{scope['method']}{route}").strip("_")[:80]
+        return self.directory / f"{time.time_ns()}-{name}"
+
+    def add(self, path: Path) -> None:
+        self.files.append(path)
+        while len(self.files) > self.max_files:
+            self.files.popleft().unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Профилирование запросов по секретному заголовку или по выборке."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        enabled: bool | None = None,
+        secret: str | None = None,
+        sample_rate: float | None = None,
+        directory: str | None = None,
+        max_files: int | None = None,
+        sample_interval: float = 0.005,
+    ) -> None:
+        self.app = app
+        if enabled is None:
+            enabled = os.getenv("PROFILE_ENABLED", "0") == "1"
+        self.enabled = enabled
+        self.secret = secret if secret is not None else os.getenv("PROFILE_SECRET", "")
+        if sample_rate is None:
+            sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.sample_rate = sample_rate
+        if directory is None:
+            default_dir = Path(tempfile.gettempdir()) / "okr-profiles"
+            directory = os.getenv("PROFILE_DIR", str(default_dir))
+        if max_files is None:
+            max_files = int(os.getenv("PROFILE_MAX_FILES", "50"))
+        self.ring = ProfileRing(Path(directory), max_files)
+        self.sample_interval = sample_interval
+
+    def _requested(self, scope: Scope) -> bool | None:
+        """True — cProfile по заголовку, False — сэмплинг по выборке, None — не профилировать."""
+        sent = Headers(scope=scope).get("x-profile")
+        if sent is not None and self.secret and hmac.compare_digest(sent, self.secret):
+            return True
+        if self.sample_rate and random.random() < self.sample_rate:  # noqa: S311
+            return False
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deterministic = self._requested(scope)
+        if deterministic is None:
+            await self.app(scope, receive, send)
+            return
+
+        if deterministic and not _loop_profile.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(deterministic, self.sample_interval)
+        path: Path | None = None
+
+        async def send_with_name(message: Message) -> None:
+            nonlocal path
+            if deterministic and message["type"] == "http.response.start":
+                path = self.ring.path_for(scope)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-profile-file", f"{path.name}.prof".encode()),
+                ]
+            await send(message)
+
+        token = _active.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_name)
+        finally:
+            _active.reset(token)
+            try:
+                self.ring.add(profile.finish(path or self.ring.path_for(scope)))
+            finally:
+                if deterministic:
+                    _loop_profile.release()
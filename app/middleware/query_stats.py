@@ -0,0 +1,67 @@
+import logging
+import os
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .. import metrics
+from ..db import QueryStats, collect_queries
+
+logger = logging.getLogger("access")
+
+
+class QueryStatsMiddleware:
+    """
+    Считает SQL-выражения запроса (хуки engine в app.db) и отдаёт их в заголовке
+    `Server-Timing: db;dur=<мс>;desc="<N> statements"`. В счёт идёт всё,
+    выполненное до заголовков ответа; стриминговое тело (/objectives/export)
+    читает пачками намеренно и не учитывается.
+
+    Одна и та же форма выражения repeat_threshold и более раз (QUERY_REPEAT_THRESHOLD,
+    по умолчанию 3) — вероятный N+1: warning в access-лог и
+    db_repeated_statements_total{route}.
+    """
+
+    def __init__(self, app: ASGIApp, repeat_threshold: int | None = None) -> None:
+        self.app = app
+        if repeat_threshold is None:
+            repeat_threshold = int(os.getenv("QUERY_REPEAT_THRESHOLD", "3"))
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_queries() as stats:
+
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    timing = f'db;dur={stats.seconds * 1000:.3f};desc="{stats.count} statements"'
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"server-timing", timing.encode()),
+                    ]
+                    self._observe(scope, stats)
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+    def _observe(self, scope: Scope, stats: QueryStats) -> None:
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        metrics.DB_STATEMENTS.observe(stats.count, route)
+        repeated = stats.repeated(self.repeat_threshold)
+        if not repeated:
+            return
+        metrics.DB_REPEATED_STATEMENTS.inc(route)
+        for shape, times in repeated.items():
+            logger.warning(
+                f"{scope['method']} {scope['path']}: statement repeated {times}x",
+                extra={
+                    "request_id": (scope.get("state") or {}).get("request_id"),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route,
+                    "statement": shape[:200],
+                    "repeats": times,
+                },
+            )
@@ -0,0 +1,71 @@
+import os
+from collections import OrderedDict
+
+
+class RateRule:
+    """Лимит «limit запросов за window секунд» в виде token bucket."""
+
+    __slots__ = ("name", "capacity", "rate")
+
+    def __init__(self, name: str, limit: int, window_seconds: float) -> None:
+        self.name = name
+        self.capacity = float(limit)
+        self.rate = limit / window_seconds  # токенов в секунду
+
+    @classmethod
+    def from_env(cls, name: str, var: str) -> "RateRule | None":
+        """Читает правило вида `30/60` (30 запросов за 60 с) из окружения."""
+        raw = os.getenv(var, "").strip()
+        if not raw:
+            return None
+        limit, _, window = raw.partition("/")
+        return cls(name, int(limit), float(window or 1))
+
+
+class TokenBucketLimiter:
+    """
+    In-memory token bucket: O(1) на запрос, фиксированный размер на ключ.
+
+    Для каждого ключа хранится только [tokens, last_refill, idle_after].
+    Простаивающие ключи (ведро успело бы наполниться целиком) удаляются
+    амортизированно — не чаще раза в sweep_interval секунд (по тем же часам
+    now, что передаются в take); при наплыве уникальных IP сверх max_keys
+    вытесняется ключ, к которому дольше всех не обращались (LRU), — поток
+    новых адресов не сбрасывает вёдра активно ограничиваемых клиентов.
+    """
+
+    def __init__(self, max_keys: int = 100_000, sweep_interval: float = 60.0) -> None:
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+        self.buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self._next_sweep: float | None = None
+
+    def take(self, key: str, rule: RateRule, now: float) -> float:
+        """Списывает токен. 0 — запрос разрешён, иначе сколько секунд ждать."""
+        if self._next_sweep is None:
+            self._next_sweep = now + self.sweep_interval
+        elif now >= self._next_sweep:
+            self.sweep(now)
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_keys:
+                self.buckets.popitem(last=False)
+            self.buckets[key] = [rule.capacity - 1, now, rule.capacity / rule.rate]
+            return 0.0
+        self.buckets.move_to_end(key)
+
+        tokens = min(rule.capacity, bucket[0] + (now - bucket[1]) * rule.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / rule.rate
+
+    def sweep(self, now: float) -> None:
+        """Удаляет ключи, чьи вёдра уже полные — они неотличимы от отсутствующих."""
+        self._next_sweep = now + self.sweep_interval
+        idle = [k for k, b in self.buckets.items() if now - b[1] >= b[2]]
+        for key in idle:
+            del self.buckets[key]
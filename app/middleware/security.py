@@ -1,11 +1,12 @@
 import hmac
 import json
 import os
-from collections.abc import Awaitable, Callable
-from typing import Any
 
-from fastapi import Request, Response, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import Response, status
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .. import metrics
 
 PROBLEM = "application/problem+json"
 
@@ -25,29 +26,32 @@ def _problem_response(status_code: int, title: str, detail: str) -> Response:
     )
 
 
-class ApiKeyGateMiddleware(BaseHTTPMiddleware):
+class ApiKeyGateMiddleware:
     """
     Требует X-API-Key для модифицирующих запросов, если ключ задан.
-    Ключ берётся из request.app.state.API_EDGE_KEY или окружения API_EDGE_KEY.
+    Ключ берётся из app.state.API_EDGE_KEY или окружения API_EDGE_KEY.
     OPTIONS/GET пропускаются.
     """
 
     WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
 
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: Callable[[Request], Awaitable[Response]],
-    ) -> Response:
-        cfg_key = getattr(request.app.state, "API_EDGE_KEY", None) or os.getenv("API_EDGE_KEY")
-
-        # Пропускаем GET, OPTIONS и если ключ не задан
-        if not cfg_key or request.method not in self.WRITE_METHODS:
-            return await call_next(request)
-        if request.method == "OPTIONS":
-            return await call_next(request)
-
-        sent = request.headers.get("x-api-key")
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in self.WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        state = getattr(scope.get("app"), "state", None)
+        cfg_key = getattr(state, "API_EDGE_KEY", None) or os.getenv("API_EDGE_KEY")
+
+        # Пропускаем, если ключ не задан
+        if not cfg_key:
+            await self.app(scope, receive, send)
+            return
+
+        sent = Headers(scope=scope).get("x-api-key")
         ok = sent is not None and hmac.compare_digest(sent, cfg_key)
         if not ok:
             resp = _problem_response(
@@ -56,36 +60,45 @@ class ApiKeyGateMiddleware(BaseHTTPMiddleware):
                 detail="Missing or invalid X-API-Key.",
             )
             resp.headers["WWW-Authenticate"] = "ApiKey"
-            return resp
+            metrics.rejected("api_key", status.HTTP_401_UNAUTHORIZED)
+            await resp(scope, receive, send)
+            return
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
 
 
-class HSTSMiddleware(BaseHTTPMiddleware):
+class HSTSMiddleware:
     """Добавляет Strict-Transport-Security."""
 
     def __init__(
         self,
-        app: Any,
+        app: ASGIApp,
         max_age: int | None = None,
         include_subdomains: bool = True,
         preload: bool = False,
     ) -> None:
-        super().__init__(app)
+        self.app = app
         self.max_age = max_age or int(os.getenv("HSTS_MAX_AGE", "15552000"))  # ~180 дней
         self.include_subdomains = include_subdomains
         self.preload = preload
 
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: Callable[[Request], Awaitable[Response]],
-    ) -> Response:
-        response = await call_next(request)
         parts = [f"max-age={self.max_age}"]
         if self.include_subdomains:
             parts.append("includeSubDomains")
         if self.preload:
             parts.append("preload")
-        response.headers["Strict-Transport-Security"] = "; ".join(parts)
-        return response
+        # значение заголовка одинаково для всех ответов — собираем один раз
+        self.header_value = "; ".join(parts)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_hsts(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["Strict-Transport-Security"] = self.header_value
+            await send(message)
+
+        await self.app(scope, receive, send_with_hsts)
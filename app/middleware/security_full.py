@@ -1,11 +1,17 @@
+import asyncio
 import json
+import math
+import os
+import re
 import time
-from collections import defaultdict
-from collections.abc import Awaitable, Callable
-from typing import Any
 
-from fastapi import Request, Response, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import Response, status
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .. import metrics
+from .ratelimit import RateRule
+from .state import StateBackend, get_state_backend
 
 PROBLEM = "application/problem+json"
 
@@ -35,43 +41,67 @@ def _problem(status_code: int, title: str, detail: str) -> Response:
 # ============================================================
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """
-    Простой per-IP лимитер:
-    - A1: защищает POST/PUT/DELETE от флуда
-    - A3: ограничивает количество GET /objectives/{id} для анти-сканирования
+    Per-IP лимитер (token bucket, O(1) на запрос):
+    - общий лимит на все запросы (max_requests за window_seconds);
+    - A1: отдельный лимит для POST/PUT/PATCH/DELETE против флуда (RATE_LIMIT_WRITE);
+    - A3: отдельный лимит на GET /objectives/{id} против перебора id (RATE_LIMIT_ENUM).
+    Формат переменных окружения: `limit/window_seconds`, например `30/60`.
     """
 
+    WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+    ENUMERATION_PATH = re.compile(r"/objectives/\d+")
+
     def __init__(
         self,
-        app: Any,
+        app: ASGIApp,
         max_requests: int = 1_000_000,  # ПРосто пример чтобы работало
         window_seconds: float = 0.01,
+        write_rule: RateRule | None = None,
+        enumeration_rule: RateRule | None = None,
+        backend: StateBackend | None = None,
     ):
-        super().__init__(app)
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        self.bucket = defaultdict(list)
-
-    async def dispatch(
-        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
-    ) -> Response:
-
-        ip = request.client.host
-        now = time.time()
-
-        bucket = [t for t in self.bucket[ip] if now - t < self.window_seconds]
-        bucket.append(now)
-        self.bucket[ip] = bucket
-
-        if len(bucket) > self.max_requests:
-            return _problem(
+        self.app = app
+        self.default_rule = RateRule("all", max_requests, window_seconds)
+        self.write_rule = write_rule or RateRule.from_env("write", "RATE_LIMIT_WRITE")
+        self.enumeration_rule = enumeration_rule or RateRule.from_env("enum", "RATE_LIMIT_ENUM")
+        self.backend = backend or get_state_backend()
+
+    def _extra_rule(self, scope: Scope) -> RateRule | None:
+        method = scope["method"]
+        if method in self.WRITE_METHODS:
+            return self.write_rule
+        if method == "GET" and self.ENUMERATION_PATH.fullmatch(scope["path"]):
+            return self.enumeration_rule
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        ip = client[0] if client else ""
+        now = time.time()  # общие часы для всех воркеров
+
+        wait = await self.backend.take_async(ip, self.default_rule, now)
+        rule = self._extra_rule(scope)
+        if not wait and rule is not None:
+            wait = await self.backend.take_async(f"{rule.name}:{ip}", rule, now)
+
+        if wait:
+            response = _problem(
                 status.HTTP_429_TOO_MANY_REQUESTS,
                 "Too Many Requests",
                 "Rate limit exceeded.",
             )
+            response.headers["Retry-After"] = str(math.ceil(wait))
+            metrics.rejected("rate_limit", status.HTTP_429_TOO_MANY_REQUESTS)
+            await response(scope, receive, send)
+            return
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
 
 
 # ============================================================
@@ -79,37 +109,87 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
 # ============================================================
 
 
-class IdempotencyKeyMiddleware(BaseHTTPMiddleware):
+class IdempotencyKeyMiddleware:
     """
     Реализация идемпотентности POST-запросов:
     - Если клиент отправляет Idempotency-Key,
-      повторный запрос вернет тот же результат.
+      повторный запрос вернет тот же результат (в течение ttl_seconds).
+    - Конкурентный запрос с тем же ключом ждёт завершения первого и получает
+      его ответ, а не создаёт объект второй раз (в пределах процесса).
+    - Ответы 5xx не сохраняются: повтор после сбоя выполняется заново.
+    Ключ действует в рамках пути: один и тот же ключ на /objectives и
+    /key_results — разные операции.
     """
 
-    def __init__(self, app: Any):
-        super().__init__(app)
-        self.cache: dict[str, tuple[bytes, int, str]] = {}
-
-    async def dispatch(
-        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
-    ) -> Response:
-
-        if request.method != "POST":
-            return await call_next(request)
-
-        key = request.headers.get("Idempotency-Key")
-        if not key:
-            return await call_next(request)
-
-        # если ключ уже был — вернуть тот же ответ
-        if key in self.cache:
-            body, status_code, media = self.cache[key]
-            return Response(content=body, status_code=status_code, media_type=media)
-
-        # выполнить запрос и сохранить результат
-        response = await call_next(request)
-        self.cache[key] = (response.body, response.status_code, response.media_type)
-        return response
+    def __init__(
+        self,
+        app: ASGIApp,
+        backend: StateBackend | None = None,
+        ttl_seconds: float | None = None,
+        max_body_bytes: int = 1024 * 1024,
+    ):
+        self.app = app
+        self.backend = backend or get_state_backend()
+        self.ttl_seconds = ttl_seconds or float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+        self.max_body_bytes = max_body_bytes
+        self.inflight: dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        raw_key = Headers(scope=scope).get("Idempotency-Key")
+        if not raw_key:
+            await self.app(scope, receive, send)
+            return
+        key = f"{scope['path']}:{raw_key}"
+
+        # слот inflight занимается до первого await: иначе два запроса с одним
+        # ключом оба промахнулись бы мимо хранилища (у blocking-бэкенда поиск
+        # уходит в поток) и оба выполнили бы обработчик
+        while (pending := self.inflight.get(key)) is not None:
+            await pending.wait()
+        done = self.inflight[key] = asyncio.Event()
+        try:
+            # если ключ уже был — вернуть тот же ответ
+            cached = await self.backend.get_response_async(key, time.time())
+            if cached is not None:
+                body, cached_status, cached_media = cached
+                response = Response(body, status_code=cached_status, media_type=cached_media)
+                response.headers["Idempotent-Replayed"] = "true"
+                await response(scope, receive, send)
+                return
+            await self._run_and_store(key, scope, receive, send)
+        finally:
+            del self.inflight[key]
+            done.set()
+
+    async def _run_and_store(self, key: str, scope: Scope, receive: Receive, send: Send) -> None:
+        # тело собираем из потока send; слишком большое не копим
+        status_code = 500
+        media: str | None = None
+        chunks: list[bytes] | None = []
+        size = 0
+
+        async def send_capture(message: Message) -> None:
+            nonlocal status_code, media, chunks, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                media = Headers(raw=message.get("headers", [])).get("content-type")
+            elif message["type"] == "http.response.body" and chunks is not None:
+                body = message.get("body", b"")
+                size += len(body)
+                if size > self.max_body_bytes:
+                    chunks = None
+                else:
+                    chunks.append(body)
+            await send(message)
+
+        await self.app(scope, receive, send_capture)
+        if chunks is not None and status_code < 500:
+            response = (b"".join(chunks), status_code, media)
+            await self.backend.put_response_async(key, response, time.time(), self.ttl_seconds)
 
 
 # ============================================================
@@ -117,29 +197,32 @@ class IdempotencyKeyMiddleware(BaseHTTPMiddleware):
 # ============================================================
 
 
-class TrustedHostMiddleware(BaseHTTPMiddleware):
+class TrustedHostMiddleware:
     """
     Защита от Host-header injection:
     - Запрещаем неизвестные Host.
     """
 
-    def __init__(self, app: Any, allowed_hosts: list[str]):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, allowed_hosts: list[str]):
+        self.app = app
         self.allowed = allowed_hosts
 
-    async def dispatch(
-        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
-    ) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        host = request.headers.get("host", "")
-        if not any(host.endswith(allowed) for allowed in self.allowed):
-            return _problem(
+        host = Headers(scope=scope).get("host", "")
+        if not host.endswith(tuple(self.allowed)):
+            metrics.rejected("trusted_host", status.HTTP_400_BAD_REQUEST)
+            await _problem(
                 status.HTTP_400_BAD_REQUEST,
                 "Bad Request",
                 f"Untrusted Host: {host}",
-            )
+            )(scope, receive, send)
+            return
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
 
 
 # ============================================================
@@ -147,21 +230,25 @@ class TrustedHostMiddleware(BaseHTTPMiddleware):
 # ============================================================
 
 
-class AuthZMiddleware(BaseHTTPMiddleware):
+class AuthZMiddleware:
     WRITE_METHODS = {"DELETE", "PUT"}
 
-    async def dispatch(self, request: Request, call_next):
-
-        if request.headers.get("host", "") == "testserver":
-            return await call_next(request)
-
-        if request.method in self.WRITE_METHODS:
-            user = request.headers.get("X-User-Id")
-            if not user:
-                return _problem(
-                    status.HTTP_401_UNAUTHORIZED,
-                    "Unauthorized",
-                    "X-User-Id required for destructive actions.",
-                )
-
-        return await call_next(request)
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in self.WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if headers.get("host", "") != "testserver" and not headers.get("X-User-Id"):
+            metrics.rejected("authz", status.HTTP_401_UNAUTHORIZED)
+            await _problem(
+                status.HTTP_401_UNAUTHORIZED,
+                "Unauthorized",
+                "X-User-Id required for destructive actions.",
+            )(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,327 @@
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from functools import lru_cache
+from typing import Any, TypeVar
+
+import anyio.to_thread
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    bindparam,
+    case,
+    create_engine,
+    delete,
+    event,
+    func,
+    literal_column,
+    select,
+)
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import ClauseElement, ColumnElement
+
+from .ratelimit import RateRule, TokenBucketLimiter
+
+# (body, status_code, content-type) — то, что IdempotencyKeyMiddleware отдаёт повторно
+CachedResponse = tuple[bytes, int, str | None]
+
+T = TypeVar("T")
+
+
+class StateBackend(ABC):
+    """
+    Хранилище состояния RateLimit- и IdempotencyKey-middleware.
+
+    В памяти процесса (по умолчанию) лимиты считаются на воркер; для
+    `uvicorn --workers N` или нескольких контейнеров на одном хосте нужен
+    общий бэкенд, иначе каждый лимит фактически умножается на N.
+
+    Middleware вызывают *_async-обёртки: у бэкенда с blocking = True (файл,
+    сеть) вызов уходит в пул потоков и не останавливает event loop.
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def take(self, key: str, rule: RateRule, now: float) -> float:
+        """Списывает токен. 0 — запрос разрешён, иначе сколько секунд ждать."""
+
+    @abstractmethod
+    def get_response(self, key: str, now: float) -> CachedResponse | None:
+        """Сохранённый ответ, если он есть и ещё не истёк."""
+
+    @abstractmethod
+    def put_response(self, key: str, response: CachedResponse, now: float, ttl: float) -> None:
+        """Сохраняет ответ на ttl секунд; живой ответ с тем же ключом не перезаписывается."""
+
+    async def _call(self, fn: Callable[..., T], *args: Any) -> T:
+        if self.blocking:
+            return await anyio.to_thread.run_sync(fn, *args)
+        return fn(*args)
+
+    async def take_async(self, key: str, rule: RateRule, now: float) -> float:
+        return await self._call(self.take, key, rule, now)
+
+    async def get_response_async(self, key: str, now: float) -> CachedResponse | None:
+        return await self._call(self.get_response, key, now)
+
+    async def put_response_async(
+        self, key: str, response: CachedResponse, now: float, ttl: float
+    ) -> None:
+        await self._call(self.put_response, key, response, now, ttl)
+
+
+class ResponseStore:
+    """
+    LRU-хранилище идемпотентных ответов с TTL и учётом занятых байт.
+
+    Размер записи — длина тела и ключа; при превышении max_bytes вытесняются
+    самые давно использованные записи. Ответы крупнее max_entry_bytes не
+    хранятся вовсе.
+    """
+
+    ENTRY_OVERHEAD = 128  # кортеж, int, строка content-type
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_entry_bytes: int = 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.bytes = 0
+        self._entries: OrderedDict[str, tuple[float, CachedResponse, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, now: float) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, response, _ = entry
+        if expires <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def put(self, key: str, response: CachedResponse, expires: float, now: float) -> None:
+        size = len(response[0]) + len(key) + self.ENTRY_OVERHEAD
+        if size > self.max_entry_bytes or self.get(key, now) is not None:
+            return
+        self._entries[key] = (expires, response, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        self.bytes -= self._entries.pop(key)[2]
+
+
+class MemoryStateBackend(StateBackend):
+    """Состояние в памяти одного процесса; вызовы — микросекунды, прямо в event loop."""
+
+    def __init__(
+        self,
+        limiter: TokenBucketLimiter | None = None,
+        responses: ResponseStore | None = None,
+    ) -> None:
+        self.limiter = limiter or TokenBucketLimiter()
+        self.responses = responses or ResponseStore()
+
+    def take(self, key: str, rule: RateRule, now: float) -> float:
+        return self.limiter.take(key, rule, now)
+
+    def get_response(self, key: str, now: float) -> CachedResponse | None:
+        return self.responses.get(key, now)
+
+    def put_response(self, key: str, response: CachedResponse, now: float, ttl: float) -> None:
+        self.responses.put(key, response, now + ttl, now)
+
+
+_metadata = MetaData()
+
+rate_buckets = Table(
+    "rate_buckets",
+    _metadata,
+    Column("key", String, primary_key=True),
+    Column("tokens", Float, nullable=False),
+    Column("last", Float, nullable=False),
+    Column("idle_after", Float, nullable=False),
+    Column("allowed", Integer, nullable=False),
+)
+
+idempotency_responses = Table(
+    "idempotency_responses",
+    _metadata,
+    Column("key", String, primary_key=True),
+    Column("status_code", Integer, nullable=False),
+    Column("media_type", String, nullable=True),
+    Column("body", LargeBinary, nullable=False),
+    Column("expires", Float, nullable=False),
+)
+
+
+def _take_statement() -> ClauseElement:
+    """Upsert токен-бакета одним выражением ... RETURNING."""
+    b = rate_buckets.c
+    capacity = bindparam("capacity", type_=Float)
+    rate = bindparam("rate", type_=Float)
+    now = bindparam("now", type_=Float)
+    one: ColumnElement[int] = literal_column("1")
+    zero: ColumnElement[int] = literal_column("0")
+    refilled = func.min(capacity, b.tokens + (now - b.last) * rate)
+    return (
+        sqlite_insert(rate_buckets)
+        .values(
+            key=bindparam("key"),
+            tokens=capacity - one,
+            last=now,
+            idle_after=capacity / rate,
+            allowed=one,
+        )
+        .on_conflict_do_update(
+            index_elements=[b.key],
+            set_={
+                "tokens": refilled - case((refilled >= one, one), else_=zero),
+                "last": now,
+                "allowed": case((refilled >= one, one), else_=zero),
+            },
+        )
+        .returning(b.tokens, b.allowed)
+    )
+
+
+def _compiled(stmt: ClauseElement) -> str:
+    """
+    SQL, один раз сгенерированный SQLAlchemy (с именованными bind-параметрами).
+    upsert с ON CONFLICT не попадает в кэш компиляции SQLAlchemy, и сборка
+    выражения стоила бы ~1 мс на запрос — больше, чем сам запрос к SQLite.
+    """
+    return str(stmt.compile(dialect=sqlite.dialect(paramstyle="named")))
+
+
+_TAKE = _compiled(_take_statement())
+
+
+def _put_response_statement() -> ClauseElement:
+    """Insert; истёкшую запись с тем же ключом заменяет, живую — нет."""
+    r = idempotency_responses.c
+    values = {
+        "status_code": bindparam("status_code"),
+        "media_type": bindparam("media_type"),
+        "body": bindparam("body"),
+        "expires": bindparam("expires", type_=Float),
+    }
+    return (
+        sqlite_insert(idempotency_responses)
+        .values(key=bindparam("key"), **values)
+        .on_conflict_do_update(
+            index_elements=[r.key],
+            set_=values,
+            where=r.expires <= bindparam("now", type_=Float),
+        )
+    )
+
+
+_PUT_RESPONSE = _compiled(_put_response_statement())
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Общее состояние в локальном SQLite-файле (WAL): корректные глобальные
+    лимиты для всех воркеров и контейнеров, которые видят один файл.
+
+    Каждая операция — один атомарный upsert ... RETURNING в autocommit,
+    без явных блокировок и read-modify-write в Python. Идемпотентные ответы
+    лежат в файле и переживают рестарт приложения.
+
+    Запрос к файлу может ждать блокировку (busy_timeout), поэтому
+    middleware выполняют операции в пуле потоков (blocking = True).
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, sweep_interval: float = 60.0) -> None:
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self.engine = self._make_engine(path)
+        _metadata.create_all(self.engine)
+
+    @staticmethod
+    def _make_engine(path: str) -> Engine:
+        engine = create_engine(f"sqlite:///{path}", isolation_level="AUTOCOMMIT")
+
+        @event.listens_for(engine, "connect")
+        def _pragmas(dbapi_conn, _record):  # type: ignore[no-untyped-def]
+            cursor = dbapi_conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.close()
+
+        return engine
+
+    def take(self, key: str, rule: RateRule, now: float) -> float:
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        params = {"key": key, "capacity": rule.capacity, "rate": rule.rate, "now": now}
+        with self.engine.connect() as conn:
+            tokens, allowed = conn.exec_driver_sql(_TAKE, params).one()
+        return 0.0 if allowed else (1 - float(tokens)) / rule.rate
+
+    def sweep(self, now: float) -> None:
+        """
+        Удаляет полные (простаивающие) вёдра и истёкшие ответы;
+        раз в sweep_interval на процесс.
+        """
+        self._next_sweep = now + self.sweep_interval
+        b = rate_buckets.c
+        r = idempotency_responses.c
+        with self.engine.connect() as conn:
+            conn.execute(delete(rate_buckets).where(now - b.last >= b.idle_after))
+            conn.execute(delete(idempotency_responses).where(r.expires <= now))
+
+    def get_response(self, key: str, now: float) -> CachedResponse | None:
+        r = idempotency_responses.c
+        stmt = select(r.body, r.status_code, r.media_type).where(r.key == key, r.expires > now)
+        with self.engine.connect() as conn:
+            row = conn.execute(stmt).first()
+        return None if row is None else (row.body, row.status_code, row.media_type)
+
+    def put_response(self, key: str, response: CachedResponse, now: float, ttl: float) -> None:
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        body, status_code, media_type = response
+        params = {
+            "key": key,
+            "status_code": status_code,
+            "media_type": media_type,
+            "body": body,
+            "expires": now + ttl,
+            "now": now,
+        }
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql(_PUT_RESPONSE, params)
+
+
+@lru_cache(maxsize=1)
+def get_state_backend() -> StateBackend:
+    """
+    Общий для всех middleware бэкенд, выбирается STATE_BACKEND (memory|sqlite).
+    Файл — STATE_DB_PATH; по умолчанию во временном каталоге (tmpfs в контейнере).
+    """
+    kind = os.getenv("STATE_BACKEND", "memory").lower()
+    if kind == "sqlite":
+        default_path = os.path.join(tempfile.gettempdir(), "okr-state.db")
+        return SQLiteStateBackend(os.getenv("STATE_DB_PATH", default_path))
+    return MemoryStateBackend()
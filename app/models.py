@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import DDL, Boolean, Column, ForeignKey, Integer, String, event
 from sqlalchemy.orm import relationship
 
 from .db import Base
@@ -11,17 +11,127 @@ class ObjectiveDB(Base):
     title = Column(String, nullable=False)
     description = Column(String, nullable=True)
     isComplete = Column(Boolean, default=False)
+    # растёт при любой записи в цель или её key results (VERSION_TRIGGERS) — основа ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
-    key_results = relationship("KeyResultDB", back_populates="objective", cascade="all, delete")
+    # детей удаляет ON DELETE CASCADE в БД, ORM их не загружает
+    key_results = relationship(
+        "KeyResultDB", back_populates="objective", cascade="all, delete", passive_deletes=True
+    )
 
 
 class KeyResultDB(Base):
     __tablename__ = "key_results"
 
     id = Column(Integer, primary_key=True, index=True)
-    objective_id = Column(Integer, ForeignKey("objectives.id", ondelete="CASCADE"))
+    objective_id = Column(Integer, ForeignKey("objectives.id", ondelete="CASCADE"), index=True)
     title = Column(String, nullable=False)
     target_value = Column(Integer, nullable=False)
     current_value = Column(Integer, default=0)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     objective = relationship("ObjectiveDB", back_populates="key_results")
+
+
+class ObjectiveProgressDB(Base):
+    """Суммы по key results цели; ведутся триггерами ниже, в той же транзакции."""
+
+    __tablename__ = "objective_progress"
+
+    objective_id = Column(
+        Integer, ForeignKey("objectives.id", ondelete="CASCADE"), primary_key=True
+    )
+    target_total = Column(Integer, nullable=False, default=0)
+    current_total = Column(Integer, nullable=False, default=0)
+    kr_count = Column(Integer, nullable=False, default=0)
+
+
+class TableVersionDB(Base):
+    """Счётчик изменений таблицы целиком — ETag для списков без чтения строк."""
+
+    __tablename__ = "table_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# Триггеры, а не ORM-события: bulk-пути (executemany INSERT/UPDATE) ORM не видит.
+# Ставятся вместе с таблицей objective_progress; для старых БД — app.schema.
+_ADD_KR = """
+    INSERT INTO objective_progress (objective_id, target_total, current_total, kr_count)
+    SELECT NEW.objective_id, NEW.target_value, COALESCE(NEW.current_value, 0), 1
+    WHERE NEW.objective_id IS NOT NULL
+    ON CONFLICT (objective_id) DO UPDATE SET
+        target_total = target_total + excluded.target_total,
+        current_total = current_total + excluded.current_total,
+        kr_count = kr_count + 1;
+"""
+_REMOVE_KR = """
+    UPDATE objective_progress SET
+        target_total = target_total - OLD.target_value,
+        current_total = current_total - COALESCE(OLD.current_value, 0),
+        kr_count = kr_count - 1
+    WHERE objective_id = OLD.objective_id;
+"""
+PROGRESS_TRIGGERS = {
+    "key_results_progress_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS key_results_progress_insert
+        AFTER INSERT ON key_results BEGIN {_ADD_KR} END""",
+    "key_results_progress_update": f"""
+        CREATE TRIGGER IF NOT EXISTS key_results_progress_update
+        AFTER UPDATE OF objective_id, target_value, current_value ON key_results
+        BEGIN {_REMOVE_KR} {_ADD_KR} END""",
+    "key_results_progress_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS key_results_progress_delete
+        AFTER DELETE ON key_results BEGIN {_REMOVE_KR} END""",
+    "objectives_progress_delete": """
+        CREATE TRIGGER IF NOT EXISTS objectives_progress_delete
+        AFTER DELETE ON objectives BEGIN
+            DELETE FROM objective_progress WHERE objective_id = OLD.id;
+        END""",
+}
+
+for _ddl in PROGRESS_TRIGGERS.values():
+    event.listen(ObjectiveProgressDB.__table__, "after_create", DDL(_ddl))
+
+
+# Версии строк и таблицы objectives. UPDATE OF перечисляет колонки данных,
+# поэтому собственное обновление version триггеры повторно не запускает.
+_BUMP_OBJECTIVES = """
+    INSERT INTO table_versions (name, version) VALUES ('objectives', 1)
+    ON CONFLICT (name) DO UPDATE SET version = version + 1;
+"""
+_BUMP_OBJECTIVE_ROW = "UPDATE objectives SET version = version + 1 WHERE id = NEW.id;"
+VERSION_TRIGGERS = {
+    "objectives_version_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS objectives_version_insert
+        AFTER INSERT ON objectives BEGIN {_BUMP_OBJECTIVES} END""",
+    "objectives_version_update": f"""
+        CREATE TRIGGER IF NOT EXISTS objectives_version_update
+        AFTER UPDATE OF title, description, isComplete ON objectives
+        BEGIN {_BUMP_OBJECTIVE_ROW} {_BUMP_OBJECTIVES} END""",
+    "objectives_version_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS objectives_version_delete
+        AFTER DELETE ON objectives BEGIN {_BUMP_OBJECTIVES} END""",
+    "key_results_version_insert": """
+        CREATE TRIGGER IF NOT EXISTS key_results_version_insert
+        AFTER INSERT ON key_results BEGIN
+            UPDATE objectives SET version = version + 1 WHERE id = NEW.objective_id;
+        END""",
+    "key_results_version_update": """
+        CREATE TRIGGER IF NOT EXISTS key_results_version_update
+        AFTER UPDATE OF objective_id, title, target_value, current_value ON key_results BEGIN
+            UPDATE key_results SET version = version + 1 WHERE id = NEW.id;
+            UPDATE objectives SET version = version + 1
+            WHERE id IN (OLD.objective_id, NEW.objective_id);
+        END""",
+    "key_results_version_delete": """
+        CREATE TRIGGER IF NOT EXISTS key_results_version_delete
+        AFTER DELETE ON key_results BEGIN
+            UPDATE objectives SET version = version + 1 WHERE id = OLD.objective_id;
+        END""",
+}
+
+# после всех таблиц: триггеры ссылаются и на key_results, и на table_versions
+for _ddl in VERSION_TRIGGERS.values():
+    event.listen(Base.metadata, "after_create", DDL(_ddl))
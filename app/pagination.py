@@ -0,0 +1,92 @@
+"""
+Keyset-пагинация по первичному ключу.
+
+Страница — `WHERE id > :after ORDER BY id LIMIT :limit`, поэтому её стоимость не
+зависит от того, насколько далеко клиент пролистал таблицу. Тело ответа
+остаётся списком (старые клиенты его так и разбирают), а курсор следующей
+страницы отдаётся в заголовках `Link: <...>; rel="next"` и `X-Next-Cursor`.
+
+Запрос без limit и cursor — старый клиент, который ждёт всю коллекцию: он
+получает до LEGACY_PAGE_SIZE строк (PAGINATION_LEGACY_LIMIT, по умолчанию
+10000). Если строк больше, ответ обрезан и несёт те же Link/X-Next-Cursor,
+дальше листается обычными страницами по DEFAULT_PAGE_SIZE.
+"""
+
+import base64
+import binascii
+import os
+from collections.abc import Sequence
+from typing import Any, Protocol, TypeVar
+
+from fastapi import HTTPException, Query, Request, Response
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+LEGACY_PAGE_SIZE = int(os.getenv("PAGINATION_LEGACY_LIMIT", "10000"))
+
+
+class _HasId(Protocol):
+    id: Any
+
+
+T = TypeVar("T", bound=_HasId)
+
+
+class PageParams:
+    def __init__(self, limit: int, after: int | None) -> None:
+        self.limit = limit
+        self.after = after
+
+
+def encode_cursor(last_id: int) -> str:
+    """Непрозрачный курсор: клиенту не нужно знать, что внутри id."""
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, _, value = raw.partition(":")
+        if prefix != "id" or not value.isdigit():
+            raise ValueError(raw)
+        return int(value)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
+def page_params(
+    limit: int | None = Query(
+        None,
+        ge=1,
+        le=MAX_PAGE_SIZE,
+        description=f"Размер страницы, по умолчанию {DEFAULT_PAGE_SIZE}. "
+        f"Без limit и cursor — вся коллекция, но не больше {LEGACY_PAGE_SIZE} строк",
+    ),
+    cursor: str | None = Query(None, max_length=64),
+) -> PageParams:
+    if limit is None and not cursor:
+        return PageParams(LEGACY_PAGE_SIZE, None)
+    return PageParams(limit or DEFAULT_PAGE_SIZE, decode_cursor(cursor) if cursor else None)
+
+
+def keyset(query: Any, id_column: Any, page: PageParams) -> Any:
+    """Добавляет к ORM-запросу условие курсора, порядок и LIMIT (на 1 больше)."""
+    if page.after is not None:
+        query = query.filter(id_column > page.after)
+    return query.order_by(id_column).limit(page.limit + 1)
+
+
+def split_page(rows: Sequence[T], page: PageParams) -> tuple[list[T], str | None]:
+    """Строки страницы и курсор следующей (None — это последняя страница)."""
+    items = list(rows[: page.limit])
+    if len(rows) <= page.limit:
+        return items, None
+    return items, encode_cursor(items[-1].id)
+
+
+def set_next_link(request: Request, response: Response, next_cursor: str | None) -> None:
+    if next_cursor is None:
+        return
+    url = request.url.include_query_params(cursor=next_cursor)
+    response.headers["Link"] = f'<{url}>; rel="next"'
+    response.headers["X-Next-Cursor"] = next_cursor
@@ -1,33 +1,204 @@
 # app/routers/key_results.py
-from typing import Any, cast
+from functools import partial
+from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..db import get_db
+from ..cache import CachedBody, json_response, response_cache
+from ..db import get_async_db, get_db
+from ..metrics import InstrumentedRoute
 from ..models import KeyResultDB, ObjectiveDB
-from ..schemas import KeyResult, KeyResultCreate
+from ..pagination import PageParams, keyset, page_params, set_next_link, split_page
+from ..schemas import (
+    BULK_MAX_ITEMS,
+    BulkResult,
+    BulkRowError,
+    KeyResult,
+    KeyResultCreate,
+    ProgressBatchResult,
+    ProgressItemResult,
+    ProgressUpdate,
+)
+from ..serialization import RowSerializer
 
-router = APIRouter()
+# Как в objectives: общая логика `_...(db: Session, ...)`, два набора маршрутов
+router = APIRouter(route_class=InstrumentedRoute)
+async_router = APIRouter(route_class=InstrumentedRoute)
 
 
-@router.post("", response_model=KeyResult)
-def create_key_result(kr: KeyResultCreate, db: Session = Depends(get_db)) -> KeyResult:
-    """Создание нового KeyResult, связанного с Objective."""
-    if not db.query(ObjectiveDB).filter(ObjectiveDB.id == kr.objective_id).first():
-        raise HTTPException(status_code=404, detail="Objective not found")
-
+def _create_key_result(db: Session, kr: KeyResultCreate) -> KeyResult:
     if kr.current_value >= kr.target_value:
         raise HTTPException(
             status_code=400,
             detail="current_value must be strictly less than target_value at creation",
         )
 
-    db_kr = KeyResultDB(**kr.model_dump())
-    db.add(db_kr)
+    # существование цели проверяет внешний ключ (foreign_keys=ON), а не SELECT
+    try:
+        row = db.execute(
+            insert(KeyResultDB).values(**kr.model_dump()).returning(*KeyResultDB.__table__.c)
+        ).one()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Objective not found") from None
+    db.commit()
+    response_cache.invalidate([kr.objective_id])
+    return KeyResult.model_validate(row)
+
+
+def _create_key_results(db: Session, items: list[KeyResultCreate]) -> BulkResult:
+    """
+    Проверки те же, что у _create_key_result, но существование целей —
+    одним IN-запросом на весь список. Корректные строки вставляются одним
+    executemany в одной транзакции, остальные попадают в errors. Если цель
+    удалили между проверкой и INSERT, внешний ключ откатывает всю пачку:
+    её строки переносятся в errors, остальные вставляются повторно.
+    """
+    requested = {kr.objective_id for kr in items}
+    existing = set(db.scalars(select(ObjectiveDB.id).where(ObjectiveDB.id.in_(requested))))
+
+    rows: dict[int, dict[str, Any]] = {}
+    errors: list[BulkRowError] = []
+    for index, kr in enumerate(items):
+        if kr.objective_id not in existing:
+            errors.append(BulkRowError(index=index, detail="Objective not found"))
+        elif kr.current_value >= kr.target_value:
+            errors.append(
+                BulkRowError(
+                    index=index,
+                    detail="current_value must be strictly less than target_value at creation",
+                )
+            )
+        else:
+            rows[index] = kr.model_dump()
+
+    created: list[int] = []
+    while rows:
+        try:
+            # порядок входа — sorted(), как в objectives._create_objectives
+            created = sorted(
+                db.scalars(insert(KeyResultDB).returning(KeyResultDB.id), list(rows.values()))
+            )
+        except IntegrityError:
+            db.rollback()
+            requested = {row["objective_id"] for row in rows.values()}
+            existing = set(db.scalars(select(ObjectiveDB.id).where(ObjectiveDB.id.in_(requested))))
+            if existing == requested:
+                raise  # нарушение не из-за удалённой цели
+            for index in [i for i, row in rows.items() if row["objective_id"] not in existing]:
+                errors.append(BulkRowError(index=index, detail="Objective not found"))
+                del rows[index]
+            continue
+        db.commit()
+        response_cache.invalidate({row["objective_id"] for row in rows.values()})
+        break
+    errors.sort(key=lambda error: error.index)
+    return BulkResult(created=created, errors=errors)
+
+
+def _update_key_result(db: Session, kr_id: int, current_value: int) -> KeyResult:
+    # проверка — в WHERE: при успехе один UPDATE ... RETURNING
+    row = db.execute(
+        update(KeyResultDB)
+        .where(KeyResultDB.id == kr_id, KeyResultDB.target_value >= current_value)
+        .values(current_value=current_value)
+        .returning(*KeyResultDB.__table__.c)
+    ).one_or_none()
+    if row is not None:
+        db.commit()
+        response_cache.invalidate([row.objective_id])
+        return KeyResult.model_validate(row)
+
+    # строки нет: только здесь выясняем, почему
+    if db.scalar(select(KeyResultDB.id).where(KeyResultDB.id == kr_id)) is None:
+        raise HTTPException(status_code=404, detail="KeyResult not found")
+    raise HTTPException(
+        status_code=400,
+        detail="current_value cannot exceed target_value",
+    )
+
+
+def _ingest_progress(db: Session, items: list[ProgressUpdate]) -> ProgressBatchResult:
+    """
+    Пакетный аналог _update_key_result: target_value всех KR из пачки читается
+    одним IN-запросом, прошедшие проверку значения пишутся одним executemany
+    UPDATE по первичному ключу и одним commit. При повторе kr_id побеждает последний.
+    """
+    query = select(KeyResultDB.id, KeyResultDB.target_value, KeyResultDB.objective_id).where(
+        KeyResultDB.id.in_({item.kr_id for item in items})
+    )
+    found = {kr_id: (target, obj_id) for kr_id, target, obj_id in db.execute(query).tuples()}
+
+    results: list[ProgressItemResult] = []
+    rows: list[dict[str, int]] = []
+    for item in items:
+        target, _ = found.get(item.kr_id, (None, None))
+        if target is None:
+            results.append(ProgressItemResult(kr_id=item.kr_id, status="not_found"))
+        elif item.current_value > target:
+            results.append(ProgressItemResult(kr_id=item.kr_id, status="exceeds_target"))
+        else:
+            results.append(ProgressItemResult(kr_id=item.kr_id, status="updated"))
+            rows.append({"id": item.kr_id, "current_value": item.current_value})
+
+    if rows:
+        db.execute(update(KeyResultDB), rows)
+        db.commit()
+        response_cache.invalidate({found[row["id"]][1] for row in rows})
+    return ProgressBatchResult(updated=len(rows), results=results)
+
+
+_KEY_RESULT_ROWS = RowSerializer(KeyResult, KeyResultDB.__table__)
+
+
+def _key_results_page_body(db: Session, obj_id: int, page: PageParams) -> CachedBody:
+    query = _KEY_RESULT_ROWS.select().where(KeyResultDB.objective_id == obj_id)
+    rows = db.execute(keyset(query, KeyResultDB.id, page)).all()
+    items, next_cursor = split_page(rows, page)
+    return CachedBody(_KEY_RESULT_ROWS.dump_many(items), next_cursor)
+
+
+def _delete_key_result(db: Session, kr_id: int) -> dict[str, Any]:
+    deleted = db.execute(
+        delete(KeyResultDB).where(KeyResultDB.id == kr_id).returning(KeyResultDB.objective_id)
+    ).one_or_none()
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="KeyResult not found")
     db.commit()
-    db.refresh(db_kr)
-    return db_kr
+    response_cache.invalidate([deleted.objective_id])
+    return {"status": "deleted", "key_result_id": kr_id}
+
+
+# ============================================================
+# sync
+# ============================================================
+@router.post("", response_model=KeyResult)
+def create_key_result(kr: KeyResultCreate, db: Session = Depends(get_db)) -> KeyResult:
+    """Создание нового KeyResult, связанного с Objective."""
+    return _create_key_result(db, kr)
+
+
+@router.post("/bulk", response_model=BulkResult)
+def create_key_results_bulk(
+    items: list[KeyResultCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: Session = Depends(get_db),
+) -> BulkResult:
+    """Создание до BULK_MAX_ITEMS KeyResults одной транзакцией, ошибки — построчно."""
+    return _create_key_results(db, items)
+
+
+# объявлен до /{kr_id}
+@router.put("/progress", response_model=ProgressBatchResult)
+def ingest_progress(
+    items: list[ProgressUpdate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: Session = Depends(get_db),
+) -> ProgressBatchResult:
+    """Пакетное обновление current_value: одна транзакция, результат по каждому элементу."""
+    return _ingest_progress(db, items)
 
 
 @router.put("/{kr_id}", response_model=KeyResult)
@@ -37,34 +208,24 @@ def update_key_result(
     db: Session = Depends(get_db),
 ) -> KeyResult:
     """Обновление текущего значения KeyResult."""
-    kr: KeyResultDB | None = db.query(KeyResultDB).filter(KeyResultDB.id == kr_id).first()
-    if not kr:
-        raise HTTPException(status_code=404, detail="KeyResult not found")
-
-    if current_value > kr.target_value:
-        raise HTTPException(
-            status_code=400,
-            detail="current_value cannot exceed target_value",
-        )
-
-    # безопасное присваивание, чтобы не конфликтовало с Column[int]
-    cast(Any, kr).current_value = int(current_value)
-
-    db.commit()
-    db.refresh(kr)
-    return kr
+    return _update_key_result(db, kr_id, current_value)
 
 
 @router.get("/{obj_id}/by_objective", response_model=list[KeyResult])
 def get_key_results_for_objective(
     obj_id: int,
+    request: Request,
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
-) -> list[KeyResultDB]:
-    """Получение всех KeyResults, привязанных к Objective."""
-    results: list[KeyResultDB] = (
-        db.query(KeyResultDB).filter(KeyResultDB.objective_id == obj_id).all()
+) -> Response:
+    """Страница KeyResults, привязанных к Objective (следующая — по заголовку Link)."""
+    key = ("key_results", obj_id, page.limit, page.after)
+    cached, hit = response_cache.read_through(
+        key, partial(_key_results_page_body, db, obj_id, page)
     )
-    return results
+    response = json_response(cached, hit)
+    set_next_link(request, response, cached.next_cursor)
+    return response
 
 
 @router.delete("/{kr_id}")
@@ -73,10 +234,69 @@ def delete_key_result(
     db: Session = Depends(get_db),
 ) -> dict[str, Any]:
     """Удаление KeyResult по ID."""
-    kr: KeyResultDB | None = db.query(KeyResultDB).filter(KeyResultDB.id == kr_id).first()
-    if not kr:
-        raise HTTPException(status_code=404, detail="KeyResult not found")
+    return _delete_key_result(db, kr_id)
 
-    db.delete(kr)
-    db.commit()
-    return {"status": "deleted", "key_result_id": kr_id}
+
+# ============================================================
+# async
+# ============================================================
+@async_router.post("", response_model=KeyResult)
+async def create_key_result_async(
+    kr: KeyResultCreate, db: AsyncSession = Depends(get_async_db)
+) -> KeyResult:
+    """Создание нового KeyResult, связанного с Objective."""
+    return await db.run_sync(_create_key_result, kr)
+
+
+@async_router.post("/bulk", response_model=BulkResult)
+async def create_key_results_bulk_async(
+    items: list[KeyResultCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_async_db),
+) -> BulkResult:
+    """Создание до BULK_MAX_ITEMS KeyResults одной транзакцией, ошибки — построчно."""
+    return await db.run_sync(_create_key_results, items)
+
+
+@async_router.put("/progress", response_model=ProgressBatchResult)
+async def ingest_progress_async(
+    items: list[ProgressUpdate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_async_db),
+) -> ProgressBatchResult:
+    """Пакетное обновление current_value: одна транзакция, результат по каждому элементу."""
+    return await db.run_sync(_ingest_progress, items)
+
+
+@async_router.put("/{kr_id}", response_model=KeyResult)
+async def update_key_result_async(
+    kr_id: int,
+    current_value: int,
+    db: AsyncSession = Depends(get_async_db),
+) -> KeyResult:
+    """Обновление текущего значения KeyResult."""
+    return await db.run_sync(_update_key_result, kr_id, current_value)
+
+
+@async_router.get("/{obj_id}/by_objective", response_model=list[KeyResult])
+async def get_key_results_for_objective_async(
+    obj_id: int,
+    request: Request,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+) -> Response:
+    """Страница KeyResults, привязанных к Objective (следующая — по заголовку Link)."""
+    key = ("key_results", obj_id, page.limit, page.after)
+    cached, hit = await response_cache.read_through_async(
+        key, partial(db.run_sync, _key_results_page_body, obj_id, page)
+    )
+    response = json_response(cached, hit)
+    set_next_link(request, response, cached.next_cursor)
+    return response
+
+
+@async_router.delete("/{kr_id}")
+async def delete_key_result_async(
+    kr_id: int,
+    db: AsyncSession = Depends(get_async_db),
+) -> dict[str, Any]:
+    """Удаление KeyResult по ID."""
+    return await db.run_sync(_delete_key_result, kr_id)
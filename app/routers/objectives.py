@@ -1,62 +1,424 @@
-from collections.abc import Sequence
+from collections.abc import AsyncIterator, Iterator
+from functools import partial
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
+import orjson
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..db import get_db
-from ..models import KeyResultDB, ObjectiveDB
-from ..schemas import Objective, ObjectiveCreate
+from ..cache import CachedBody, json_response, response_cache
+from ..conditional import make_etag, matches, not_modified, precondition, precondition_async
+from ..db import SessionLocal, async_session_factory, get_async_db, get_db
+from ..metrics import InstrumentedRoute
+from ..models import KeyResultDB, ObjectiveDB, ObjectiveProgressDB, TableVersionDB
+from ..pagination import MAX_PAGE_SIZE, PageParams, keyset, page_params, set_next_link, split_page
+from ..schemas import (
+    BULK_MAX_ITEMS,
+    BulkResult,
+    Objective,
+    ObjectiveCreate,
+    ObjectiveProgress,
+    ObjectiveProgressSingle,
+)
+from ..serialization import FastJSONResponse, RowSerializer
 
-router = APIRouter()
+# Логика — в функциях `_...(db: Session, ...)`. `router` вызывает их напрямую
+# (sync-обработчики в пуле потоков), `async_router` — через AsyncSession.run_sync
+# без пула. Какой из них подключать, решает DB_STACK (см. app.main).
+router = APIRouter(route_class=InstrumentedRoute)
+async_router = APIRouter(route_class=InstrumentedRoute)
 
 
-@router.post("", response_model=Objective)
-def create_objective(obj: ObjectiveCreate, db: Session = Depends(get_db)) -> Objective:
-    db_obj = ObjectiveDB(**obj.model_dump())
-    db.add(db_obj)
+def _create_objective(db: Session, obj: ObjectiveCreate) -> Objective:
+    # INSERT ... RETURNING: строка ответа приходит тем же запросом, без refresh
+    row = db.execute(
+        insert(ObjectiveDB).values(**obj.model_dump()).returning(*ObjectiveDB.__table__.c)
+    ).one()
     db.commit()
-    db.refresh(db_obj)
-    return db_obj
+    return Objective.model_validate(row)
 
 
-@router.get("", response_model=list[Objective])
-def get_objectives(db: Session = Depends(get_db)) -> Sequence[ObjectiveDB]:
-    """Возвращает список целей (ORM-объекты). FastAPI конвертирует их в Pydantic-модели."""
-    return db.query(ObjectiveDB).all()
+def _create_objectives(db: Session, items: list[ObjectiveCreate]) -> BulkResult:
+    # один multi-VALUES INSERT ... RETURNING и один commit. id внутри INSERT
+    # растут в порядке VALUES, поэтому sorted() — это порядок входа;
+    # sort_by_parameter_order на SQLite вырождается в INSERT на каждую строку
+    ids = db.scalars(
+        insert(ObjectiveDB).returning(ObjectiveDB.id), [obj.model_dump() for obj in items]
+    )
+    db.commit()
+    return BulkResult(created=sorted(ids), errors=[])
 
 
-@router.get("/{obj_id}", response_model=Objective)
-def get_objective(obj_id: int, db: Session = Depends(get_db)) -> ObjectiveDB:
-    obj = db.query(ObjectiveDB).filter(ObjectiveDB.id == obj_id).first()
-    if not obj:
-        raise HTTPException(status_code=404, detail="Objective not found")
-    return obj
+_OBJECTIVE_ROWS = RowSerializer(Objective, ObjectiveDB.__table__)
 
 
-@router.delete("/{obj_id}")
-def delete_objective(obj_id: int, db: Session = Depends(get_db)) -> dict[str, Any]:
-    obj = db.query(ObjectiveDB).filter(ObjectiveDB.id == obj_id).first()
-    if not obj:
-        raise HTTPException(status_code=404, detail="Objective not found")
+def _get_objectives(db: Session, page: PageParams) -> tuple[bytes, str | None]:
+    """JSON-тело страницы целей (из кортежей колонок) и курсор следующей."""
+    rows = db.execute(keyset(_OBJECTIVE_ROWS.select(), ObjectiveDB.id, page)).all()
+    items, next_cursor = split_page(rows, page)
+    return _OBJECTIVE_ROWS.dump_many(items), next_cursor
+
+
+EXPORT_BATCH_SIZE = 500
+NDJSON = "application/x-ndjson"
+
+
+def _export_chunk(db: Session, after: int, batch_size: int) -> tuple[bytes, int | None]:
+    """
+    Следующая пачка выгрузки: до batch_size целей с id > after и их key results
+    (один IN-запрос на пачку). Читаются кортежи колонок, не ORM-объекты, —
+    память не растёт с размером таблицы. Возвращает NDJSON и последний id.
+    """
+    objectives = db.execute(
+        select(ObjectiveDB.id, ObjectiveDB.title, ObjectiveDB.description, ObjectiveDB.isComplete)
+        .where(ObjectiveDB.id > after)
+        .order_by(ObjectiveDB.id)
+        .limit(batch_size)
+    ).all()
+    if not objectives:
+        return b"", None
+
+    ids = [row.id for row in objectives]
+    key_results: dict[int, list[dict[str, Any]]] = {obj_id: [] for obj_id in ids}
+    for kr in db.execute(
+        select(
+            KeyResultDB.id,
+            KeyResultDB.objective_id,
+            KeyResultDB.title,
+            KeyResultDB.target_value,
+            KeyResultDB.current_value,
+        )
+        .where(KeyResultDB.objective_id.in_(ids))
+        .order_by(KeyResultDB.objective_id, KeyResultDB.id)
+    ):
+        key_results[kr.objective_id].append(
+            {
+                "id": kr.id,
+                "title": kr.title,
+                "target_value": kr.target_value,
+                "current_value": kr.current_value,
+            }
+        )
+
+    lines = [
+        orjson.dumps(
+            {
+                "id": obj.id,
+                "title": obj.title,
+                "description": obj.description,
+                "isComplete": bool(obj.isComplete),
+                "key_results": key_results[obj.id],
+            }
+        )
+        for obj in objectives
+    ]
+    return b"\n".join(lines) + b"\n", ids[-1]
+
+
+def _export_ndjson(batch_size: int) -> Iterator[bytes]:
+    # своя сессия: сессия из Depends(get_db) закрывается до начала стриминга
+    with SessionLocal() as db:
+        after: int | None = 0
+        while after is not None:
+            chunk, after = _export_chunk(db, after, batch_size)
+            if chunk:
+                yield chunk
+
+
+async def _export_ndjson_async(batch_size: int) -> AsyncIterator[bytes]:
+    async with async_session_factory()() as db:
+        after: int | None = 0
+        while after is not None:
+            chunk, after = await db.run_sync(_export_chunk, after, batch_size)
+            if chunk:
+                yield chunk
+
 
-    kr_count = db.query(KeyResultDB).filter(KeyResultDB.objective_id == obj_id).count()
-    db.delete(obj)
+def _delete_objective(db: Session, obj_id: int) -> dict[str, Any]:
+    # число детей — из objective_progress, но DELETE ... RETURNING, а не SELECT:
+    # он уже держит блокировку записи, и между ним и каскадом ниже никто не
+    # добавит и не удалит key result. Сами дети уходят каскадом внутри
+    # DELETE цели, без загрузки в сессию
+    kr_count = db.scalar(
+        delete(ObjectiveProgressDB)
+        .where(ObjectiveProgressDB.objective_id == obj_id)
+        .returning(ObjectiveProgressDB.kr_count)
+    )
+    if not db.execute(delete(ObjectiveDB).where(ObjectiveDB.id == obj_id)).rowcount:
+        raise HTTPException(status_code=404, detail="Objective not found")
     db.commit()
+    response_cache.invalidate([obj_id])
     return {
         "status": "deleted",
         "objective_id": obj_id,
-        "deleted_key_results": kr_count,
+        "deleted_key_results": kr_count or 0,
     }
 
 
-@router.get("/{obj_id}/progress")
-def get_objective_progress(obj_id: int, db: Session = Depends(get_db)) -> dict[str, Any]:
-    """Возвращает прогресс цели в процентах."""
-    krs = db.query(KeyResultDB).filter(KeyResultDB.objective_id == obj_id).all()
-    if not krs:
+def _objective_version(db: Session, obj_id: int) -> int | None:
+    return db.scalar(select(ObjectiveDB.version).where(ObjectiveDB.id == obj_id))
+
+
+def _objective_etag(db: Session, obj_id: int) -> str | None:
+    version = _objective_version(db, obj_id)
+    return None if version is None else make_etag("objective", obj_id, version)
+
+
+def _progress_etag(db: Session, obj_id: int) -> str | None:
+    version = _objective_version(db, obj_id)
+    return None if version is None else make_etag("progress", obj_id, version)
+
+
+def _objectives_list_etag(db: Session, page: PageParams) -> str:
+    name = ObjectiveDB.__tablename__
+    version = db.scalar(select(TableVersionDB.version).where(TableVersionDB.name == name))
+    return make_etag("objectives", version or 0, page.limit, page.after or 0)
+
+
+def _objective_body(db: Session, obj_id: int) -> CachedBody:
+    query = _OBJECTIVE_ROWS.select(ObjectiveDB.version).where(ObjectiveDB.id == obj_id)
+    row = db.execute(query).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Objective not found")
+    return CachedBody(
+        _OBJECTIVE_ROWS.dump_one(row), etag=make_etag("objective", obj_id, row.version)
+    )
+
+
+def _percent(target_total: int, current_total: int) -> str:
+    percent = round(current_total / target_total * 100, 2) if target_total > 0 else 0
+    return f"{percent}%"
+
+
+def _get_objective_progress(db: Session, obj_id: int) -> dict[str, Any]:
+    # суммы ведутся триггерами (app.models), здесь — одно чтение по первичному ключу
+    totals = db.execute(
+        select(ObjectiveProgressDB.target_total, ObjectiveProgressDB.current_total).where(
+            ObjectiveProgressDB.objective_id == obj_id, ObjectiveProgressDB.kr_count > 0
+        )
+    ).first()
+    if totals is None:
         raise HTTPException(status_code=404, detail="No Key Results for this Objective.")
-    total = sum(kr.target_value for kr in krs)
-    current = sum(kr.current_value for kr in krs)
-    percent = round(current / total * 100, 2) if total > 0 else 0
-    return {"objective_id": obj_id, "progress": f"{percent}%"}
+    return {"objective_id": obj_id, "progress": _percent(*totals)}
+
+
+def _progress_body(db: Session, obj_id: int) -> CachedBody:
+    # версия и суммы читаются в одной транзакции — ETag соответствует телу
+    etag = _progress_etag(db, obj_id)
+    progress = _get_objective_progress(db, obj_id)
+    return CachedBody(orjson.dumps(progress), etag=etag)
+
+
+def _get_progress_many(
+    db: Session, ids: list[int] | None, page: PageParams
+) -> tuple[list[ObjectiveProgress], str | None]:
+    """
+    Прогресс сразу многих целей одним запросом: objectives LEFT JOIN
+    objective_progress — по списку ids или страницей (keyset). Цели без key
+    results попадают в ответ с progress=None, несуществующие ids пропускаются.
+    """
+    query = (
+        select(
+            ObjectiveDB.id,
+            ObjectiveProgressDB.target_total,
+            ObjectiveProgressDB.current_total,
+            ObjectiveProgressDB.kr_count,
+        )
+        .outerjoin(ObjectiveProgressDB, ObjectiveProgressDB.objective_id == ObjectiveDB.id)
+        .order_by(ObjectiveDB.id)
+    )
+    if ids is not None:
+        rows, next_cursor = db.execute(query.where(ObjectiveDB.id.in_(ids))).all(), None
+    else:
+        rows, next_cursor = split_page(db.execute(keyset(query, ObjectiveDB.id, page)).all(), page)
+    return [
+        ObjectiveProgress(
+            objective_id=row.id,
+            progress=_percent(row.target_total, row.current_total) if row.kr_count else None,
+            key_results=row.kr_count or 0,
+        )
+        for row in rows
+    ], next_cursor
+
+
+# ============================================================
+# sync
+# ============================================================
+@router.post("", response_model=Objective)
+def create_objective(obj: ObjectiveCreate, db: Session = Depends(get_db)) -> Objective:
+    return _create_objective(db, obj)
+
+
+@router.post("/bulk", response_model=BulkResult)
+def create_objectives_bulk(
+    items: list[ObjectiveCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: Session = Depends(get_db),
+) -> BulkResult:
+    """Создание до BULK_MAX_ITEMS целей одной транзакцией."""
+    return _create_objectives(db, items)
+
+
+@router.get("", response_model=list[Objective])
+def get_objectives(
+    request: Request,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db),
+) -> Response:
+    """
+    Страница целей. Тело собирается из кортежей колонок (app.serialization),
+    схема ответа — response_model. Следующая страница — по ссылке из заголовка
+    Link. ETag — по счётчику изменений таблицы, совпавший If-None-Match
+    получает 304 без чтения строк.
+    """
+    etag = _objectives_list_etag(db, page)
+    if matches(request, etag):
+        return not_modified(etag)
+    body, next_cursor = _get_objectives(db, page)
+    response = FastJSONResponse(body, headers={"ETag": etag})
+    set_next_link(request, response, next_cursor)
+    return response
+
+
+# /progress и /export объявлены до /{obj_id}, иначе разбирались бы как obj_id
+@router.get("/progress", response_model=list[ObjectiveProgress])
+def get_progress_many(
+    request: Request,
+    response: Response,
+    ids: list[int] | None = Query(None, max_length=MAX_PAGE_SIZE),
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db),
+) -> list[ObjectiveProgress]:
+    """Прогресс по списку ?ids=1&ids=2 или по странице целей (как GET /objectives)."""
+    items, next_cursor = _get_progress_many(db, ids, page)
+    set_next_link(request, response, next_cursor)
+    return items
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_objectives(
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=5000),
+) -> StreamingResponse:
+    """
+    Полная выгрузка целей с вложенными key results, по строке NDJSON на цель.
+    Таблица читается пачками по batch_size (keyset по id), ответ стримится.
+    """
+    return StreamingResponse(_export_ndjson(batch_size), media_type=NDJSON)
+
+
+@router.get("/{obj_id}", response_model=Objective)
+def get_objective(obj_id: int, request: Request, db: Session = Depends(get_db)) -> Response:
+    if early := precondition(request, partial(_objective_etag, db, obj_id)):
+        return early
+    cached, hit = response_cache.read_through(
+        ("objective", obj_id), partial(_objective_body, db, obj_id)
+    )
+    return json_response(cached, hit)
+
+
+@router.delete("/{obj_id}")
+def delete_objective(obj_id: int, db: Session = Depends(get_db)) -> dict[str, Any]:
+    return _delete_objective(db, obj_id)
+
+
+@router.get("/{obj_id}/progress", response_model=ObjectiveProgressSingle)
+def get_objective_progress(
+    obj_id: int, request: Request, db: Session = Depends(get_db)
+) -> Response:
+    """Возвращает прогресс цели в процентах."""
+    if early := precondition(request, partial(_progress_etag, db, obj_id)):
+        return early
+    cached, hit = response_cache.read_through(
+        ("progress", obj_id), partial(_progress_body, db, obj_id)
+    )
+    return json_response(cached, hit)
+
+
+# ============================================================
+# async
+# ============================================================
+@async_router.post("", response_model=Objective)
+async def create_objective_async(
+    obj: ObjectiveCreate, db: AsyncSession = Depends(get_async_db)
+) -> Objective:
+    return await db.run_sync(_create_objective, obj)
+
+
+@async_router.post("/bulk", response_model=BulkResult)
+async def create_objectives_bulk_async(
+    items: list[ObjectiveCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_async_db),
+) -> BulkResult:
+    """Создание до BULK_MAX_ITEMS целей одной транзакцией."""
+    return await db.run_sync(_create_objectives, items)
+
+
+@async_router.get("", response_model=list[Objective])
+async def get_objectives_async(
+    request: Request,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+) -> Response:
+    etag = await db.run_sync(_objectives_list_etag, page)
+    if matches(request, etag):
+        return not_modified(etag)
+    body, next_cursor = await db.run_sync(_get_objectives, page)
+    response = FastJSONResponse(body, headers={"ETag": etag})
+    set_next_link(request, response, next_cursor)
+    return response
+
+
+@async_router.get("/progress", response_model=list[ObjectiveProgress])
+async def get_progress_many_async(
+    request: Request,
+    response: Response,
+    ids: list[int] | None = Query(None, max_length=MAX_PAGE_SIZE),
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+) -> list[ObjectiveProgress]:
+    """Прогресс по списку ?ids=1&ids=2 или по странице целей (как GET /objectives)."""
+    items, next_cursor = await db.run_sync(_get_progress_many, ids, page)
+    set_next_link(request, response, next_cursor)
+    return items
+
+
+@async_router.get("/export", response_class=StreamingResponse)
+async def export_objectives_async(
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=5000),
+) -> StreamingResponse:
+    """Полная выгрузка целей с вложенными key results (NDJSON, пачками)."""
+    return StreamingResponse(_export_ndjson_async(batch_size), media_type=NDJSON)
+
+
+@async_router.get("/{obj_id}", response_model=Objective)
+async def get_objective_async(
+    obj_id: int, request: Request, db: AsyncSession = Depends(get_async_db)
+) -> Response:
+    if early := await precondition_async(request, partial(db.run_sync, _objective_etag, obj_id)):
+        return early
+    cached, hit = await response_cache.read_through_async(
+        ("objective", obj_id), partial(db.run_sync, _objective_body, obj_id)
+    )
+    return json_response(cached, hit)
+
+
+@async_router.delete("/{obj_id}")
+async def delete_objective_async(
+    obj_id: int, db: AsyncSession = Depends(get_async_db)
+) -> dict[str, Any]:
+    return await db.run_sync(_delete_objective, obj_id)
+
+
+@async_router.get("/{obj_id}/progress", response_model=ObjectiveProgressSingle)
+async def get_objective_progress_async(
+    obj_id: int, request: Request, db: AsyncSession = Depends(get_async_db)
+) -> Response:
+    """Возвращает прогресс цели в процентах."""
+    if early := await precondition_async(request, partial(db.run_sync, _progress_etag, obj_id)):
+        return early
+    cached, hit = await response_cache.read_through_async(
+        ("progress", obj_id), partial(db.run_sync, _progress_body, obj_id)
+    )
+    return json_response(cached, hit)
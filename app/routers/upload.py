@@ -2,9 +2,10 @@
 
 from fastapi import APIRouter, UploadFile
 
+from app.metrics import InstrumentedRoute
 from app.middleware.files import secure_save_upload
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/upload")
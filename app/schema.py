@@ -0,0 +1,95 @@
+"""
+Создание схемы и доводка уже существующих БД до текущей версии моделей.
+
+create_all только добавляет недостающие таблицы, поэтому всё, что появилось
+в существующих таблицах позже, ставится здесь идемпотентно. Новые колонки
+существующих таблиц добавляются через ALTER TABLE ADD COLUMN, им нужен
+server_default.
+
+Импорт app.main БД не трогает: init_db выполняется один раз — в lifespan
+приложения (DB_INIT_ON_STARTUP=1, по умолчанию) или отдельным шагом
+`python -m app.schema` перед запуском read-only контейнера.
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+from sqlalchemy import Engine, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+
+from app import aggregates
+from app.db import Base, engine
+from app.models import PROGRESS_TRIGGERS, VERSION_TRIGGERS, ObjectiveDB, ObjectiveProgressDB
+
+
+def _add_missing_columns(engine: Engine) -> None:
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+
+
+def ensure_schema(engine: Engine) -> None:
+    had_progress = inspect(engine).has_table(ObjectiveProgressDB.__tablename__)
+    _add_missing_columns(engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # индексы, добавленные в модели после создания таблицы
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        for ddl in (*PROGRESS_TRIGGERS.values(), *VERSION_TRIGGERS.values()):
+            conn.exec_driver_sql(ddl)
+        # таблица сумм только что появилась в БД со старыми данными
+        if not had_progress:
+            aggregates.rebuild(conn)
+
+
+def _ensure_sqlite_dir(engine: Engine) -> None:
+    database = engine.url.database
+    if engine.url.get_backend_name() == "sqlite" and database and database != ":memory:":
+        Path(database).parent.mkdir(parents=True, exist_ok=True)
+
+
+def seed(engine: Engine) -> None:
+    # Objective(id=1) нужна CI и test_error_rate
+    with Session(engine) as db:
+        if db.get(ObjectiveDB, 1) is not None:
+            return
+        db.add(
+            ObjectiveDB(
+                id=1,
+                title="Seed objective for CI",
+                description="Automatically created to satisfy error_rate test",
+            )
+        )
+        db.commit()
+    logging.getLogger("access").info("[CI] Seeded Objective(id=1)")
+
+
+def init_db(engine: Engine) -> None:
+    """Каталог SQLite-файла, схема (ensure_schema) и seed; повторный вызов безопасен."""
+    _ensure_sqlite_dir(engine)
+    ensure_schema(engine)
+    seed(engine)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.parse_args(argv)
+    init_db(engine)
+    print(f"schema ready: {engine.url.render_as_string(hide_password=True)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict
 
 
@@ -32,3 +34,48 @@ class KeyResultCreate(KeyResultBase):
 class KeyResult(KeyResultBase):
     id: int
     model_config = ConfigDict(from_attributes=True)
+
+
+# --- Bulk ---
+# Максимум строк в одном bulk-запросе: ~1000 KR укладываются в лимит тела 1 MB
+BULK_MAX_ITEMS = 1000
+
+
+class BulkRowError(BaseModel):
+    index: int  # позиция строки во входном списке
+    detail: str
+
+
+class BulkResult(BaseModel):
+    """id созданных строк (в порядке входного списка) и ошибки отклонённых."""
+
+    created: list[int]
+    errors: list[BulkRowError]
+
+
+# --- Progress batch ---
+class ProgressUpdate(BaseModel):
+    kr_id: int
+    current_value: int
+
+
+class ProgressItemResult(BaseModel):
+    kr_id: int
+    status: Literal["updated", "not_found", "exceeds_target"]
+
+
+class ProgressBatchResult(BaseModel):
+    updated: int
+    results: list[ProgressItemResult]  # по одному на элемент входа, в том же порядке
+
+
+# --- Progress ---
+class ObjectiveProgressSingle(BaseModel):
+    objective_id: int
+    progress: str  # "<проценты>%"
+
+
+class ObjectiveProgress(BaseModel):
+    objective_id: int
+    progress: str | None  # None — у цели нет key results
+    key_results: int
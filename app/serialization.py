@@ -0,0 +1,52 @@
+"""
+Быстрый путь сериализации: кортежи колонок -> dict -> orjson.
+
+Обработчики по-прежнему объявляют response_model (ADR-004: схема ответа есть
+в OpenAPI и проверяется _check_response_models), но возвращают готовый
+FastJSONResponse. FastAPI тогда не валидирует ORM-объекты через
+from_attributes и не гоняет их через jsonable_encoder. Соответствие схеме
+проверяется один раз, при создании RowSerializer: каждое поле модели должно
+быть колонкой таблицы того же имени.
+"""
+
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import Column, Select, Table, select
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse на orjson; bytes отдаёт как есть (уже сериализованное тело)."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content)
+
+
+class RowSerializer:
+    """Поля Pydantic-модели, читаемые из таблицы кортежами, и их JSON."""
+
+    def __init__(self, model: type[BaseModel], table: Table) -> None:
+        missing = [name for name in model.model_fields if name not in table.c]
+        if missing:
+            raise RuntimeError(f"{model.__name__}: no columns for fields {missing}")
+        # порядок полей модели — тот же, что дал бы FastAPI
+        self.fields = tuple(model.model_fields)
+        self.columns: tuple[Column[Any], ...] = tuple(table.c[name] for name in self.fields)
+
+    def select(self, *extra: Any) -> Select[Any]:
+        """SELECT полей модели; extra-колонки идут после них и в JSON не попадают."""
+        return select(*self.columns, *extra)
+
+    def as_dict(self, row: Sequence[Any]) -> dict[str, Any]:
+        return dict(zip(self.fields, row, strict=False))
+
+    def dump_one(self, row: Sequence[Any]) -> bytes:
+        return orjson.dumps(self.as_dict(row))
+
+    def dump_many(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        return orjson.dumps([self.as_dict(row) for row in rows])
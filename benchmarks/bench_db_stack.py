@@ -0,0 +1,115 @@
+"""
+sync- и async-стек БД (DB_STACK) под конкурентной нагрузкой.
+
+Запуск: python -m benchmarks.bench_db_stack [--clients 50 200 1000] [--requests N]
+
+Каждый клиент делает N запросов вперемешку: GET /objectives/{id},
+GET /objectives/{id}/progress и PUT /key_results/{id}. Приложение собирается
+из роутеров без конвейера безопасности, запросы идут через ASGI-транспорт
+httpx в одном процессе. Печатаются RPS, p50/p95 задержки и число ответов 5xx.
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+
+OBJECTIVES = 100
+
+
+def _build_app(stack: str, objectives: ModuleType, key_results: ModuleType) -> FastAPI:
+    app = FastAPI()
+    suffix = "async_router" if stack == "async" else "router"
+    app.include_router(getattr(objectives, suffix), prefix="/objectives")
+    app.include_router(getattr(key_results, suffix), prefix="/key_results")
+    return app
+
+
+def _seed(db_module: ModuleType, models: ModuleType) -> None:
+    db_module.Base.metadata.create_all(db_module.engine)
+    with db_module.SessionLocal() as db:
+        for i in range(1, OBJECTIVES + 1):
+            obj = models.ObjectiveDB(id=i, title=f"objective {i}")
+            obj.key_results = [
+                models.KeyResultDB(id=i, title=f"kr {i}", target_value=100, current_value=0)
+            ]
+            db.add(obj)
+        db.commit()
+
+
+async def _client(
+    http: httpx.AsyncClient, n: int, requests: int, out: list[float], errors: list[int]
+) -> None:
+    rnd = random.Random(n)  # noqa: S311
+    for _ in range(requests):
+        obj_id = rnd.randint(1, OBJECTIVES)
+        kind = rnd.random()
+        start = time.perf_counter()
+        if kind < 0.5:
+            r = await http.get(f"/objectives/{obj_id}")
+        elif kind < 0.8:
+            r = await http.get(f"/objectives/{obj_id}/progress")
+        else:
+            params = {"current_value": rnd.randint(0, 99)}
+            r = await http.put(f"/key_results/{obj_id}", params=params)
+        out.append(time.perf_counter() - start)
+        if r.status_code >= 500:
+            errors.append(r.status_code)
+
+
+async def _load(
+    app: FastAPI, db_module: ModuleType, clients: int, requests: int
+) -> tuple[float, float, float, int]:
+    latencies: list[float] = []
+    errors: list[int] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(_client(http, n, requests, latencies, errors) for n in range(clients))
+        )
+        elapsed = time.perf_counter() - start
+    await db_module.dispose_async_engine()
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    return len(latencies) / elapsed, p50, p95, len(errors)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--requests", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # DATABASE_URL читается при импорте app.db
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        os.environ.setdefault("ENV", "prod")
+        db_module = importlib.import_module("app.db")
+        models = importlib.import_module("app.models")
+        objectives = importlib.import_module("app.routers.objectives")
+        key_results = importlib.import_module("app.routers.key_results")
+        _seed(db_module, models)
+
+        print(f"{'stack':>6} {'clients':>8} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'5xx':>5}")
+        for clients in args.clients:
+            for stack in ("sync", "async"):
+                app = _build_app(stack, objectives, key_results)
+                result: Any = asyncio.run(_load(app, db_module, clients, args.requests))
+                rps, p50, p95, errors = result
+                print(f"{stack:>6} {clients:>8} {rps:>8.0f} {p50:>8.1f} {p95:>8.1f} {errors:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Выгрузка GET /objectives/export: скорость и пиковая память при росте таблицы.
+
+Запуск: python -m benchmarks.bench_export [--rows 10000 100000] [--batch-size N]
+
+На каждую цель приходится KR_PER_OBJECTIVE key results. Потоковая выгрузка
+(_export_chunk пачками) сравнивается с наивной: все цели с key_results через
+ORM в память и один json.dumps (до 100 000 строк, дальше он слишком долгий).
+Пиковая память — по tracemalloc, байты ответа не накапливаются.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+
+from app.db import Base, build_engine
+from app.models import KeyResultDB, ObjectiveDB
+from app.routers.objectives import _export_chunk
+
+KR_PER_OBJECTIVE = 3
+
+
+def _fill(db: Session, start: int, stop: int) -> None:
+    batch = 50_000
+    for lo in range(start, stop, batch):
+        hi = min(lo + batch, stop)
+        db.execute(
+            insert(ObjectiveDB),
+            [{"id": i, "title": f"objective {i}"} for i in range(lo + 1, hi + 1)],
+        )
+        db.execute(
+            insert(KeyResultDB),
+            [
+                {"title": f"kr {i}.{k}", "target_value": 100, "current_value": k, "objective_id": i}
+                for i in range(lo + 1, hi + 1)
+                for k in range(KR_PER_OBJECTIVE)
+            ],
+        )
+    db.commit()
+
+
+def _streamed(db: Session, batch_size: int) -> int:
+    sent = 0
+    after: int | None = 0
+    while after is not None:
+        chunk, after = _export_chunk(db, after, batch_size)
+        sent += len(chunk)
+    return sent
+
+
+def _naive(db: Session) -> int:
+    objectives = db.query(ObjectiveDB).options(selectinload(ObjectiveDB.key_results)).all()
+    body = json.dumps(
+        [
+            {
+                "id": obj.id,
+                "title": obj.title,
+                "key_results": [{"id": kr.id, "title": kr.title} for kr in obj.key_results],
+            }
+            for obj in objectives
+        ]
+    )
+    db.expunge_all()
+    return len(body)
+
+
+def _measure(fn: Callable[[], int]) -> tuple[float, float]:
+    """Секунды (без tracemalloc, он замедляет в разы) и пик памяти, МБ."""
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    print(
+        f"{'rows':>8} {'stream rows/s':>14} {'stream MB':>10} "
+        f"{'naive rows/s':>13} {'naive MB':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{Path(tmp) / 'export.db'}", env="prod")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+        total = 0
+        for rows in sorted(args.rows):
+            with session_factory() as db:
+                _fill(db, total, rows)
+                total = rows
+
+            with session_factory() as db:
+                seconds, peak = _measure(lambda db=db: _streamed(db, args.batch_size))
+            naive = f"{'-':>13} {'-':>9}"
+            if rows <= 100_000:
+                with session_factory() as db:
+                    naive_seconds, naive_peak = _measure(lambda db=db: _naive(db))
+                naive = f"{rows / naive_seconds:>13.0f} {naive_peak:>9.1f}"
+            print(f"{rows:>8} {rows / seconds:>14.0f} {peak:>10.1f} {naive}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
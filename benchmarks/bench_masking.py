@@ -0,0 +1,115 @@
+"""
+Пропускная способность маскирования PII на больших трейсбеках.
+
+Запуск: python -m benchmarks.bench_masking [--size KB] [--repeat N] [--max-rule-ns NS]
+
+Сравнивается:
+- sequential: отдельный re.sub на каждое правило (как было в errors._mask_pii);
+- single-pass: MaskingEngine — одна скомпилированная альтернация.
+Правила добавляются по одному. Single-pass не должен платить за правило
+попыткой регулярки в каждой позиции: правило добавляет к байту текста лишь
+поиск своих подсказок (str.find). В конце печатается средняя цена одного
+добавленного правила в нс/байт; с --max-rule-ns бенчмарк падает, если она выше.
+"""
+
+import argparse
+import time
+
+from app.masking import DEFAULT_RULES, MaskingEngine, MaskRule
+
+# Дополнительные правила, чтобы было видно поведение при росте их числа
+EXTRA_RULES = (
+    MaskRule("jwt", r"\beyJ[\w-]{10,}\.[\w-]{10,}\.[\w-]{10,}", "[jwt]", hints=("eyj",)),
+    MaskRule("aws_key", r"\bAKIA[0-9A-Z]{16}\b", "[aws-key]", hints=("akia",)),
+    MaskRule("url_creds", r"(?<=://)[^/\s:@]+:[^/\s@]+@", "[creds]@", hints=("://",)),
+    MaskRule(
+        "private_key",
+        r"-----BEGIN [A-Z ]*PRIVATE KEY-----[\s\S]*?-----END [A-Z ]*PRIVATE KEY-----",
+        "[private-key]",
+        hints=("private key",),
+        multiline=True,
+    ),
+)
+
+TRACE_LINE = (
+    '  File "/app/app/routers/objectives.py", line {n}, in update_objective\n'
+    "    raise ValueError(f'bad payload for objective {n}: {{payload!r}}')\n"
+)
+# типичное содержимое сообщения об ошибке: email и пара password=...
+SECRETS = "login failed for alice@example.com with password=hunter2\n"
+
+
+def _traceback(size_kb: int) -> str:
+    parts = ["Traceback (most recent call last):\n"]
+    total, n = 0, 0
+    while total < size_kb * 1024:
+        chunk = TRACE_LINE.format(n=n) + (SECRETS if n % 50 == 0 else "")
+        parts.append(chunk)
+        total += len(chunk)
+        n += 1
+    return "".join(parts)
+
+
+def _sequential(rules: tuple[MaskRule, ...]):
+    engines = [MaskingEngine([r], max_scan=1 << 30) for r in rules]
+
+    def mask(text: str) -> str:
+        for engine in engines:
+            text = engine.pattern.sub(engine._replace, text)
+        return text
+
+    return mask
+
+
+def _mb_per_s(fn, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return len(text) * repeat / (time.perf_counter() - start) / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=256, help="размер трейсбека, KB")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--max-rule-ns",
+        type=float,
+        default=None,
+        help="упасть, если правило в среднем добавляет больше NS нс на байт",
+    )
+    args = parser.parse_args()
+
+    text = _traceback(args.size)
+    all_rules = DEFAULT_RULES + EXTRA_RULES
+    print(f"traceback: {len(text) / 1024:.0f} KB")
+    print(f"{'rules':>5} {'sequential MB/s':>16} {'single-pass MB/s':>17}")
+    seq_rates, rates = [], []
+    for k in range(1, len(all_rules) + 1):
+        rules = all_rules[:k]
+        engine = MaskingEngine(rules, max_scan=len(text))
+        seq_rates.append(_mb_per_s(_sequential(rules), text, args.repeat))
+        rates.append(_mb_per_s(engine.mask, text, args.repeat))
+        print(f"{k:>5} {seq_rates[-1]:>16.1f} {rates[-1]:>17.1f}")
+
+    # МБ/с -> нс/байт: 1000 / rate; средний прирост на одно добавленное правило
+    def per_rule_ns(series: list[float]) -> float:
+        return (1000 / series[-1] - 1000 / series[0]) / (len(series) - 1)
+
+    rule_ns = per_rule_ns(rates)
+    print(
+        f"cost per added rule: single-pass {rule_ns:.1f} ns/byte, "
+        f"sequential {per_rule_ns(seq_rates):.1f} ns/byte"
+    )
+    if args.max_rule_ns is not None and rule_ns > args.max_rule_ns:
+        raise SystemExit(f"a rule costs {rule_ns:.1f} ns/byte > {args.max_rule_ns}")
+
+    capped = MaskingEngine(all_rules)
+    print(
+        f"cap {capped.max_scan // 1024} KB: "
+        f"{_mb_per_s(capped.mask, text, args.repeat):.1f} MB/s на входе {args.size} KB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Накладные расходы middleware на один запрос: старый стек из девяти
+BaseHTTPMiddleware против единого SecurityPipeline.
+
+Запуск: python -m benchmarks.bench_middleware [--requests N]
+
+Эндпойнт-заглушка ничего не делает, поэтому разница с вариантом `bare`
+— это чистая стоимость middleware.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+
+from fastapi import FastAPI, Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message
+
+from app.main import ALLOWED_HOSTS
+from app.middleware.pipeline import SecurityPipeline, default_stages
+
+CallNext = Callable[[Request], Awaitable[Response]]
+
+
+def _endpoint_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/objectives/{obj_id}")
+    async def get_objective(obj_id: int) -> dict[str, int]:
+        return {"id": obj_id}
+
+    return app
+
+
+def _legacy_app() -> FastAPI:
+    """Воспроизводит прежний стек: каждая проверка — отдельный BaseHTTPMiddleware."""
+    app = _endpoint_app()
+    hits: defaultdict[str, list[float]] = defaultdict(list)
+
+    def problem(code: int) -> Response:
+        return Response(json.dumps({"status": code}), code, media_type="application/problem+json")
+
+    async def trusted_host(request: Request, call_next: CallNext) -> Response:
+        host = request.headers.get("host", "")
+        if not any(host.endswith(h) for h in ALLOWED_HOSTS):
+            return problem(400)
+        return await call_next(request)
+
+    async def rate_limit(request: Request, call_next: CallNext) -> Response:
+        ip, now = request.client.host if request.client else "", time.time()
+        hits[ip] = [t for t in hits[ip] if now - t < 0.01] + [now]
+        return await call_next(request)
+
+    async def idempotency(request: Request, call_next: CallNext) -> Response:
+        if request.method != "POST":
+            return await call_next(request)
+        return await call_next(request)
+
+    async def authz(request: Request, call_next: CallNext) -> Response:
+        if request.method in {"DELETE", "PUT"} and not request.headers.get("X-User-Id"):
+            return problem(401)
+        return await call_next(request)
+
+    async def hsts(request: Request, call_next: CallNext) -> Response:
+        response = await call_next(request)
+        response.headers["Strict-Transport-Security"] = "max-age=15552000; includeSubDomains"
+        return response
+
+    async def body_limit(request: Request, call_next: CallNext) -> Response:
+        if len(await request.body()) > 1024 * 1024:
+            return problem(413)
+        return await call_next(request)
+
+    async def api_key(request: Request, call_next: CallNext) -> Response:
+        return await call_next(request)
+
+    async def exceptions(request: Request, call_next: CallNext) -> Response:
+        try:
+            return await call_next(request)
+        except Exception:
+            return problem(500)
+
+    async def access_log(request: Request, call_next: CallNext) -> Response:
+        response = await call_next(request)
+        _ = f"{request.method} {request.url.path} -> {response.status_code}"
+        return response
+
+    # add_middleware вставляет в начало: последний добавленный — самый внешний
+    for dispatch in (
+        trusted_host,
+        rate_limit,
+        idempotency,
+        authz,
+        hsts,
+        body_limit,
+        api_key,
+        exceptions,
+        access_log,
+    ):
+        app.add_middleware(BaseHTTPMiddleware, dispatch=dispatch)
+    return app
+
+
+def _pipeline_app() -> FastAPI:
+    app = _endpoint_app()
+    app.add_middleware(SecurityPipeline, stages=default_stages(ALLOWED_HOSTS))
+    return app
+
+
+async def _drive(app: ASGIApp, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/objectives/1",
+        "raw_path": b"/objectives/1",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000),
+    }
+
+    never = asyncio.Event()
+
+    def make_receive() -> Callable[[], Awaitable[Message]]:
+        sent = False
+
+        async def receive() -> Message:
+            # как у сервера: тело один раз, дальше ждём disconnect
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await never.wait()
+            return {"type": "http.disconnect"}
+
+        return receive
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+
+    for _ in range(200):  # прогрев
+        await app(dict(scope), make_receive(), send)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), make_receive(), send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    # сам вывод логов в терминал не меряем
+    logging.getLogger("access").setLevel(logging.WARNING)
+
+    results = {}
+    for name, factory in (
+        ("bare", _endpoint_app),
+        ("legacy", _legacy_app),
+        ("pipeline", _pipeline_app),
+    ):
+        results[name] = asyncio.run(_drive(factory(), args.requests))
+
+    for name, us in results.items():
+        overhead = us - results["bare"]
+        print(f"{name:<9} {us:8.1f} us/request   middleware overhead {overhead:7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
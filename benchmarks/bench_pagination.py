@@ -0,0 +1,90 @@
+"""
+Стоимость страницы GET /objectives при росте таблицы.
+
+Запуск: python -m benchmarks.bench_pagination [--rows 10000 100000 1000000] [--limit N]
+
+Для каждого размера таблицы меряется выборка одной страницы в начале и в
+самом конце: keyset (WHERE id > :after) против OFFSET, и прежний вариант
+"вся таблица" (до 100 000 строк, дальше он слишком долгий).
+"""
+
+import argparse
+import tempfile
+import time
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db import Base, build_engine
+from app.models import ObjectiveDB
+from app.pagination import PageParams, keyset, split_page
+
+REPEAT = 20
+
+
+def _fill(db: Session, rows: int) -> None:
+    batch = 50_000
+    for start in range(0, rows, batch):
+        stop = min(start + batch, rows)
+        db.execute(insert(ObjectiveDB), [{"title": f"objective {i}"} for i in range(start, stop)])
+    db.commit()
+
+
+def _keyset_page(db: Session, page: PageParams) -> list[ObjectiveDB]:
+    return split_page(keyset(db.query(ObjectiveDB), ObjectiveDB.id, page).all(), page)[0]
+
+
+def _offset_page(db: Session, offset: int, limit: int) -> list[ObjectiveDB]:
+    return db.query(ObjectiveDB).order_by(ObjectiveDB.id).offset(offset).limit(limit).all()
+
+
+def _ms(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    print(
+        f"{'rows':>9} {'keyset first':>13} {'keyset last':>12} {'offset last':>12} {'all rows':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{Path(tmp) / 'pages.db'}", env="prod")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+        total = 0
+        for rows in sorted(args.rows):
+            with session_factory() as db:
+                _fill(db, rows - total)
+                total = rows
+
+                first = PageParams(args.limit, None)
+                last = PageParams(args.limit, rows - args.limit)
+                keyset_first = _ms(partial(_keyset_page, db, first))
+                keyset_last = _ms(partial(_keyset_page, db, last))
+                offset_last = _ms(partial(_offset_page, db, rows - args.limit, args.limit))
+                full = "-"
+                if rows <= 100_000:
+                    start = time.perf_counter()
+                    db.query(ObjectiveDB).all()
+                    full = f"{(time.perf_counter() - start) * 1000:.1f}"
+                db.expunge_all()
+            print(
+                f"{rows:>9} {keyset_first:>13.2f} {keyset_last:>12.2f} "
+                f"{offset_last:>12.2f} {full:>9}"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
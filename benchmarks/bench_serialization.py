@@ -0,0 +1,124 @@
+"""
+Сериализация GET /objectives: кортежи колонок + orjson против ORM + response_model.
+
+Запуск: python -m benchmarks.bench_serialization [--rows 10000 100000] [--limit N]
+
+Все страницы списка проходятся по курсору через TestClient. "Прежний" путь —
+обработчик, возвращающий ORM-объекты: FastAPI валидирует их по response_model
+(from_attributes), прогоняет через jsonable_encoder и json.dumps. Новый —
+роутер app.routers.objectives как есть (app.serialization).
+"""
+
+import argparse
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from fastapi import Depends, FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db import build_engine, get_db
+from app.models import ObjectiveDB
+from app.pagination import PageParams, keyset, page_params, set_next_link, split_page
+from app.routers import objectives
+from app.schema import ensure_schema
+from app.schemas import Objective
+
+
+def _fill(db: Session, start: int, stop: int) -> None:
+    batch = 50_000
+    for lo in range(start, stop, batch):
+        hi = min(lo + batch, stop)
+        db.execute(
+            insert(ObjectiveDB),
+            [
+                {"id": i, "title": f"objective {i}", "description": f"описание {i}"}
+                for i in range(lo + 1, hi + 1)
+            ],
+        )
+    db.commit()
+
+
+def _legacy_app() -> FastAPI:
+    legacy = FastAPI()
+
+    @legacy.get("/objectives", response_model=list[Objective])
+    def get_objectives(
+        request: Request,
+        response: Response,
+        page: PageParams = Depends(page_params),
+        db: Session = Depends(get_db),
+    ) -> Any:
+        items, next_cursor = split_page(
+            keyset(db.query(ObjectiveDB), ObjectiveDB.id, page).all(), page
+        )
+        set_next_link(request, response, next_cursor)
+        return items
+
+    return legacy
+
+
+def _fast_app() -> FastAPI:
+    fast = FastAPI()
+    fast.include_router(objectives.router, prefix="/objectives")
+    return fast
+
+
+def _walk(client: TestClient, limit: int) -> int:
+    rows = 0
+    params: dict[str, Any] = {"limit": limit}
+    while True:
+        r = client.get("/objectives", params=params)
+        rows += len(r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return rows
+        params["cursor"] = cursor
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--limit", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'legacy rows/s':>14} {'fast rows/s':>12} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{Path(tmp) / 'serialization.db'}", env="prod")
+        ensure_schema(engine)
+        session_factory = sessionmaker(bind=engine)
+
+        def override_db() -> Iterator[Session]:
+            with session_factory() as db:
+                yield db
+
+        clients = {}
+        for name, api in (("legacy", _legacy_app()), ("fast", _fast_app())):
+            api.dependency_overrides[get_db] = override_db
+            clients[name] = TestClient(api)
+
+        total = 0
+        for rows in sorted(args.rows):
+            with session_factory() as db:
+                _fill(db, total, rows)
+                total = rows
+
+            rate = {}
+            for name, client in clients.items():
+                _walk(client, args.limit)  # прогрев: кэш страниц SQLite
+                start = time.perf_counter()
+                assert _walk(client, args.limit) == rows
+                rate[name] = rows / (time.perf_counter() - start)
+            print(
+                f"{rows:>8} {rate['legacy']:>14.0f} {rate['fast']:>12.0f} "
+                f"{rate['fast'] / rate['legacy']:>7.1f}x"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
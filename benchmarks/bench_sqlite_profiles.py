@@ -0,0 +1,115 @@
+"""
+Смешанная нагрузка на SQLite до и после профиля PRAGMA из app.db.
+
+Запуск: python -m benchmarks.bench_sqlite_profiles [--seconds S] [--writers W] [--readers R]
+
+W потоков делают то же, что PUT /key_results/{id} (SELECT + UPDATE + commit),
+R потоков — чтение цели с её key results. Для каждого профиля печатается
+пропускная способность записи, p50/p95 чтения и число ошибок "database is locked".
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db import SQLITE_PROFILES, Base, build_engine
+from app.models import KeyResultDB, ObjectiveDB
+
+OBJECTIVES = 50
+KEY_RESULTS_PER_OBJECTIVE = 5
+
+
+def _seed(session_factory: sessionmaker) -> None:
+    with session_factory() as db:
+        for i in range(1, OBJECTIVES + 1):
+            obj = ObjectiveDB(id=i, title=f"objective {i}")
+            obj.key_results = [
+                KeyResultDB(title=f"kr {i}.{k}", target_value=100, current_value=0)
+                for k in range(KEY_RESULTS_PER_OBJECTIVE)
+            ]
+            db.add(obj)
+        db.commit()
+
+
+def _run(profile: str, path: Path, seconds: float, writers: int, readers: int) -> str:
+    engine = build_engine(f"sqlite:///{path}", env="prod", profile=profile)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    _seed(session_factory)
+
+    stop = threading.Event()
+    writes = [0] * writers
+    locked = [0] * (writers + readers)
+    latencies: list[list[float]] = [[] for _ in range(readers)]
+    kr_ids = OBJECTIVES * KEY_RESULTS_PER_OBJECTIVE
+
+    def writer(n: int) -> None:
+        rnd = random.Random(n)  # noqa: S311
+        while not stop.is_set():
+            try:
+                with session_factory() as db:
+                    kr = db.get(KeyResultDB, rnd.randint(1, kr_ids))
+                    if kr is not None:
+                        kr.current_value = rnd.randint(0, 99)
+                    db.commit()
+                writes[n] += 1
+            except OperationalError:
+                locked[n] += 1
+
+    def reader(n: int) -> None:
+        rnd = random.Random(1000 + n)  # noqa: S311
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with session_factory() as db:
+                    obj = db.get(ObjectiveDB, rnd.randint(1, OBJECTIVES))
+                    if obj is not None:
+                        len(obj.key_results)
+                latencies[n].append(time.perf_counter() - start)
+            except OperationalError:
+                locked[writers + n] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    reads = sorted(x for per_thread in latencies for x in per_thread)
+    p50 = statistics.median(reads) * 1000 if reads else 0.0
+    p95 = reads[int(len(reads) * 0.95)] * 1000 if reads else 0.0
+    return (
+        f"{profile:>12} {sum(writes) / seconds:>10.0f} {len(reads) / seconds:>10.0f} "
+        f"{p50:>9.2f} {p95:>9.2f} {sum(locked):>7}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(
+        f"{'profile':>12} {'writes/s':>10} {'reads/s':>10} {'read p50':>9} {'read p95':>9} {'locked':>7}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in SQLITE_PROFILES:
+            path = Path(tmp) / f"{profile}.db"
+            print(_run(profile, path, args.seconds, args.writers, args.readers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Холодный старт: импорт app.main и время до первого обслуженного запроса.
+
+Запуск: python -m benchmarks.bench_startup [--runs N]
+
+Каждый замер — отдельный процесс python (как воркер uvicorn) над уже
+подготовленной БД во временном каталоге. "import" — только `import app.main`,
+"first request" — импорт, lifespan и GET /objectives?limit=1. Варианты
+lifespan: init_db при старте (по умолчанию) и DB_INIT_ON_STARTUP=0, когда
+схему заранее ставит `python -m app.schema`.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# клиент (httpx) импортируется до отсчёта: воркеру uvicorn он не нужен
+PROBE = """
+import time
+from fastapi.testclient import TestClient
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+with TestClient(app.main.app) as client:
+    assert client.get("/objectives", params={"limit": 1}).status_code == 200
+print((imported - start) * 1000, (time.perf_counter() - start) * 1000)
+"""
+
+
+def _run(env: dict[str, str], runs: int) -> tuple[float, float]:
+    imports, firsts = [], []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            env=env,
+            cwd=env["PROBE_CWD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        imports.append(float(out[-2]))
+        firsts.append(float(out[-1]))
+    return statistics.median(imports), statistics.median(firsts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=11)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "PYTHONPATH": str(ROOT),
+            "PROBE_CWD": tmp,
+            "DATABASE_URL": f"sqlite:///{Path(tmp) / 'db' / 'startup.db'}",
+        }
+        subprocess.run([sys.executable, "-m", "app.schema"], env=env, cwd=tmp, check=True)
+
+        print(f"{'lifespan':>22} {'import ms':>10} {'first request ms':>17}")
+        for name, extra in (
+            ("init_db on startup", {}),
+            ("DB_INIT_ON_STARTUP=0", {"DB_INIT_ON_STARTUP": "0"}),
+        ):
+            imported, first = _run({**env, **extra}, args.runs)
+            print(f"{name:>22} {imported:>10.0f} {first:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Задержка, которую бэкенд состояния добавляет к одному запросу.
+
+Запуск: python -m benchmarks.bench_state_backends [--ops N] [--workers W]
+
+Для каждого бэкенда меряется:
+- rate limit: два take() на запрос (общее правило + write/enum);
+- idempotency: get_response() промах + put_response() для POST с ключом;
+- sqlite x W: то же rate-limit-измерение, когда W процессов бьют в один файл.
+"""
+
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+from app.middleware.ratelimit import RateRule
+from app.middleware.state import MemoryStateBackend, SQLiteStateBackend, StateBackend
+
+RULE = RateRule("bench", limit=1_000_000, window_seconds=1.0)
+
+
+def _rate_limit_us(backend: StateBackend, ops: int) -> float:
+    start = time.perf_counter()
+    for i in range(ops):
+        now = time.time()
+        backend.take(f"10.0.{i % 256}.1", RULE, now)
+        backend.take(f"write:10.0.{i % 256}.1", RULE, now)
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def _idempotency_us(backend: StateBackend, ops: int) -> float:
+    body = b'{"id": 1, "title": "bench"}'
+    start = time.perf_counter()
+    for i in range(ops):
+        now = time.time()
+        key = f"key-{time.monotonic_ns()}-{i}"
+        backend.get_response(key, now)
+        backend.put_response(key, (body, 200, "application/json"), now, ttl=60)
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def _contended_worker(path: str, ops: int, out: "multiprocessing.Queue[float]") -> None:
+    out.put(_rate_limit_us(SQLiteStateBackend(path), ops))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "state.db")
+        backends: list[tuple[str, StateBackend]] = [
+            ("memory", MemoryStateBackend()),
+            ("sqlite", SQLiteStateBackend(path)),
+        ]
+        for name, backend in backends:
+            rl = _rate_limit_us(backend, args.ops)
+            idem = _idempotency_us(backend, args.ops)
+            print(
+                f"{name:<10} rate limit {rl:8.1f} us/request   idempotency {idem:8.1f} us/request"
+            )
+
+        ctx = multiprocessing.get_context("spawn")
+        out = ctx.Queue()
+        procs = [
+            ctx.Process(target=_contended_worker, args=(path, args.ops, out))
+            for _ in range(args.workers)
+        ]
+        for p in procs:
+            p.start()
+        per_worker = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+        avg = sum(per_worker) / len(per_worker)
+        print(f"sqlite x{args.workers:<3} rate limit {avg:8.1f} us/request (per worker, contended)")
+
+
+if __name__ == "__main__":
+    main()
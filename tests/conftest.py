@@ -1,7 +1,144 @@
 # tests/conftest.py
+import logging
+import re
 import sys
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
 from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
 
 ROOT = Path(__file__).resolve().parents[1]  # корень репозитория
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _lifespan() -> None:
+    # импорт app.main БД не готовит и поток записи логов не запускает (это делает
+    # lifespan), а клиенты в тестах создаются без `with TestClient(...)` — схема,
+    # seed и поток логов ставятся здесь один раз
+    from app import logs
+    from app.db import engine
+    from app.schema import init_db
+
+    init_db(engine)
+    logs.start()  # тоже работа lifespan
+
+
+@pytest.fixture(autouse=True)
+def _caplog_app_loggers(request: pytest.FixtureRequest) -> Iterator[None]:
+    # access/error_logger не передают записи в root (app.logs.attach),
+    # поэтому обработчик caplog вешается на них напрямую
+    if "caplog" not in request.fixturenames:
+        yield
+        return
+    handler = request.getfixturevalue("caplog").handler
+    loggers = [logging.getLogger(name) for name in ("access", "error_logger")]
+    for logger in loggers:
+        logger.addHandler(handler)
+    yield
+    for logger in loggers:
+        logger.removeHandler(handler)
+
+
+@pytest.fixture
+def query_budget() -> Callable[[httpx.Response, int], int]:
+    """
+    check(response, budget): не больше budget SQL-выражений по заголовку
+    Server-Timing (app.middleware.query_stats). Возвращает их число.
+    """
+
+    def check(response: httpx.Response, budget: int) -> int:
+        match = re.search(r'desc="(\d+) statements"', response.headers["server-timing"])
+        assert match, response.headers["server-timing"]
+        count = int(match.group(1))
+        request = f"{response.request.method} {response.request.url.path}"
+        assert count <= budget, f"{request}: {count} SQL statements, budget {budget}"
+        return count
+
+    return check
+
+
+@pytest.fixture(scope="session")
+def sync_client() -> TestClient:
+    """
+    Приложение из одних sync-роутеров (без middleware) при любом DB_STACK: их SQL
+    идёт через sync engine, где его видит capture_statements.
+    """
+    from app.routers import key_results, objectives
+
+    plain = FastAPI()
+    plain.include_router(objectives.router, prefix="/objectives")
+    plain.include_router(key_results.router, prefix="/key_results")
+    return TestClient(plain)
+
+
+@pytest.fixture(scope="session")
+def async_client() -> TestClient:
+    """Те же роутеры в async-варианте (AsyncSession.run_sync), тоже без middleware."""
+    from app.routers import key_results, objectives
+
+    plain = FastAPI()
+    plain.include_router(objectives.async_router, prefix="/objectives")
+    plain.include_router(key_results.async_router, prefix="/key_results")
+    return TestClient(plain)
+
+
+@pytest.fixture
+def seed_objective() -> Callable[..., tuple[int, list[int]]]:
+    """
+    seed_objective(client, *current_values, title=..., target_value=10) — цель и по
+    key result "KR i" на каждое current_value, через bulk-эндпоинты клиента.
+    Возвращает (objective_id, id key results в порядке значений).
+    """
+
+    def seed(
+        c: TestClient, *current_values: int, title: str = "Seeded", target_value: int = 10
+    ) -> tuple[int, list[int]]:
+        obj_id = c.post("/objectives/bulk", json=[{"title": title}]).json()["created"][0]
+        if not current_values:
+            return obj_id, []
+        payload = [
+            {
+                "title": f"KR {i}",
+                "target_value": target_value,
+                "current_value": value,
+                "objective_id": obj_id,
+            }
+            for i, value in enumerate(current_values)
+        ]
+        body = c.post("/key_results/bulk", json=payload).json()
+        assert body["errors"] == []
+        return obj_id, body["created"]
+
+    return seed
+
+
+@pytest.fixture
+def capture_statements() -> Callable[[], AbstractContextManager[list[tuple[str, Any]]]]:
+    """
+    `with capture_statements() as seen:` — SQL, выполненный sync engine внутри
+    блока: пары (выражение, параметры), у executemany — параметры первой строки.
+    """
+    from app.db import engine
+
+    @contextmanager
+    def capture() -> Iterator[list[tuple[str, Any]]]:
+        seen: list[tuple[str, Any]] = []
+
+        def before(conn, cursor, statement, parameters, context, executemany):  # noqa: ANN001
+            seen.append((statement, parameters[0] if executemany else parameters))
+
+        event.listen(engine, "before_cursor_execute", before)
+        try:
+            yield seen
+        finally:
+            event.remove(engine, "before_cursor_execute", before)
+
+    return capture
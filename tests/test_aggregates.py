@@ -0,0 +1,139 @@
+# objective_progress: суммы, которые ведут триггеры, не расходятся с key_results
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    insert,
+    inspect,
+    select,
+    update,
+)
+
+from app import aggregates
+from app.db import build_engine, engine
+from app.main import app
+from app.models import PROGRESS_TRIGGERS, VERSION_TRIGGERS, KeyResultDB, ObjectiveProgressDB
+from app.schema import ensure_schema
+
+client = TestClient(app)
+
+
+def _no_drift() -> None:
+    with engine.connect() as conn:
+        assert aggregates.find_drift(conn) == {}
+
+
+def test_every_write_path_keeps_progress_in_sync():
+    obj_id, other_id = client.post(
+        "/objectives/bulk", json=[{"title": "Agg"}, {"title": "Agg other"}]
+    ).json()["created"]
+    kr = client.post(
+        "/key_results",
+        json={"title": "one", "target_value": 10, "current_value": 2, "objective_id": obj_id},
+    ).json()
+    bulk = client.post(
+        "/key_results/bulk",
+        json=[{"title": f"b{i}", "target_value": 5, "objective_id": obj_id} for i in range(3)],
+    ).json()["created"]
+    _no_drift()
+    assert client.get(f"/objectives/{obj_id}/progress").json()["progress"] == "8.0%"
+
+    client.put(f"/key_results/{kr['id']}", params={"current_value": 10})
+    client.put(
+        "/key_results/progress",
+        json=[{"kr_id": kr_id, "current_value": 5} for kr_id in bulk],
+    )
+    _no_drift()
+    assert client.get(f"/objectives/{obj_id}/progress").json()["progress"] == "100.0%"
+
+    client.delete(f"/key_results/{kr['id']}")
+    _no_drift()
+    assert client.get(f"/objectives/{obj_id}/progress").json()["progress"] == "100.0%"
+
+    # перенос KR в другую цель и удаление цели целиком
+    with engine.begin() as conn:
+        conn.execute(
+            update(KeyResultDB).where(KeyResultDB.id == bulk[0]).values(objective_id=other_id)
+        )
+    _no_drift()
+    client.delete(f"/objectives/{obj_id}")
+    _no_drift()
+    with engine.connect() as conn:
+        stored = select(ObjectiveProgressDB).where(ObjectiveProgressDB.objective_id == obj_id)
+        assert conn.execute(stored).first() is None
+
+
+def test_progress_404_when_objective_has_no_key_results():
+    obj_id = client.post("/objectives", json={"title": "Empty"}).json()["id"]
+    assert client.get(f"/objectives/{obj_id}/progress").status_code == 404
+
+
+def test_check_and_rebuild_repair_drift():
+    with engine.begin() as conn:
+        conn.execute(update(ObjectiveProgressDB).values(kr_count=ObjectiveProgressDB.kr_count + 1))
+    assert aggregates.main(["check"]) == 1
+    assert aggregates.main(["rebuild"]) == 0
+    assert aggregates.main(["check"]) == 0
+
+
+def test_ensure_schema_backfills_existing_database(tmp_path: Path):
+    old = build_engine(f"sqlite:///{tmp_path / 'old.db'}", env="ci")
+    # схема до появления objective_progress
+    meta = MetaData()
+    objectives = Table(
+        "objectives", meta, Column("id", Integer, primary_key=True), Column("title", String)
+    )
+    key_results = Table(
+        "key_results",
+        meta,
+        Column("id", Integer, primary_key=True),
+        Column("objective_id", Integer, ForeignKey("objectives.id")),
+        Column("title", String),
+        Column("target_value", Integer),
+        Column("current_value", Integer),
+    )
+    meta.create_all(old)
+    with old.begin() as conn:
+        conn.execute(insert(objectives), [{"id": 1, "title": "legacy"}])
+        conn.execute(
+            insert(key_results),
+            [
+                {"objective_id": 1, "title": "a", "target_value": 4, "current_value": 1},
+                {"objective_id": 1, "title": "b", "target_value": 6, "current_value": 2},
+            ],
+        )
+
+    ensure_schema(old)
+    ensure_schema(old)  # повторный запуск ничего не ломает
+    with old.begin() as conn:
+        assert aggregates.find_drift(conn) == {}
+        conn.execute(
+            insert(key_results),
+            [{"objective_id": 1, "title": "c", "target_value": 1, "current_value": 0}],
+        )
+        assert aggregates.find_drift(conn) == {}
+        row = conn.execute(select(ObjectiveProgressDB)).one()
+    assert (row.target_total, row.current_total, row.kr_count) == (11, 3, 3)
+    indexes = {ix["name"] for ix in inspect(old).get_indexes("key_results")}
+    assert "ix_key_results_objective_id" in indexes
+    assert "version" in {column["name"] for column in inspect(old).get_columns("objectives")}
+    old.dispose()
+
+
+def test_ensure_schema_creates_empty_database(tmp_path: Path):
+    fresh = build_engine(f"sqlite:///{tmp_path / 'fresh.db'}", env="ci")
+    ensure_schema(fresh)
+    triggers = {
+        name
+        for (name,) in fresh.connect().exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        )
+    }
+    assert triggers >= {*PROGRESS_TRIGGERS, *VERSION_TRIGGERS}
+    fresh.dispose()
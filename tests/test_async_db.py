@@ -0,0 +1,44 @@
+# DB_STACK=async: те же обработчики на AsyncSession
+import inspect
+
+from fastapi.routing import APIRoute
+
+from app.db import async_url
+
+
+def test_async_routes_do_not_use_thread_pool(async_client):
+    routes = [r for r in async_client.app.routes if isinstance(r, APIRoute)]
+    assert routes
+    assert all(inspect.iscoroutinefunction(r.endpoint) for r in routes)
+
+
+def test_async_url_switches_sqlite_driver():
+    assert async_url("sqlite:///data/dev.db") == "sqlite+aiosqlite:///data/dev.db"
+    assert async_url("sqlite://") == "sqlite+aiosqlite://"
+
+
+def test_async_objective_and_key_result_lifecycle(async_client):
+    client = async_client
+    obj = client.post("/objectives", json={"title": "Async objective"}).json()
+    assert client.get(f"/objectives/{obj['id']}").json()["title"] == "Async objective"
+
+    kr = client.post(
+        "/key_results",
+        json={"title": "KR", "target_value": 10, "current_value": 0, "objective_id": obj["id"]},
+    ).json()
+    r = client.put(f"/key_results/{kr['id']}", params={"current_value": 5})
+    assert r.json()["current_value"] == 5
+    assert client.get(f"/objectives/{obj['id']}/progress").json()["progress"] == "50.0%"
+    assert [k["id"] for k in client.get(f"/key_results/{obj['id']}/by_objective").json()] == [
+        kr["id"]
+    ]
+
+    r = client.delete(f"/objectives/{obj['id']}")
+    assert r.json() == {"status": "deleted", "objective_id": obj["id"], "deleted_key_results": 1}
+    assert client.get(f"/objectives/{obj['id']}").status_code == 404
+
+
+def test_async_errors_match_sync_stack(async_client):
+    client = async_client
+    assert client.get("/objectives/99999999").json() == {"detail": "Objective not found"}
+    assert client.put("/key_results/99999999", params={"current_value": 1}).status_code == 404
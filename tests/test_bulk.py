@@ -0,0 +1,109 @@
+# POST /objectives/bulk и /key_results/bulk
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event
+
+from app.db import engine
+from app.main import app
+from app.models import ObjectiveDB
+from app.schemas import BULK_MAX_ITEMS
+
+client = TestClient(app)
+
+
+def test_bulk_objectives_returns_ids_in_input_order():
+    payload = [{"title": f"Bulk {i}"} for i in range(5)]
+    r = client.post("/objectives/bulk", json=payload)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["errors"] == []
+    assert len(body["created"]) == 5
+    assert body["created"] == sorted(body["created"])
+    assert client.get(f"/objectives/{body['created'][3]}").json()["title"] == "Bulk 3"
+
+
+def test_bulk_key_results_reports_errors_per_row():
+    obj_id = client.post("/objectives/bulk", json=[{"title": "KR parent"}]).json()["created"][0]
+    payload = [
+        {"title": "ok-1", "target_value": 10, "current_value": 1, "objective_id": obj_id},
+        {"title": "orphan", "target_value": 10, "current_value": 1, "objective_id": 10**9},
+        {"title": "done", "target_value": 10, "current_value": 10, "objective_id": obj_id},
+        {"title": "ok-2", "target_value": 5, "objective_id": obj_id},
+    ]
+    r = client.post("/key_results/bulk", json=payload)
+    assert r.status_code == 200
+    body = r.json()
+    assert [e["index"] for e in body["errors"]] == [1, 2]
+    assert body["errors"][0]["detail"] == "Objective not found"
+
+    titles = [kr["title"] for kr in client.get(f"/key_results/{obj_id}/by_objective").json()]
+    assert titles == ["ok-1", "ok-2"]
+    assert len(body["created"]) == 2
+
+
+def test_bulk_rejects_empty_and_oversized_batches():
+    assert client.post("/objectives/bulk", json=[]).status_code == 422
+    too_many = [{"title": "x"}] * (BULK_MAX_ITEMS + 1)
+    assert client.post("/objectives/bulk", json=too_many).status_code == 422
+
+
+def test_async_bulk_endpoints(async_client):
+    c = async_client
+    created = c.post("/objectives/bulk", json=[{"title": "a"}, {"title": "b"}]).json()["created"]
+    assert len(created) == 2
+    r = c.post(
+        "/key_results/bulk",
+        json=[{"title": "kr", "target_value": 3, "objective_id": created[1]}],
+    )
+    assert r.json()["errors"] == []
+    assert len(r.json()["created"]) == 1
+
+
+def test_bulk_is_one_insert_for_all_rows(sync_client, capture_statements):
+    def inserts(seen: list) -> list[str]:
+        return [s for s, _ in seen if s.lstrip().upper().startswith("INSERT")]
+
+    with capture_statements() as seen:
+        r = sync_client.post("/objectives/bulk", json=[{"title": "one"}] * 20)
+        created = r.json()["created"]
+        assert len(inserts(seen)) == 1
+        sync_client.post(
+            "/key_results/bulk",
+            json=[{"title": "kr", "target_value": 3, "objective_id": created[0]}] * 20,
+        )
+        assert len(inserts(seen)) == 2
+    assert len(created) == 20
+
+
+def test_bulk_key_results_survives_objective_deleted_before_insert(sync_client):
+    gone, kept = sync_client.post(
+        "/objectives/bulk", json=[{"title": "gone"}, {"title": "kept"}]
+    ).json()["created"]
+    deleted: list[int] = []
+
+    # цель удаляется другим соединением после проверки IN, но до INSERT
+    def before(conn, cursor, statement, *args):  # noqa: ANN001
+        if not deleted and statement.startswith("INSERT INTO key_results"):
+            deleted.append(gone)
+            with engine.begin() as other:
+                other.execute(delete(ObjectiveDB).where(ObjectiveDB.id == gone))
+
+    event.listen(engine, "before_cursor_execute", before)
+    try:
+        r = sync_client.post(
+            "/key_results/bulk",
+            json=[
+                {"title": "a", "target_value": 3, "objective_id": kept},
+                {"title": "b", "target_value": 3, "objective_id": gone},
+                {"title": "c", "target_value": 3, "objective_id": kept},
+            ],
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+
+    assert deleted == [gone]
+    assert r.status_code == 200
+    body = r.json()
+    assert body["errors"] == [{"index": 1, "detail": "Objective not found"}]
+    assert len(body["created"]) == 2
+    titles = [kr["title"] for kr in sync_client.get(f"/key_results/{kept}/by_objective").json()]
+    assert titles == ["a", "c"]
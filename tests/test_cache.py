@@ -0,0 +1,132 @@
+# Кэш тел ответов: границы, счётчики и отсутствие устаревших чтений после записи
+from fastapi.testclient import TestClient
+
+from app.cache import CACHE_EVICTIONS, CachedBody, ResponseCache
+from app.main import app
+
+client = TestClient(app)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_entry_and_byte_bounds():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.put(("a", 1), CachedBody(b"xxx"), 0)
+    cache.put(("a", 2), CachedBody(b"yyy"), 0)
+    assert cache.get(("a", 1)) is not None  # 1 теперь свежее 2
+    cache.put(("a", 3), CachedBody(b"zzz"), 0)
+    assert cache.get(("a", 2)) is None
+    assert cache.size == (2, 6)
+
+    cache.put(("a", 4), CachedBody(b"12345678"), 0)
+    assert cache.size == (1, 8)
+    cache.put(("a", 5), CachedBody(b"x" * 11), 0)  # больше max_bytes — не кэшируется
+    assert cache.get(("a", 5)) is None
+
+
+def test_ttl_expiry_counts_as_eviction():
+    clock = FakeClock()
+    cache = ResponseCache(ttl=5, clock=clock)
+    before = CACHE_EVICTIONS.values.get(("ttl",), 0)
+    cache.put(("a", 1), CachedBody(b"x"), 0)
+    clock.now = 4.9
+    assert cache.get(("a", 1)) is not None
+    clock.now = 5.0
+    assert cache.get(("a", 1)) is None
+    assert CACHE_EVICTIONS.values[("ttl",)] == before + 1
+
+
+def test_read_started_before_invalidation_is_not_stored():
+    cache = ResponseCache()
+
+    def load_racing_with_write() -> CachedBody:
+        cache.invalidate([1])  # запись закоммитилась, пока шло чтение
+        return CachedBody(b"old")
+
+    body, hit = cache.read_through(("a", 1), load_racing_with_write)
+    assert (body.body, hit) == (b"old", False)
+    assert cache.get(("a", 1)) is None
+
+
+def test_invalidation_state_does_not_grow_with_objectives():
+    cache = ResponseCache()
+    cache.put(("a", 1), CachedBody(b"x"), cache.generation())
+    cache.invalidate(range(10_000))
+    assert cache.size == (0, 0)
+
+    # clear() тоже отсекает чтение, начатое до него
+    generation = cache.generation()
+    cache.clear()
+    cache.put(("a", 1), CachedBody(b"old"), generation)
+    assert cache.get(("a", 1)) is None
+    cache.put(("a", 1), CachedBody(b"new"), cache.generation())
+    assert cache.get(("a", 1)) == CachedBody(b"new")
+
+
+def test_repeated_reads_are_served_from_cache(seed_objective):
+    obj_id, _ = seed_objective(client, 1, title="Cached")
+    first = client.get(f"/objectives/{obj_id}")
+    second = client.get(f"/objectives/{obj_id}")
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert (
+        second.json()
+        == first.json()
+        == {
+            "id": obj_id,
+            "title": "Cached",
+            "description": None,
+            "isComplete": False,
+        }
+    )
+    assert "response_cache_hits_total" in client.get("/metrics").text
+
+
+def test_writes_are_never_followed_by_stale_reads(seed_objective):
+    obj_id, (kr_id,) = seed_objective(client, 1)
+
+    def progress() -> str:
+        return client.get(f"/objectives/{obj_id}/progress").json()["progress"]
+
+    def values() -> list[int]:
+        return [
+            kr["current_value"] for kr in client.get(f"/key_results/{obj_id}/by_objective").json()
+        ]
+
+    assert (progress(), values()) == ("10.0%", [1])
+    assert (progress(), values()) == ("10.0%", [1])  # из кэша
+
+    client.put(f"/key_results/{kr_id}", params={"current_value": 5})
+    assert (progress(), values()) == ("50.0%", [5])
+
+    client.put("/key_results/progress", json=[{"kr_id": kr_id, "current_value": 6}])
+    assert (progress(), values()) == ("60.0%", [6])
+
+    client.post(
+        "/key_results/bulk", json=[{"title": "b", "target_value": 10, "objective_id": obj_id}]
+    )
+    assert (progress(), values()) == ("30.0%", [6, 0])
+
+    client.delete(f"/key_results/{kr_id}")
+    assert (progress(), values()) == ("0.0%", [0])
+
+    client.get(f"/objectives/{obj_id}")
+    client.delete(f"/objectives/{obj_id}")
+    assert client.get(f"/objectives/{obj_id}").status_code == 404
+    assert client.get(f"/objectives/{obj_id}/progress").status_code == 404
+    assert values() == []
+
+
+def test_async_router_uses_the_same_cache(async_client, seed_objective):
+    c = async_client
+    obj_id, (kr_id,) = seed_objective(client, 1)
+    assert c.get(f"/objectives/{obj_id}/progress").headers["X-Cache"] == "MISS"
+    assert c.get(f"/objectives/{obj_id}/progress").headers["X-Cache"] == "HIT"
+    c.put(f"/key_results/{kr_id}", params={"current_value": 9})
+    assert c.get(f"/objectives/{obj_id}/progress").json()["progress"] == "90.0%"
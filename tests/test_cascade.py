@@ -0,0 +1,33 @@
+# DELETE /objectives/{id}: дети удаляются каскадом в БД, без загрузки в сессию
+from sqlalchemy import func, select
+
+from app.db import SessionLocal
+from app.models import KeyResultDB
+
+
+def test_delete_objective_is_one_cascading_statement(sync_client, capture_statements):
+    obj_id = sync_client.post("/objectives", json={"title": "Cascade"}).json()["id"]
+    sync_client.post(
+        "/key_results/bulk",
+        json=[{"title": f"kr {i}", "target_value": 5, "objective_id": obj_id} for i in range(50)],
+    )
+
+    with capture_statements() as seen:
+        r = sync_client.delete(f"/objectives/{obj_id}")
+    statements = [" ".join(statement.split()) for statement, _ in seen]
+
+    assert r.json() == {"status": "deleted", "objective_id": obj_id, "deleted_key_results": 50}
+    assert not [s for s in statements if "FROM key_results" in s]
+    # счётчик снимается DELETE ... RETURNING в той же транзакции, до каскада
+    assert [s for s in statements if s.startswith("DELETE")] == [
+        "DELETE FROM objective_progress WHERE objective_progress.objective_id = ? "
+        "RETURNING kr_count",
+        "DELETE FROM objectives WHERE objectives.id = ?",
+    ]
+    with SessionLocal() as db:
+        count = select(func.count()).where(KeyResultDB.objective_id == obj_id)
+        assert db.scalar(count) == 0
+
+
+def test_delete_missing_objective_is_404(sync_client):
+    assert sync_client.delete("/objectives/999999999").status_code == 404
@@ -0,0 +1,35 @@
+# NFR: профиль PRAGMA и пул SQLite
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from app.db import build_engine
+
+
+def _pragma(engine, name: str):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_performance_profile_applies_pragmas(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'perf.db'}", env="prod", profile="performance")
+    assert _pragma(engine, "journal_mode") == "wal"
+    assert _pragma(engine, "synchronous") == 1  # NORMAL
+    assert _pragma(engine, "busy_timeout") == 5000
+    assert _pragma(engine, "foreign_keys") == 1
+    assert _pragma(engine, "temp_store") == 2  # MEMORY
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == 20
+    engine.dispose()
+
+
+def test_default_profile_keeps_sqlite_defaults(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'plain.db'}", env="ci", profile="default")
+    assert _pragma(engine, "journal_mode") == "delete"
+    assert _pragma(engine, "foreign_keys") == 1  # REQUIRED_PRAGMAS — в любом профиле
+    assert engine.pool.size() == 2
+    engine.dispose()
+
+
+def test_in_memory_database_uses_single_connection():
+    engine = build_engine("sqlite://", profile="performance")
+    assert isinstance(engine.pool, StaticPool)
+    assert _pragma(engine, "foreign_keys") == 1
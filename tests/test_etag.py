@@ -0,0 +1,73 @@
+# ETag / If-None-Match: 304 без чтения строк, версия меняется при каждой записи
+from sqlalchemy import select
+
+from app.db import SessionLocal
+from app.models import KeyResultDB
+
+
+def test_matching_if_none_match_gets_304_from_one_version_read(
+    sync_client, capture_statements, seed_objective
+):
+    obj_id, _ = seed_objective(sync_client, 1)
+    etag = sync_client.get(f"/objectives/{obj_id}").headers["ETag"]
+
+    with capture_statements() as seen:
+        r = sync_client.get(f"/objectives/{obj_id}", headers={"If-None-Match": etag})
+    statements = [" ".join(statement.split()) for statement, _ in seen]
+
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["ETag"] == etag
+    assert len(statements) == 1
+    assert statements[0].startswith("SELECT objectives.version FROM objectives")
+
+
+def test_progress_etag_changes_with_key_results(sync_client, seed_objective):
+    obj_id, (kr_id,) = seed_objective(sync_client, 1)
+    first = sync_client.get(f"/objectives/{obj_id}/progress")
+    etag = first.headers["ETag"]
+    assert (
+        sync_client.get(
+            f"/objectives/{obj_id}/progress", headers={"If-None-Match": f'W/{etag}, "other"'}
+        ).status_code
+        == 304
+    )
+
+    sync_client.put(f"/key_results/{kr_id}", params={"current_value": 4})
+    r = sync_client.get(f"/objectives/{obj_id}/progress", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["progress"] == "40.0%"
+    assert r.headers["ETag"] != etag
+
+    with SessionLocal() as db:
+        assert db.scalar(select(KeyResultDB.version).where(KeyResultDB.id == kr_id)) == 2
+
+
+def test_list_etag_follows_table_changes(sync_client):
+    params = {"limit": 5}
+    etag = sync_client.get("/objectives", params=params).headers["ETag"]
+    r = sync_client.get("/objectives", params=params, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+    sync_client.post("/objectives", json={"title": "New"})
+    r = sync_client.get("/objectives", params=params, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+
+def test_wildcard_and_missing_objective(sync_client, seed_objective):
+    obj_id, _ = seed_objective(sync_client, 1)
+    assert (
+        sync_client.get(f"/objectives/{obj_id}", headers={"If-None-Match": "*"}).status_code == 304
+    )
+    r = sync_client.get("/objectives/999999999", headers={"If-None-Match": "*"})
+    assert r.status_code == 404
+
+
+def test_async_router_conditional_get(async_client, seed_objective):
+    c = async_client
+    obj_id, _ = seed_objective(c, 1)
+    etag = c.get(f"/objectives/{obj_id}").headers["ETag"]
+    assert c.get(f"/objectives/{obj_id}", headers={"If-None-Match": etag}).status_code == 304
+    list_etag = c.get("/objectives").headers["ETag"]
+    assert c.get("/objectives", headers={"If-None-Match": list_etag}).status_code == 304
@@ -2,6 +2,7 @@ import os
 
 from fastapi.testclient import TestClient
 
+from app import logs as app_logs
 from app.main import app
 
 client = TestClient(app)
@@ -18,6 +19,7 @@ def test_exception_logging(tmp_path):
     assert r.status_code == 500
     data = r.json()
     assert "title" in data and data["title"] == "Internal Server Error"
+    assert app_logs.flush()  # запись в файл идёт в фоновом потоке
     assert os.path.exists("error.log")
     with open("error.log") as f:
         logs = f.read()
@@ -0,0 +1,58 @@
+# GET /objectives/export — NDJSON-выгрузка целей с key results
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.main import _check_response_models, app
+from app.routers import objectives
+
+client = TestClient(app)
+
+
+def _lines(c: TestClient, url: str) -> list[dict]:
+    with c.stream("GET", url) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        return [json.loads(line) for line in r.iter_lines() if line]
+
+
+def test_export_streams_every_objective_once_with_nested_key_results(seed_objective):
+    obj_id, kr_ids = seed_objective(client, 0, 1, title="Export me")
+    rows = _lines(client, "/objectives/export?batch_size=7")
+
+    ids = [row["id"] for row in rows]
+    assert ids == sorted(set(ids))
+    exported = next(row for row in rows if row["id"] == obj_id)
+    assert exported["title"] == "Export me"
+    assert [kr["id"] for kr in exported["key_results"]] == kr_ids
+    assert exported["key_results"][1] == {
+        "id": kr_ids[1],
+        "title": "KR 1",
+        "target_value": 10,
+        "current_value": 1,
+    }
+
+
+def test_export_route_does_not_shadow_objective_by_id():
+    assert client.get("/objectives/1").status_code == 200
+    assert client.get("/objectives/export?batch_size=0").status_code == 422
+
+
+def test_async_export_matches_sync_export(async_client, seed_objective):
+    seed_objective(client, 0, 1)
+    sync_rows = _lines(client, "/objectives/export")
+    async_rows = _lines(async_client, "/objectives/export?batch_size=3")
+    assert async_rows == sync_rows
+
+
+def test_streaming_routes_are_exempt_from_response_model_check():
+    checked = FastAPI()
+    checked.include_router(objectives.router, prefix="/objectives")
+    checked.add_api_route("/raw", lambda: {"raw": 1}, methods=["GET"])
+
+    with pytest.raises(RuntimeError) as error:
+        _check_response_models(checked, "enforce")
+    assert "/raw" in str(error.value)
+    assert "/objectives/export" not in str(error.value)
@@ -0,0 +1,140 @@
+# A4: Idempotency-Key — повтор, TTL и склейка конкурентных запросов
+import asyncio
+import json
+import time
+
+from app.middleware.security_full import IdempotencyKeyMiddleware
+from app.middleware.state import MemoryStateBackend
+
+
+def _scope(key: str, path: str = "/objectives") -> dict:
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "headers": [(b"idempotency-key", key.encode())],
+    }
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"{}", "more_body": False}
+
+
+async def _call(app, scope) -> tuple[int, bytes, dict]:
+    status, chunks, headers = 0, [], {}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            headers.update({k.decode(): v.decode() for k, v in message["headers"]})
+        else:
+            chunks.append(message.get("body", b""))
+
+    await app(scope, _receive, send)
+    return status, b"".join(chunks), headers
+
+
+class _CreateApp:
+    """Имитирует create_objective: каждый вызов создаёт новый id, ответ стримится."""
+
+    def __init__(self, status: int = 200, delay: float = 0.0):
+        self.calls = 0
+        self.status = status
+        self.delay = delay
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        body = json.dumps({"id": self.calls}).encode()
+        headers = [(b"content-type", b"application/json")]
+        await send({"type": "http.response.start", "status": self.status, "headers": headers})
+        await send({"type": "http.response.body", "body": body[:4], "more_body": True})
+        await send({"type": "http.response.body", "body": body[4:]})
+
+
+def test_repeat_returns_stored_streamed_body():
+    inner = _CreateApp()
+    app = IdempotencyKeyMiddleware(inner, backend=MemoryStateBackend())
+
+    first = asyncio.run(_call(app, _scope("k1")))
+    second = asyncio.run(_call(app, _scope("k1")))
+
+    assert inner.calls == 1
+    assert second[:2] == first[:2] == (200, b'{"id": 1}')
+    assert second[2]["idempotent-replayed"] == "true"
+
+
+def test_concurrent_requests_with_same_key_run_once():
+    inner = _CreateApp(delay=0.05)
+    app = IdempotencyKeyMiddleware(inner, backend=MemoryStateBackend())
+
+    async def both():
+        return await asyncio.gather(_call(app, _scope("k2")), _call(app, _scope("k2")))
+
+    a, b = asyncio.run(both())
+    assert inner.calls == 1
+    assert a[1] == b[1] == b'{"id": 1}'
+    assert app.inflight == {}
+
+
+class _SlowBlockingBackend(MemoryStateBackend):
+    """Поиск в хранилище медленный и идёт в пуле потоков, как у SQLite."""
+
+    blocking = True
+
+    def get_response(self, key, now):
+        cached = super().get_response(key, now)
+        time.sleep(0.03)  # ответ сети/диска приходит позже, чем прочитано
+        return cached
+
+
+def test_concurrent_requests_with_slow_blocking_backend_run_once():
+    inner = _CreateApp()
+    app = IdempotencyKeyMiddleware(inner, backend=_SlowBlockingBackend())
+
+    async def later():
+        # второй смотрит в хранилище, пока первый ещё не записал ответ,
+        # а получает промах уже после того, как первый освободил inflight
+        await asyncio.sleep(0.01)
+        return await _call(app, _scope("k6"))
+
+    async def both():
+        return await asyncio.gather(_call(app, _scope("k6")), later())
+
+    a, b = asyncio.run(both())
+    assert inner.calls == 1
+    assert a[1] == b[1] == b'{"id": 1}'
+    assert app.inflight == {}
+
+
+def test_server_errors_are_not_stored():
+    inner = _CreateApp(status=500)
+    app = IdempotencyKeyMiddleware(inner, backend=MemoryStateBackend())
+
+    asyncio.run(_call(app, _scope("k3")))
+    asyncio.run(_call(app, _scope("k3")))
+    assert inner.calls == 2
+
+
+def test_key_is_scoped_by_path_and_expires():
+    inner = _CreateApp()
+    backend = MemoryStateBackend()
+    app = IdempotencyKeyMiddleware(inner, backend=backend, ttl_seconds=0.01)
+
+    asyncio.run(_call(app, _scope("k4", "/objectives")))
+    asyncio.run(_call(app, _scope("k4", "/key_results")))
+    assert inner.calls == 2
+
+    asyncio.run(asyncio.sleep(0.02))
+    asyncio.run(_call(app, _scope("k4", "/objectives")))
+    assert inner.calls == 3
+
+
+def test_oversized_response_is_not_stored():
+    inner = _CreateApp()
+    app = IdempotencyKeyMiddleware(inner, backend=MemoryStateBackend(), max_body_bytes=4)
+
+    asyncio.run(_call(app, _scope("k5")))
+    asyncio.run(_call(app, _scope("k5")))
+    assert inner.calls == 2
@@ -1,6 +1,11 @@
+import asyncio
+
+import pytest
 from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
 
 from app.main import app
+from app.middleware.limits import BodySizeLimitMiddleware
 
 client = TestClient(app)
 
@@ -14,3 +19,89 @@ def test_payload_too_large():
     )
     # FastAPI по умолчанию отдаёт 422, но если стоит limit_upload_size, будет 413
     assert response.status_code in (413, 422)
+
+
+def test_content_length_rejected_before_body_is_read():
+    """Слишком большой Content-Length — 413 без чтения тела."""
+
+    async def app(scope, receive, send):
+        raise AssertionError("приложение не должно вызываться")
+
+    async def receive():
+        raise AssertionError("тело не должно читаться")
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/objectives",
+        "headers": [(b"content-length", b"2000")],
+    }
+    asyncio.run(BodySizeLimitMiddleware(app, max_body_size=1000)(scope, receive, send))
+    assert sent[0]["status"] == 413
+
+
+def test_chunked_body_aborted_once_limit_crossed():
+    """Chunked-тело: 413 сразу после превышения, дальше приложение видит disconnect."""
+    chunks = [b"x" * 400] * 10
+    seen = []
+
+    async def app(scope, receive, send):
+        while True:
+            message = await receive()
+            seen.append(message["type"])
+            if message["type"] == "http.disconnect" or not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def receive():
+        return {"type": "http.request", "body": chunks.pop(0), "more_body": bool(chunks)}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/objectives", "headers": []}
+    asyncio.run(BodySizeLimitMiddleware(app, max_body_size=1000)(scope, receive, send))
+
+    assert seen == ["http.request", "http.request", "http.disconnect"]
+    assert len(chunks) == 7  # остаток тела так и не прочитан
+    assert [m.get("status") for m in sent if m["type"] == "http.response.start"] == [413]
+
+
+def _over_limit(error: Exception) -> None:
+    async def app(scope, receive, send):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        raise error
+
+    chunks = [b"x" * 600] * 3
+
+    async def receive():
+        return {"type": "http.request", "body": chunks.pop(0), "more_body": bool(chunks)}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "POST", "path": "/objectives", "headers": []}
+    asyncio.run(BodySizeLimitMiddleware(app, max_body_size=1000)(scope, receive, send))
+
+
+def test_disconnect_after_limit_is_swallowed_other_errors_are_not():
+    _over_limit(ClientDisconnect())
+    with pytest.raises(ValueError, match="real bug"):
+        _over_limit(ValueError("real bug"))
+
+
+def test_upload_route_has_own_limit():
+    """/files/upload пропускает тело > 1 MB (лимит 5 MB), дальше решает обработчик."""
+    data = b"not an image" + b"x" * (2 * 1024 * 1024)
+    r = client.post("/files/upload", files={"file": ("big.txt", data, "text/plain")})
+    assert r.status_code == 400
+    assert "Invalid file type" in r.text
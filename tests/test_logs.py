@@ -0,0 +1,93 @@
+# NFR-06: неблокирующий структурированный access/error-лог
+import io
+import json
+import logging
+
+from fastapi.testclient import TestClient
+
+from app import logs
+from app.main import app
+from app.middleware.access import AccessLogMiddleware
+from app.middleware.errors import _ensure_logger
+
+client = TestClient(app)
+
+
+def _record(msg: str, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("t", logging.INFO, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_emits_structured_fields():
+    line = logs.JsonFormatter().format(
+        _record("GET /objectives -> 200", status=200, latency_ms=1.5, route="/objectives")
+    )
+    entry = json.loads(line)
+    assert entry["msg"] == "GET /objectives -> 200"
+    assert entry["status"] == 200
+    assert entry["latency_ms"] == 1.5
+    assert entry["route"] == "/objectives"
+    assert "request_id" not in entry
+
+
+def test_writer_batches_and_counts_drops():
+    writer = logs.BatchLogWriter(max_queue=3)
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    writer.add_target(logging.getLogger("t"), handler)
+
+    for i in range(5):
+        writer.put(_record(f"line {i}"))
+    assert writer.stats() == {"queue_depth": 3, "enqueued": 3, "dropped": 2, "written": 0}
+
+    writer.start()
+    assert writer.flush()
+    writer.stop()
+    assert stream.getvalue().splitlines() == ["line 0", "line 1", "line 2"]
+    assert writer.stats()["queue_depth"] == 0
+
+
+def test_access_log_has_route_template_latency_and_request_id(caplog):
+    caplog.set_level("INFO", logger="access")
+    r = client.get("/objectives/1", headers={"X-Request-ID": "req-123"})
+    assert r.headers["x-request-id"] == "req-123"
+
+    record = next(rec for rec in caplog.records if rec.name == "access")
+    assert record.route == "/objectives/{obj_id}"
+    assert record.status == r.status_code
+    assert record.request_id == "req-123"
+    assert record.latency_ms >= 0
+
+
+def test_2xx_sampling_keeps_errors():
+    async def ok(scope, receive, send):
+        status = 404 if scope["path"] == "/missing" else 200
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = AccessLogMiddleware(ok, sample_2xx=0.0)
+    local = TestClient(middleware)
+    local.get("/")
+    local.get("/")
+    local.get("/missing")
+    assert middleware.sampled_out == 2
+
+
+def test_app_loggers_do_not_reach_root_handlers():
+    seen: list[logging.LogRecord] = []
+
+    class Recorder(logging.Handler):
+        def emit(self, record: logging.LogRecord) -> None:
+            seen.append(record)
+
+    root = logging.getLogger()
+    recorder = Recorder()
+    root.addHandler(recorder)
+    try:
+        client.get("/objectives/1")
+        _ensure_logger().error("boom")
+    finally:
+        root.removeHandler(recorder)
+    assert [r.name for r in seen if r.name in ("access", "error_logger")] == []
@@ -0,0 +1,61 @@
+# NFR-07: /metrics в формате Prometheus
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import Counter, Histogram
+
+client = TestClient(app)
+
+
+def _scrape() -> str:
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    return r.text
+
+
+def test_requests_are_labelled_by_route_template():
+    client.get("/objectives/1")
+    client.get("/objectives/999999")
+    text = _scrape()
+    assert 'http_requests_total{method="GET",route="/objectives/{obj_id}",status="200"}' in text
+    assert 'http_requests_total{method="GET",route="/objectives/{obj_id}",status="404"}' in text
+    assert "/objectives/999999" not in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/objectives/{obj_id}"' in text
+
+
+def test_db_session_and_threadpool_wait_are_observed():
+    client.get("/objectives")
+    text = _scrape()
+    assert "db_session_seconds_count" in text
+    assert 'threadpool_queue_wait_seconds_count{route="/objectives"}' in text
+    assert "# TYPE log_queue_depth gauge" in text
+    assert "# TYPE log_records_dropped_total counter" in text
+
+
+def test_rejections_are_counted_and_metrics_bypass_pipeline():
+    r = client.get("/objectives", headers={"Host": "evil.example"})
+    assert r.status_code == 400
+    assert 'http_rejections_total{stage="trusted_host",status="400"}' in _scrape()
+
+    # /metrics не проходит TrustedHost и не попадает в access-метрики
+    r = client.get("/metrics", headers={"Host": "evil.example"})
+    assert r.status_code == 200
+    assert "/metrics" not in r.text
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("t_seconds", "test", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        h.observe(value)
+    lines = h.render()
+    assert 't_seconds_bucket{le="0.1"} 1' in lines
+    assert 't_seconds_bucket{le="1"} 2' in lines
+    assert 't_seconds_bucket{le="+Inf"} 3' in lines
+    assert "t_seconds_count 3" in lines
+
+
+def test_counter_escapes_label_values():
+    c = Counter("t_total", "test", ("route",))
+    c.inc('a"b')
+    assert 't_total{route="a\\"b"} 1' in c.render()
@@ -0,0 +1,92 @@
+# Keyset-пагинация: GET /objectives и GET /key_results/{obj_id}/by_objective
+from fastapi.testclient import TestClient
+
+from app import pagination
+from app.main import app
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+
+client = TestClient(app)
+
+
+def _create_objectives(n: int) -> list[int]:
+    return [client.post("/objectives", json={"title": f"Page {i}"}).json()["id"] for i in range(n)]
+
+
+def test_cursor_round_trip_is_opaque():
+    cursor = encode_cursor(42)
+    assert "42" not in cursor
+    assert decode_cursor(cursor) == 42
+
+
+def test_objectives_are_walked_page_by_page_via_link_header():
+    ids = _create_objectives(5)
+    url = f"/objectives?limit=2&cursor={encode_cursor(ids[0] - 1)}"
+
+    seen: list[int] = []
+    while url and len(seen) < 5:
+        r = client.get(url)
+        assert r.status_code == 200
+        page = r.json()
+        assert isinstance(page, list) and len(page) <= 2
+        seen += [o["id"] for o in page]
+        link = r.headers.get("link")
+        url = link[1 : link.index(">")] if link else ""
+        if link:
+            assert r.headers["x-next-cursor"] in link
+
+    assert seen[:5] == ids
+
+
+def test_last_page_has_no_next_link():
+    ids = _create_objectives(1)
+    r = client.get(f"/objectives?cursor={encode_cursor(ids[0] - 1)}&limit=10")
+    assert [o["id"] for o in r.json()] == ids
+    assert "link" not in r.headers
+
+
+def test_page_size_is_capped_and_cursor_validated():
+    assert client.get(f"/objectives?limit={MAX_PAGE_SIZE + 1}").status_code == 422
+    r = client.get("/objectives?cursor=not-a-cursor")
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid cursor"
+
+
+def test_key_results_by_objective_are_paginated():
+    obj_id = _create_objectives(1)[0]
+    kr_ids = [
+        client.post(
+            "/key_results",
+            json={
+                "title": f"KR {i}",
+                "target_value": 10,
+                "current_value": 0,
+                "objective_id": obj_id,
+            },
+        ).json()["id"]
+        for i in range(3)
+    ]
+
+    first = client.get(f"/key_results/{obj_id}/by_objective?limit=2")
+    assert [k["id"] for k in first.json()] == kr_ids[:2]
+    cursor = first.headers["x-next-cursor"]
+
+    second = client.get(f"/key_results/{obj_id}/by_objective?limit=2&cursor={cursor}")
+    assert [k["id"] for k in second.json()] == kr_ids[2:]
+    assert "x-next-cursor" not in second.headers
+
+
+def test_request_without_page_params_gets_capped_full_list(monkeypatch):
+    ids = _create_objectives(DEFAULT_PAGE_SIZE + 1)
+
+    r = client.get("/objectives")
+    assert set(ids) <= {o["id"] for o in r.json()}
+    assert "link" not in r.headers
+
+    # сверх потолка ответ обрезан и это видно по Link / X-Next-Cursor
+    monkeypatch.setattr(pagination, "LEGACY_PAGE_SIZE", 3)
+    r = client.get("/objectives")
+    assert len(r.json()) == 3
+    assert decode_cursor(r.headers["x-next-cursor"]) == r.json()[-1]["id"]
+    link = r.headers["link"]
+    assert "limit" not in link
+    assert len(client.get(link[1 : link.index(">")]).json()) == DEFAULT_PAGE_SIZE
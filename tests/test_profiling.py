@@ -0,0 +1,126 @@
+# Профилирование запроса по заголовку / по выборке
+import asyncio
+import cProfile
+import pstats
+import time
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+
+from app.metrics import InstrumentedRoute
+from app.middleware import profiling
+from app.middleware.profiling import ProfilingMiddleware
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+
+def slow_handler_for_profile() -> dict[str, str]:
+    time.sleep(0.03)
+    return {"ok": "1"}
+
+
+async def awaiting_handler_for_profile() -> dict[str, str]:
+    await asyncio.sleep(0.05)
+    return {"ok": "1"}
+
+
+router.add_api_route("/slow/{item_id}", slow_handler_for_profile, methods=["GET"])
+router.add_api_route("/awaiting", awaiting_handler_for_profile, methods=["GET"])
+
+PROFILE_HEADER = {"X-Profile": "s3"}
+
+
+def _secret() -> dict[str, str]:
+    return {"secret": PROFILE_HEADER["X-Profile"]}
+
+
+def _client(tmp_path, **kwargs) -> TestClient:
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware, directory=str(tmp_path), **kwargs)
+    return TestClient(app)
+
+
+def test_disabled_profiler_writes_nothing(tmp_path):
+    client = _client(tmp_path, enabled=False, sample_rate=1.0, **_secret())
+    r = client.get("/slow/1", headers=PROFILE_HEADER)
+    assert r.status_code == 200
+    assert "x-profile-file" not in r.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_secret_header_writes_pstats_including_threadpool_handler(tmp_path):
+    client = _client(tmp_path, enabled=True, **_secret())
+
+    assert "x-profile-file" not in client.get("/slow/1", headers={"X-Profile": "bad"}).headers
+    r = client.get("/slow/1", headers=PROFILE_HEADER)
+    name = r.headers["x-profile-file"]
+    assert name.endswith("-GET_slow_item_id.prof")
+
+    stats = pstats.Stats(str(tmp_path / name))
+    functions = {func for _, _, func in stats.stats}  # type: ignore[attr-defined]
+    assert "slow_handler_for_profile" in functions
+
+
+def test_sampled_requests_write_collapsed_stacks_into_bounded_ring(tmp_path):
+    client = _client(tmp_path, enabled=True, sample_rate=1.0, max_files=2, sample_interval=0.001)
+    for i in range(3):
+        client.get(f"/slow/{i}")
+
+    files = sorted(tmp_path.iterdir())
+    assert len(files) == 2
+    assert all(f.suffix == ".collapsed" for f in files)
+    content = files[-1].read_text()
+    assert "slow_handler_for_profile" in content
+
+
+def test_concurrent_header_requests_get_one_profile(tmp_path):
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware, directory=str(tmp_path), enabled=True, **_secret())
+
+    async def both():
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://t") as client:
+            return await asyncio.gather(
+                client.get("/awaiting", headers=PROFILE_HEADER),
+                client.get("/awaiting", headers=PROFILE_HEADER),
+            )
+
+    responses = asyncio.run(both())
+    assert [r.status_code for r in responses] == [200, 200]
+    assert sum("x-profile-file" in r.headers for r in responses) == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # после завершения профиля следующий запрос снова профилируется
+    assert (
+        "x-profile-file"
+        in _client(tmp_path, enabled=True, **_secret())
+        .get("/awaiting", headers=PROFILE_HEADER)
+        .headers
+    )
+
+
+class _OneProfilerPerInterpreter(cProfile.Profile):
+    """Как cProfile в 3.12+: второй enable() при активном профайлере — ValueError."""
+
+    active = 0
+
+    def enable(self, *args, **kwargs):
+        if _OneProfilerPerInterpreter.active:
+            raise ValueError("Another profiling tool is already active")
+        _OneProfilerPerInterpreter.active += 1
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        super().disable()
+        _OneProfilerPerInterpreter.active = 0
+
+
+def test_sync_handler_is_served_when_worker_profiler_cannot_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling.cProfile, "Profile", _OneProfilerPerInterpreter)
+    client = _client(tmp_path, enabled=True, **_secret())
+
+    r = client.get("/slow/1", headers=PROFILE_HEADER)
+    assert r.status_code == 200
+    assert (tmp_path / r.headers["x-profile-file"]).exists()
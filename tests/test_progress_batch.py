@@ -0,0 +1,51 @@
+# PUT /key_results/progress — пакетная загрузка current_value
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_progress_batch_applies_valid_items_and_reports_each(seed_objective):
+    obj_id, (a, b, c) = seed_objective(client, 0, 0, 0)
+    payload = [
+        {"kr_id": a, "current_value": 4},
+        {"kr_id": b, "current_value": 11},
+        {"kr_id": 10**9, "current_value": 1},
+        {"kr_id": c, "current_value": 10},
+    ]
+    r = client.put("/key_results/progress", json=payload)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["updated"] == 2
+    assert [item["status"] for item in body["results"]] == [
+        "updated",
+        "exceeds_target",
+        "not_found",
+        "updated",
+    ]
+
+    values = {
+        kr["id"]: kr["current_value"]
+        for kr in client.get(f"/key_results/{obj_id}/by_objective").json()
+    }
+    assert values == {a: 4, b: 0, c: 10}
+
+
+def test_progress_batch_last_duplicate_wins(seed_objective):
+    obj_id, (kr_id,) = seed_objective(client, 0)
+    payload = [{"kr_id": kr_id, "current_value": 2}, {"kr_id": kr_id, "current_value": 7}]
+    assert client.put("/key_results/progress", json=payload).json()["updated"] == 2
+    assert client.get(f"/key_results/{obj_id}/by_objective").json()[0]["current_value"] == 7
+
+
+def test_progress_batch_validation():
+    assert client.put("/key_results/progress", json=[]).status_code == 422
+    assert client.put("/key_results/progress", json=[{"kr_id": 1}]).status_code == 422
+
+
+def test_async_progress_batch(async_client, seed_objective):
+    c = async_client
+    _, (kr_id,) = seed_objective(c, 0)
+    r = c.put("/key_results/progress", json=[{"kr_id": kr_id, "current_value": 3}])
+    assert r.json() == {"updated": 1, "results": [{"kr_id": kr_id, "status": "updated"}]}
@@ -0,0 +1,43 @@
+# GET /objectives/progress — прогресс многих целей одним запросом
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def seeded(seed_objective) -> tuple[int, int]:
+    # цель с двумя key results (1/3 и 0/3) и пустая цель после неё
+    with_krs, _ = seed_objective(client, 1, 0, target_value=3)
+    empty, _ = seed_objective(client)
+    return with_krs, empty
+
+
+def test_progress_by_ids_matches_single_endpoint(seeded):
+    with_krs, empty = seeded
+    r = client.get("/objectives/progress", params={"ids": [empty, with_krs, 10**9]})
+    assert r.status_code == 200
+    assert r.json() == [
+        {
+            "objective_id": with_krs,
+            "progress": client.get(f"/objectives/{with_krs}/progress").json()["progress"],
+            "key_results": 2,
+        },
+        {"objective_id": empty, "progress": None, "key_results": 0},
+    ]
+    assert r.json()[0]["progress"] == "16.67%"
+
+
+def test_progress_pages_follow_objectives_order(seeded):
+    first = client.get("/objectives/progress", params={"limit": 1})
+    assert len(first.json()) == 1
+    second = client.get("/objectives/progress", params={"cursor": first.headers["X-Next-Cursor"]})
+    assert second.json()[0]["objective_id"] > first.json()[0]["objective_id"]
+
+
+def test_async_progress_many(async_client, seeded):
+    with_krs, empty = seeded
+    r = async_client.get("/objectives/progress", params={"ids": [with_krs, empty]})
+    assert [item["progress"] for item in r.json()] == ["16.67%", None]
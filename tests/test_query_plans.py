@@ -0,0 +1,90 @@
+# EXPLAIN QUERY PLAN для каждого запроса роутеров: горячие пути не сканируют таблицы
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import engine
+from app.pagination import encode_cursor
+
+Step = Callable[[TestClient, int, list[int]], Any]
+
+STEPS: dict[str, Step] = {
+    "list objectives": lambda c, o, krs: c.get("/objectives", params={"limit": 2}),
+    "list objectives, next page": lambda c, o, krs: c.get(
+        "/objectives", params={"cursor": encode_cursor(o - 1)}
+    ),
+    "get objective": lambda c, o, krs: c.get(f"/objectives/{o}"),
+    "objective progress": lambda c, o, krs: c.get(f"/objectives/{o}/progress"),
+    "progress by ids": lambda c, o, krs: c.get("/objectives/progress", params={"ids": [o, 1]}),
+    "progress page": lambda c, o, krs: c.get("/objectives/progress", params={"limit": 5}),
+    "export": lambda c, o, krs: c.get("/objectives/export", params={"batch_size": 3}),
+    "key results by objective": lambda c, o, krs: c.get(f"/key_results/{o}/by_objective"),
+    "key results by objective, next page": lambda c, o, krs: c.get(
+        f"/key_results/{o}/by_objective", params={"cursor": encode_cursor(krs[0])}
+    ),
+    "create key result": lambda c, o, krs: c.post(
+        "/key_results", json={"title": "plan", "target_value": 5, "objective_id": o}
+    ),
+    "bulk key results": lambda c, o, krs: c.post(
+        "/key_results/bulk", json=[{"title": "plan", "target_value": 5, "objective_id": o}]
+    ),
+    "update key result": lambda c, o, krs: c.put(
+        f"/key_results/{krs[0]}", params={"current_value": 1}
+    ),
+    "progress batch": lambda c, o, krs: c.put(
+        "/key_results/progress", json=[{"kr_id": kr_id, "current_value": 2} for kr_id in krs]
+    ),
+    "delete key result": lambda c, o, krs: c.delete(f"/key_results/{krs[-1]}"),
+    "delete objective": lambda c, o, krs: c.delete(f"/objectives/{o}"),
+}
+
+
+def _seed(client: TestClient) -> tuple[int, list[int]]:
+    ids = client.post("/objectives/bulk", json=[{"title": "plan"}] * 3).json()["created"]
+    krs = client.post(
+        "/key_results/bulk",
+        json=[{"title": "kr", "target_value": 5, "objective_id": obj_id} for obj_id in ids * 3],
+    ).json()["created"]
+    return ids[1], krs[1::3]
+
+
+def _data_statements(seen: list[tuple[str, Any]]) -> list[tuple[str, Any]]:
+    return [
+        (s, p)
+        for s, p in seen
+        if s.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE"))
+    ]
+
+
+# Список целей листается целиком: SCAN objectives по rowid с LIMIT — это и есть страница
+BOUNDED_SCANS = ("SCAN objectives",)
+
+
+def _problems(statement: str, plan: list[str]) -> list[str]:
+    """SCAN — полный проход таблицы, временное B-дерево — сортировка в памяти."""
+    bounded = " LIMIT " in statement.upper()
+    return [
+        line
+        for line in plan
+        if line.startswith("USE TEMP B-TREE")
+        or (line.startswith("SCAN") and not (bounded and line.startswith(BOUNDED_SCANS)))
+    ]
+
+
+@pytest.mark.parametrize("name", list(STEPS))
+def test_router_queries_use_indexes(name: str, sync_client, capture_statements):
+    obj_id, kr_ids = _seed(sync_client)
+    with capture_statements() as seen:
+        assert STEPS[name](sync_client, obj_id, kr_ids).status_code == 200
+    statements = _data_statements(seen)
+    assert statements, "шаг не выполнил ни одного запроса"
+
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = [
+                row[3]
+                for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            ]
+            assert not _problems(statement, plan), f"{name}: {' '.join(statement.split())}\n{plan}"
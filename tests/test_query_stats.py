@@ -0,0 +1,122 @@
+# Server-Timing со счётчиком SQL-выражений, бюджет запросов по эндпоинтам и поиск N+1
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.cache import response_cache
+from app.db import QueryStats, collect_queries, engine, get_db
+from app.main import app
+from app.metrics import DB_REPEATED_STATEMENTS
+from app.middleware.query_stats import QueryStatsMiddleware
+from app.models import ObjectiveDB
+
+client = TestClient(app)
+
+Step = Callable[[int, list[int]], Any]
+
+# (бюджет выражений, запрос); при промахе кэша ответов
+BUDGETS: dict[str, tuple[int, Step]] = {
+    "list objectives": (2, lambda o, krs: client.get("/objectives", params={"limit": 2})),
+    "get objective": (1, lambda o, krs: client.get(f"/objectives/{o}")),
+    "objective progress": (2, lambda o, krs: client.get(f"/objectives/{o}/progress")),
+    "progress by ids": (1, lambda o, krs: client.get("/objectives/progress", params={"ids": [o]})),
+    "key results by objective": (1, lambda o, krs: client.get(f"/key_results/{o}/by_objective")),
+    "create objective": (1, lambda o, krs: client.post("/objectives", json={"title": "budget"})),
+    "bulk objectives": (
+        1,
+        lambda o, krs: client.post("/objectives/bulk", json=[{"title": "budget"}] * 5),
+    ),
+    "create key result": (
+        1,
+        lambda o, krs: client.post(
+            "/key_results", json={"title": "budget", "target_value": 5, "objective_id": o}
+        ),
+    ),
+    "bulk key results": (
+        2,
+        lambda o, krs: client.post(
+            "/key_results/bulk",
+            json=[{"title": "budget", "target_value": 5, "objective_id": o}] * 5,
+        ),
+    ),
+    "update key result": (
+        1,
+        lambda o, krs: client.put(f"/key_results/{krs[0]}", params={"current_value": 1}),
+    ),
+    "progress batch": (
+        2,
+        lambda o, krs: client.put(
+            "/key_results/progress", json=[{"kr_id": kr_id, "current_value": 2} for kr_id in krs]
+        ),
+    ),
+    "delete key result": (1, lambda o, krs: client.delete(f"/key_results/{krs[-1]}")),
+    "delete objective": (2, lambda o, krs: client.delete(f"/objectives/{o}")),
+}
+
+
+@pytest.mark.parametrize("name", list(BUDGETS))
+def test_endpoint_stays_within_query_budget(name, query_budget):
+    obj_id = client.post("/objectives", json={"title": "budget"}).json()["id"]
+    krs = client.post(
+        "/key_results/bulk",
+        json=[{"title": "kr", "target_value": 5, "objective_id": obj_id}] * 3,
+    ).json()["created"]
+    response_cache.clear()
+
+    budget, step = BUDGETS[name]
+    r = step(obj_id, krs)
+    assert r.status_code == 200, r.text
+    assert query_budget(r, budget) > 0
+
+
+def test_server_timing_reports_db_time():
+    r = client.get("/objectives", params={"limit": 1})
+    name, duration, desc = r.headers["server-timing"].split(";")
+    assert name == "db"
+    assert float(duration.removeprefix("dur=")) > 0
+    assert desc == 'desc="2 statements"'
+
+
+def test_in_lists_of_any_length_are_one_shape():
+    stats = QueryStats()
+    stats.record("SELECT id FROM objectives WHERE id IN (?)", 0.001)
+    stats.record("SELECT id FROM objectives\n WHERE id IN (?, ?, ?)", 0.001)
+    assert stats.count == 2
+    assert stats.repeated(2) == {"SELECT id FROM objectives WHERE id IN (?)": 2}
+
+
+def test_failed_statement_leaves_no_start_time_on_connection():
+    with collect_queries() as stats, engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        assert "query_start" not in conn.info
+        conn.execute(text("SELECT 1"))
+        assert "query_start" not in conn.info
+    assert stats.count == 1
+
+
+def test_repeated_statement_is_flagged_as_n_plus_one(caplog, query_budget):
+    n_plus_one = FastAPI()
+    n_plus_one.add_middleware(QueryStatsMiddleware, repeat_threshold=3)
+
+    @n_plus_one.get("/titles")
+    def titles(db: Session = Depends(get_db)) -> list[str]:
+        ids = db.scalars(select(ObjectiveDB.id).limit(4)).all()
+        # одна цель — один SELECT
+        return [db.scalar(select(ObjectiveDB.title).where(ObjectiveDB.id == i)) for i in ids]
+
+    before = DB_REPEATED_STATEMENTS.values.get(("/titles",), 0)
+    with caplog.at_level("WARNING", logger="access"):
+        r = TestClient(n_plus_one).get("/titles")
+
+    assert query_budget(r, 5) == 5
+    assert DB_REPEATED_STATEMENTS.values[("/titles",)] == before + 1
+    [record] = [rec for rec in caplog.records if "repeated" in rec.getMessage()]
+    assert record.__dict__["repeats"] == 4
+    assert "WHERE objectives.id = ?" in record.__dict__["statement"]
@@ -0,0 +1,87 @@
+# A1/A3: token-bucket лимитер и отдельные правила для записи и перебора id
+from starlette.testclient import TestClient
+
+from app.middleware.ratelimit import RateRule, TokenBucketLimiter
+from app.middleware.security_full import RateLimitMiddleware
+from app.middleware.state import MemoryStateBackend
+
+
+async def _ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def test_token_bucket_refills_over_time():
+    limiter = TokenBucketLimiter()
+    rule = RateRule("t", limit=2, window_seconds=1.0)
+
+    assert limiter.take("ip", rule, now=100.0) == 0
+    assert limiter.take("ip", rule, now=100.0) == 0
+    assert limiter.take("ip", rule, now=100.0) > 0  # ведро пусто
+    assert limiter.take("ip", rule, now=100.5) == 0  # +1 токен за 0.5 с
+
+
+def test_idle_keys_are_evicted_and_memory_is_bounded():
+    limiter = TokenBucketLimiter(max_keys=3, sweep_interval=10.0)
+    rule = RateRule("t", limit=5, window_seconds=1.0)
+
+    for i in range(10):
+        limiter.take(f"ip-{i}", rule, now=0.0)
+    assert len(limiter.buckets) == 3
+    assert list(limiter.buckets) == ["ip-7", "ip-8", "ip-9"]
+
+    limiter.sweep(now=5.0)  # все вёдра уже полные
+    assert limiter.buckets == {}
+
+
+def test_sweep_follows_injected_clock_and_eviction_is_lru():
+    limiter = TokenBucketLimiter(max_keys=2, sweep_interval=10.0)
+    rule = RateRule("t", limit=1, window_seconds=100.0)
+
+    limiter.take("throttled", rule, now=1000.0)
+    limiter.take("other", rule, now=1000.0)
+    # первый вызов не чистит: срок отсчитывается от его now, а не от time.monotonic()
+    assert list(limiter.buckets) == ["throttled", "other"]
+
+    assert limiter.take("throttled", rule, now=1001.0) > 0
+    limiter.take("fresh-1", rule, now=1002.0)  # вытесняет "other", не "throttled"
+    assert list(limiter.buckets) == ["throttled", "fresh-1"]
+    assert limiter.take("throttled", rule, now=1003.0) > 0
+
+
+def test_write_rule_limits_only_write_methods():
+    app = RateLimitMiddleware(
+        _ok, write_rule=RateRule("write", 2, 60), backend=MemoryStateBackend()
+    )
+    client = TestClient(app)
+
+    assert client.post("/objectives").status_code == 200
+    assert client.post("/objectives").status_code == 200
+    r = client.post("/objectives")
+    assert r.status_code == 429
+    assert r.headers["content-type"].startswith("application/problem+json")
+    assert int(r.headers["Retry-After"]) >= 1
+
+    assert client.get("/objectives").status_code == 200
+
+
+def test_enumeration_rule_targets_objective_by_id():
+    app = RateLimitMiddleware(
+        _ok, enumeration_rule=RateRule("enum", 1, 60), backend=MemoryStateBackend()
+    )
+    client = TestClient(app)
+
+    assert client.get("/objectives/1").status_code == 200
+    assert client.get("/objectives/2").status_code == 429
+    assert client.get("/objectives/2/progress").status_code == 200
+    assert client.get("/objectives").status_code == 200
+
+
+def test_rule_from_env(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_WRITE", "30/60")
+    rule = RateRule.from_env("write", "RATE_LIMIT_WRITE")
+    assert rule is not None
+    assert rule.capacity == 30 and rule.rate == 0.5
+
+    monkeypatch.delenv("RATE_LIMIT_WRITE")
+    assert RateRule.from_env("write", "RATE_LIMIT_WRITE") is None
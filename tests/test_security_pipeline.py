@@ -0,0 +1,54 @@
+from starlette.middleware import Middleware
+from starlette.testclient import TestClient
+
+from app.main import app
+from app.middleware.pipeline import SecurityPipeline
+from app.middleware.security_full import AuthZMiddleware, TrustedHostMiddleware
+
+client = TestClient(app)
+
+
+def test_untrusted_host_rejected_with_problem_json():
+    r = client.get("/objectives", headers={"Host": "evil.example.com"})
+    assert r.status_code == 400
+    assert r.headers["content-type"].startswith("application/problem+json")
+    assert r.json()["detail"] == "Untrusted Host: evil.example.com"
+    # HSTS стоит снаружи TrustedHost — заголовок есть и на отказе
+    assert "Strict-Transport-Security" in r.headers
+
+
+def test_authz_requires_user_id_outside_testserver():
+    r = client.delete("/objectives/999", headers={"Host": "localhost"})
+    assert r.status_code == 401
+    assert r.json()["title"] == "Unauthorized"
+
+    r2 = client.delete("/objectives/999", headers={"Host": "localhost", "X-User-Id": "7"})
+    assert r2.status_code == 404
+
+
+def test_idempotency_key_replays_first_response():
+    headers = {"Idempotency-Key": "pipeline-test-key"}
+    r1 = client.post("/objectives", json={"title": "Idem"}, headers=headers)
+    r2 = client.post("/objectives", json={"title": "Idem"}, headers=headers)
+    assert r1.status_code == r2.status_code == 200
+    assert r1.json()["id"] == r2.json()["id"]
+
+
+def test_pipeline_is_ordered_and_configurable():
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    pipeline = SecurityPipeline(
+        endpoint,
+        stages=[
+            Middleware(AuthZMiddleware),
+            Middleware(TrustedHostMiddleware, allowed_hosts=["testserver"]),
+        ],
+    )
+    assert isinstance(pipeline.handler, AuthZMiddleware)
+    assert isinstance(pipeline.stage(AuthZMiddleware).app, TrustedHostMiddleware)
+
+    local = TestClient(pipeline)
+    assert local.get("/").status_code == 204
+    assert local.get("/", headers={"Host": "other"}).status_code == 400
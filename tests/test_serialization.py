@@ -0,0 +1,97 @@
+# Быстрый путь сериализации: тот же JSON, что дал бы response_model
+import pytest
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import select
+
+from app.db import SessionLocal
+from app.main import _check_response_models, app
+from app.models import KeyResultDB, ObjectiveDB
+from app.routers import key_results, objectives
+from app.schemas import KeyResult, Objective
+from app.serialization import RowSerializer
+
+client = TestClient(app)
+
+
+def _via_models(model: type[BaseModel], rows: list) -> list:
+    # прежний путь: ORM-объекты -> from_attributes -> JSON
+    adapter = TypeAdapter(list[model])  # type: ignore[valid-type]
+    return adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+
+
+def test_objectives_page_matches_model_serialization():
+    client.post("/objectives", json={"title": "Цель «юникод»", "description": None})
+    r = client.get("/objectives", params={"limit": 500})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+
+    ids = [item["id"] for item in r.json()]
+    with SessionLocal() as db:
+        rows = db.scalars(
+            select(ObjectiveDB).where(ObjectiveDB.id.in_(ids)).order_by(ObjectiveDB.id)
+        )
+        assert r.json() == _via_models(Objective, list(rows))
+
+
+def test_key_results_page_matches_model_serialization():
+    obj_id = client.post("/objectives", json={"title": "KR JSON"}).json()["id"]
+    for i in range(3):
+        client.post(
+            "/key_results",
+            json={
+                "title": f"kr {i}",
+                "target_value": 10,
+                "current_value": i,
+                "objective_id": obj_id,
+            },
+        )
+    r = client.get(f"/key_results/{obj_id}/by_objective")
+    assert r.status_code == 200
+
+    with SessionLocal() as db:
+        rows = db.scalars(
+            select(KeyResultDB).where(KeyResultDB.objective_id == obj_id).order_by(KeyResultDB.id)
+        )
+        assert r.json() == _via_models(KeyResult, list(rows))
+
+
+def test_single_objective_matches_model_serialization():
+    created = client.post("/objectives", json={"title": "one", "description": "d"}).json()
+    r = client.get(f"/objectives/{created['id']}")
+    assert r.json() == created
+
+
+def test_row_serializer_rejects_fields_without_columns():
+    class WithExtra(Objective):
+        owner: str = ""
+
+    with pytest.raises(RuntimeError, match="owner"):
+        RowSerializer(WithExtra, ObjectiveDB.__table__)
+
+
+def test_fast_routes_keep_response_model():
+    # ADR-004: схема ответа по-прежнему объявлена и попадает в OpenAPI
+    fast = {"/objectives", "/objectives/{obj_id}", "/key_results/{obj_id}/by_objective"}
+    routes = [r for r in app.routes if isinstance(r, APIRoute) and "GET" in r.methods]
+    assert all(r.response_model is not None for r in routes if r.path in fast)
+
+    schema = client.get("/openapi.json").json()
+    items = schema["paths"]["/objectives"]["get"]["responses"]["200"]["content"]
+    assert items["application/json"]["schema"]["items"]["$ref"].endswith("/Objective")
+
+
+@pytest.mark.parametrize("stack", ["router", "async_router"])
+def test_routers_pass_response_model_check(stack: str):
+    api = FastAPI()
+    api.include_router(getattr(objectives, stack), prefix="/objectives")
+    api.include_router(getattr(key_results, stack), prefix="/key_results")
+    _check_response_models(api, "enforce")
+
+    schema = TestClient(api).get("/openapi.json").json()
+    progress = schema["paths"]["/objectives/{obj_id}/progress"]["get"]["responses"]["200"]
+    assert progress["content"]["application/json"]["schema"]["$ref"].endswith(
+        "/ObjectiveProgressSingle"
+    )
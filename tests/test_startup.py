@@ -0,0 +1,78 @@
+# Импорт app.main без побочных эффектов; БД готовят lifespan или `python -m app.schema`
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# собственное время импорта модулей app.* (без fastapi/sqlalchemy), мкс
+APP_IMPORT_BUDGET_US = 250_000
+
+FIRST_REQUEST = """
+from fastapi.testclient import TestClient
+import app.main
+with TestClient(app.main.app) as client:
+    print(client.get("/objectives/1").status_code)
+"""
+
+LOG_WRITER = """
+import threading
+from fastapi.testclient import TestClient
+import app.main
+running = lambda: "log-writer" in {t.name for t in threading.enumerate()}
+print(running())
+with TestClient(app.main.app):
+    print(running())
+print(running())
+"""
+
+
+def _python(tmp_path: Path, *args: str, **env: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=tmp_path,
+        env={
+            **os.environ,
+            "PYTHONPATH": str(ROOT),
+            "DATABASE_URL": f"sqlite:///{tmp_path / 'db' / 'app.db'}",
+            **env,
+        },
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_import_is_side_effect_free_and_within_budget(tmp_path: Path):
+    result = _python(tmp_path, "-X", "importtime", "-c", "import app.main")
+
+    # ни каталога БД, ни error.log
+    assert list(tmp_path.iterdir()) == []
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        if self_us.strip().isdigit():
+            modules[name.strip()] = int(self_us)
+    assert "app.main" in modules
+    assert "imghdr" not in modules
+    own = sum(us for name, us in modules.items() if name == "app" or name.startswith("app."))
+    assert own < APP_IMPORT_BUDGET_US, f"app.* import took {own} us"
+
+
+def test_lifespan_prepares_fresh_database(tmp_path: Path):
+    assert _python(tmp_path, "-c", FIRST_REQUEST).stdout.split()[-1] == "200"
+    assert (tmp_path / "db" / "app.db").exists()
+
+
+def test_schema_cli_replaces_startup_init(tmp_path: Path):
+    _python(tmp_path, "-m", "app.schema")
+    result = _python(tmp_path, "-c", FIRST_REQUEST, DB_INIT_ON_STARTUP="0")
+    assert result.stdout.split()[-1] == "200"
+
+
+def test_log_writer_thread_runs_only_within_lifespan(tmp_path: Path):
+    assert _python(tmp_path, "-c", LOG_WRITER).stdout.split() == ["False", "True", "False"]
@@ -0,0 +1,121 @@
+# Общее состояние RateLimit/Idempotency между воркерами
+import asyncio
+import multiprocessing
+import threading
+
+import pytest
+
+from app.middleware.ratelimit import RateRule
+from app.middleware.security_full import RateLimitMiddleware
+from app.middleware.state import MemoryStateBackend, ResponseStore, SQLiteStateBackend, StateBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStateBackend()
+    return SQLiteStateBackend(str(tmp_path / "state.db"))
+
+
+def test_take_follows_token_bucket(backend):
+    rule = RateRule("t", limit=2, window_seconds=1.0)
+
+    assert backend.take("ip", rule, now=100.0) == 0
+    assert backend.take("ip", rule, now=100.0) == 0
+    assert backend.take("ip", rule, now=100.0) == pytest.approx(0.5)
+    assert backend.take("ip", rule, now=100.5) == 0
+    assert backend.take("other", rule, now=100.5) == 0
+
+
+def test_idempotent_response_round_trip(backend):
+    assert backend.get_response("k", now=1.0) is None
+    backend.put_response("k", (b'{"id": 1}', 200, "application/json"), now=1.0, ttl=10)
+    backend.put_response("k", (b'{"id": 2}', 200, "application/json"), now=2.0, ttl=10)
+    assert backend.get_response("k", now=3.0) == (b'{"id": 1}', 200, "application/json")
+
+
+def test_idempotent_response_expires(backend):
+    backend.put_response("k", (b"first", 200, None), now=1.0, ttl=10)
+    assert backend.get_response("k", now=11.0) is None
+
+    # истёкшая запись не мешает сохранить новую
+    backend.put_response("k", (b"second", 200, None), now=12.0, ttl=10)
+    assert backend.get_response("k", now=13.0) == (b"second", 200, None)
+
+
+def test_sqlite_responses_survive_restart(tmp_path):
+    path = str(tmp_path / "state.db")
+    SQLiteStateBackend(path).put_response("k", (b"body", 201, None), now=1.0, ttl=60)
+    assert SQLiteStateBackend(path).get_response("k", now=2.0) == (b"body", 201, None)
+
+
+def test_response_store_is_lru_bounded_by_bytes():
+    store = ResponseStore(max_bytes=3 * (100 + 1 + ResponseStore.ENTRY_OVERHEAD))
+    for key in "abc":
+        store.put(key, (b"x" * 100, 200, None), expires=100.0, now=0.0)
+    store.get("a", now=1.0)  # "a" становится самым свежим
+    store.put("d", (b"x" * 100, 200, None), expires=100.0, now=1.0)
+
+    assert len(store) == 3
+    assert store.get("b", now=2.0) is None
+    assert store.get("a", now=2.0) is not None
+    assert store.bytes <= store.max_bytes
+
+    store.put("huge", (b"x" * (store.max_entry_bytes + 1), 200, None), expires=100.0, now=2.0)
+    assert store.get("huge", now=2.0) is None
+
+
+def _hammer(path: str, attempts: int, results: "multiprocessing.Queue[int]") -> None:
+    backend = SQLiteStateBackend(path)
+    rule = RateRule("t", limit=50, window_seconds=3600)
+    allowed = sum(1 for _ in range(attempts) if backend.take("ip", rule, now=1000.0) == 0)
+    results.put(allowed)
+
+
+def test_sqlite_limit_is_global_across_processes(tmp_path):
+    path = str(tmp_path / "state.db")
+    SQLiteStateBackend(path)  # схема создаётся до старта воркеров
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_hammer, args=(path, 40, results)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    total = sum(results.get(timeout=60) for _ in workers)
+    for w in workers:
+        w.join()
+
+    # 4 воркера x 40 попыток, но лимит один на всех
+    assert total == 50
+
+
+def test_state_backend_is_abstract():
+    with pytest.raises(TypeError):
+        StateBackend()  # type: ignore[abstract]
+
+
+def test_sqlite_backend_runs_off_the_event_loop(tmp_path):
+    threads: list[int] = []
+
+    class Recording(SQLiteStateBackend):
+        def take(self, key, rule, now):  # noqa: ANN001
+            threads.append(threading.get_ident())
+            return super().take(key, rule, now)
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    limited = RateLimitMiddleware(
+        app,
+        write_rule=RateRule("write", limit=100, window_seconds=60),
+        backend=Recording(str(tmp_path / "state.db")),
+    )
+    scope = {"type": "http", "method": "POST", "path": "/objectives", "client": ("1.2.3.4", 1)}
+    asyncio.run(limited(scope, None, send))
+
+    assert len(threads) == 2  # общее правило + write
+    assert threading.get_ident() not in threads
@@ -0,0 +1,73 @@
+# Запись — минимум обращений к БД: INSERT/UPDATE/DELETE ... RETURNING без refresh
+from collections.abc import Callable
+
+import pytest
+from fastapi.testclient import TestClient
+from httpx import Response
+
+Statements = Callable[[Callable[[], Response]], tuple[Response, list[str]]]
+
+
+@pytest.fixture
+def statements(capture_statements) -> Statements:
+    """statements(call) -> (ответ, глаголы выполненных SQL-выражений)."""
+
+    def run(call: Callable[[], Response]) -> tuple[Response, list[str]]:
+        with capture_statements() as seen:
+            response = call()
+        return response, [statement.split()[0].upper() for statement, _ in seen]
+
+    return run
+
+
+@pytest.fixture
+def kr(sync_client: TestClient) -> dict:
+    obj_id = sync_client.post("/objectives", json={"title": "Writes"}).json()["id"]
+    payload = {"title": "kr", "target_value": 10, "current_value": 1, "objective_id": obj_id}
+    return sync_client.post("/key_results", json=payload).json()
+
+
+def test_create_objective_is_one_insert(sync_client, statements):
+    r, seen = statements(lambda: sync_client.post("/objectives", json={"title": "One"}))
+    assert r.status_code == 200
+    assert r.json()["title"] == "One"
+    assert seen == ["INSERT"]
+
+
+def test_create_key_result_is_one_insert(sync_client, statements, kr):
+    payload = {"title": "kr2", "target_value": 5, "objective_id": kr["objective_id"]}
+    r, seen = statements(lambda: sync_client.post("/key_results", json=payload))
+    assert r.status_code == 200
+    assert r.json()["current_value"] == 0
+    assert seen == ["INSERT"]
+
+
+def test_create_key_result_for_missing_objective_is_404(sync_client, statements):
+    payload = {"title": "orphan", "target_value": 5, "objective_id": 10**9}
+    r, seen = statements(lambda: sync_client.post("/key_results", json=payload))
+    assert r.status_code == 404
+    assert seen == ["INSERT"]
+
+
+def test_update_key_result_is_one_update(sync_client, statements, kr):
+    r, seen = statements(lambda: sync_client.put(f"/key_results/{kr['id']}?current_value=7"))
+    assert r.status_code == 200
+    assert r.json()["current_value"] == 7
+    assert seen == ["UPDATE"]
+
+
+def test_update_key_result_errors_are_told_apart(sync_client, statements, kr):
+    r, seen = statements(lambda: sync_client.put(f"/key_results/{kr['id']}?current_value=11"))
+    assert r.status_code == 400
+    assert seen == ["UPDATE", "SELECT"]
+
+    r, seen = statements(lambda: sync_client.put("/key_results/999999999?current_value=1"))
+    assert r.status_code == 404
+    assert seen == ["UPDATE", "SELECT"]
+
+
+def test_delete_key_result_is_one_delete(sync_client, statements, kr):
+    r, seen = statements(lambda: sync_client.delete(f"/key_results/{kr['id']}"))
+    assert r.json() == {"status": "deleted", "key_result_id": kr["id"]}
+    assert seen == ["DELETE"]
+    assert sync_client.delete(f"/key_results/{kr['id']}").status_code == 404